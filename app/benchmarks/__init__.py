@@ -0,0 +1 @@
+# Offline benchmarks, run from the app directory: python -m benchmarks.<name>
@@ -0,0 +1,87 @@
+"""
+Load test for the async request path against a stubbed LLM.
+
+Each simulated user starts a session and answers every question. The stub
+validator sleeps for `--latency` seconds per call without holding a thread,
+so wall time should stay close to one round trip per step even when the
+number of concurrent users is well past FastAPI's default threadpool (40).
+
+    python -m benchmarks.async_load --users 200 --latency 0.5
+"""
+import argparse
+import asyncio
+import math
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ["VALIDATION_ENGINE"] = "stub"
+os.environ["RULE_PREVALIDATION_ENABLED"] = "False"  # Send every answer to the stub
+
+import httpx  # noqa: E402
+from validation.base_validator import BaseValidator  # noqa: E402
+from validation.factory import ValidatorFactory  # noqa: E402
+
+THREADPOOL_SIZE = 40  # anyio's default limiter, used by sync FastAPI endpoints
+
+
+class StubValidator(BaseValidator):
+    """Accepts every answer after a fixed, non-blocking delay."""
+
+    latency = 0.5
+
+    def validate(self, question: str, user_answer: str):
+        time.sleep(self.latency)
+        return {"status": "valid", "feedback": "ok", "formatted_answer": user_answer}
+
+    async def avalidate(self, question: str, user_answer: str):
+        await asyncio.sleep(self.latency)
+        return {"status": "valid", "feedback": "ok", "formatted_answer": user_answer}
+
+
+async def run_user(client: httpx.AsyncClient) -> int:
+    response = await client.post("/start_registration")
+    session_id = response.json()["session_id"]
+    steps = 0
+    while True:
+        response = await client.post(
+            "/submit_response", json={"session_id": session_id, "answer": "x"}
+        )
+        steps += 1
+        if "next_question" not in response.json():
+            return steps
+
+
+async def run(users: int) -> tuple:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        steps = await asyncio.gather(*(run_user(client) for _ in range(users)))
+        return time.perf_counter() - start, sum(steps), max(steps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    StubValidator.latency = args.latency
+    ValidatorFactory.register("stub", StubValidator)
+
+    elapsed, total_steps, steps_per_user = asyncio.run(run(args.users))
+    threadpool_bound = (
+        math.ceil(args.users / THREADPOOL_SIZE) * steps_per_user * args.latency
+    )
+    print(f"users:                   {args.users}")
+    print(f"validations:             {total_steps}")
+    print(f"wall time:               {elapsed:.2f}s")
+    print(f"validations/sec:         {total_steps / elapsed:.1f}")
+    print(f"ideal (fully async):     {steps_per_user * args.latency:.2f}s")
+    print(f"threadpool-bound (sync): {threadpool_bound:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compares validating a whole registration field by field against a single
+batched call.
+
+Offline, it counts the prompt tokens both paths send to ChatGPT (tiktoken).
+With --live it also calls the configured engine and times both paths; this
+needs OPENAI_API_KEY and spends credits.
+
+    python -m benchmarks.batch_validation
+    python -m benchmarks.batch_validation --live --engine dspy
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import tiktoken  # noqa: E402
+from graph.forms import form_registry  # noqa: E402
+from validation.chatgpt_validator import ChatGPTValidator  # noqa: E402
+from validation.factory import ValidatorFactory  # noqa: E402
+
+SAMPLE_ANSWERS = {
+    "ask_email": "John.Doe@Example.com",
+    "ask_name": "john doe",
+    "ask_address": "123 main st, springfield, il 62701",
+    "ask_phone": "555 123 4567",
+    "ask_username": "johndoe",
+    "ask_password": "Sup3rSecret!",
+}
+
+
+def prompt_tokens(request: dict, encoding) -> int:
+    # ~4 tokens of chat-format overhead per message
+    return sum(len(encoding.encode(m["content"])) + 4 for m in request["messages"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--engine", default="chatgpt", choices=["chatgpt", "dspy"])
+    args = parser.parse_args()
+
+    question_map = form_registry.definition("registration").question_map
+    fields = {
+        key: (question_map[key], answer) for key, answer in SAMPLE_ANSWERS.items()
+    }
+    chatgpt = ChatGPTValidator()
+    encoding = tiktoken.encoding_for_model(chatgpt.model)
+
+    sequential = sum(
+        prompt_tokens(chatgpt._request_kwargs(question, answer), encoding)
+        for question, answer in fields.values()
+    )
+    batched = prompt_tokens(chatgpt._batch_request_kwargs(fields), encoding)
+    print(f"fields:                  {len(fields)}")
+    print(f"round trips:             {len(fields)} sequential vs 1 batched")
+    print(f"prompt tokens (chatgpt): {sequential} sequential vs {batched} batched "
+          f"({1 - batched / sequential:.0%} saved)")
+
+    if args.live:
+        validator = ValidatorFactory.create_validator(args.engine)
+        start = time.perf_counter()
+        for question, answer in fields.values():
+            validator.validate(question, answer)
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        validator.validate_many(fields)
+        batched_time = time.perf_counter() - start
+        print(f"latency ({args.engine}):        {sequential_time:.2f}s sequential vs "
+              f"{batched_time:.2f}s batched")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measures the per-step cost of advancing a session through a form graph.
+
+Compares the transition-table stepping in `BaseGraphManager.resume_and_step_graph`
+against replaying the compiled graph from the entry point, for forms of
+increasing size. The table-based cost should stay flat as the form grows.
+
+    python -m benchmarks.graph_stepping --sizes 6 25 50 100
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from db.sqlite_db import RegistrationState  # noqa: E402
+from graph.base_graph import BaseGraphManager  # noqa: E402
+
+# LangGraph stops a run after 25 supersteps by default; a replay visits every node
+RECURSION_SLACK = 10
+
+
+def build_form(size: int) -> BaseGraphManager:
+    questions = {f"ask_q{i}": f"Question {i}?" for i in range(size)}
+    return BaseGraphManager(f"bench_{size}", questions, RegistrationState)
+
+
+def replay_step(manager: BaseGraphManager, state: dict):
+    """The previous implementation: stream from the entry point up to current_node."""
+    config = {"recursion_limit": len(manager.question_map) + RECURSION_SLACK}
+    execution = manager.compiled_graph.stream(state, config)
+    for step in execution:
+        if list(step.keys())[0] == state["current_node"]:
+            return next(execution, None)
+    return None
+
+
+def time_session(manager: BaseGraphManager, step_fn) -> float:
+    """Walks a whole session one step at a time, returning mean seconds per step."""
+    state = {
+        "session_id": "bench",
+        "collected_data": {},
+        "current_question": "",
+        "current_node": "",
+    }
+    step = manager.start_graph(state)
+    steps = 0
+    start = time.perf_counter()
+    while step:
+        node_key = list(step.keys())[0]
+        state["collected_data"][node_key] = "answer"
+        state["current_node"] = node_key
+        step = step_fn(manager, state)
+        steps += 1
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[6, 25, 50, 100])
+    parser.add_argument("--skip-replay", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'nodes':>6} {'table us/step':>14} {'replay us/step':>15}")
+    for size in args.sizes:
+        manager = build_form(size)
+        table = time_session(manager, lambda m, s: m.resume_and_step_graph(s))
+        replay = (
+            float("nan")
+            if args.skip_replay
+            else time_session(manager, replay_step)
+        )
+        print(f"{size:>6} {table * 1e6:>14.1f} {replay * 1e6:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Cold-start budget check for the API process.
+
+Imports `main` in a fresh interpreter with `-X importtime`, fails if the
+import takes longer than the budget or loads any of the heavy dependencies
+that should only be loaded lazily, and prints the slowest imports.
+Suitable for CI:
+
+    python -m benchmarks.import_time --budget-ms 1500
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Loaded on first use or in the lifespan hook, never while importing main
+LAZY_MODULES = ["dspy", "guardrails", "mlflow", "openai", "langgraph", "litellm", "redis"]
+
+
+def measure(module: str) -> tuple:
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark")}
+    check = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr.splitlines()[-1]}")
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        timings.append((int(cumulative_us), int(self_us), name.strip()))
+
+    total_us = next((c for c, _, name in timings if name == module), 0)
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return total_us, loaded, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    total_us, loaded, timings = measure(args.module)
+    print(f"import {args.module}: {total_us / 1000:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest imports (cumulative ms):")
+    for cumulative_us, _, name in sorted(timings, reverse=True)[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}  {name}")
+
+    failures = []
+    if total_us / 1000 > args.budget_ms:
+        failures.append(f"import took {total_us / 1000:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    if loaded:
+        failures.append(f"heavy modules loaded at import time: {', '.join(loaded)}")
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
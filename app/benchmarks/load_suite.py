@@ -0,0 +1,241 @@
+"""
+Offline load test of the full registration API against a fake LLM.
+
+Each simulated user runs start_registration, answers every question with
+submit_response (retrying when the fake LLM asks for clarification or
+fails), then edits one field. The fake validator is seeded, so a given set
+of flags produces the same sequence of latencies and outcomes on every run.
+Nothing leaves the process: the app is driven through httpx's ASGI transport
+and sessions go to an in-memory or temporary SQLite store.
+
+Reports requests/sec, p50/p95/p99 latency per endpoint, and session store
+operations and graph steps per request (read from the stage histograms).
+With --max-p95-ms / --min-rps it exits non-zero on a regression, for CI:
+
+    python -m benchmarks.load_suite --users 200 --concurrency 50 \\
+        --latency-ms 50 --jitter-ms 20 --error-rate 0.02 --max-p95-ms 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ["VALIDATION_ENGINE"] = "fake"
+os.environ["MLFLOW_ENABLED"] = "False"
+os.environ["WARMUP_ON_STARTUP"] = "False"
+# Measure the app, not its rate limits: every simulated user shares one
+# client address, and retries after a clarification come in quick bursts
+for limit in ("IP_RATE", "IP_BURST", "SESSION_RATE", "SESSION_BURST"):
+    os.environ.setdefault(limit, "1000000")
+
+import httpx  # noqa: E402
+from validation.base_validator import BaseValidator  # noqa: E402
+from validation.factory import ValidatorFactory  # noqa: E402
+from helpers.metrics import stage_latency  # noqa: E402
+
+MAX_ATTEMPTS = 5  # Per question, before the user gives up
+
+# Answers that also pass the rule pre-validation when --rules is set
+ANSWERS = {
+    "ask_email": "user{n}@example.com",
+    "ask_name": "Jane Doe",
+    "ask_address": "{n} Main Street, Springfield",
+    "ask_phone": "+1 555 010 {n:04d}",
+    "ask_username": "user_{n}",
+    "ask_password": "S3cure-pass-{n}",
+}
+
+
+class FakeLLMValidator(BaseValidator):
+    """
+    Stands in for an LLM engine: waits a sampled latency without holding a
+    thread, then answers valid, clarify or error at the configured rates.
+    """
+
+    latency = 0.05
+    jitter = 0.0
+    error_rate = 0.0
+    clarify_rate = 0.0
+    seed = 0
+
+    def __init__(self):
+        self._random = random.Random(self.seed)
+        self.calls = 0
+
+    def _outcome(self, user_answer: str) -> tuple:
+        self.calls += 1
+        delay = max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0.0)
+        roll = self._random.random()
+        if roll < self.error_rate:
+            result = {"status": "error", "feedback": "LLM unavailable", "formatted_answer": user_answer}
+        elif roll < self.error_rate + self.clarify_rate:
+            result = {"status": "clarify", "feedback": "Please clarify", "formatted_answer": user_answer}
+        else:
+            result = {"status": "valid", "feedback": "ok", "formatted_answer": user_answer}
+        return delay, result
+
+    def validate(self, question: str, user_answer: str):
+        delay, result = self._outcome(user_answer)
+        time.sleep(delay)
+        return result
+
+    async def avalidate(self, question: str, user_answer: str):
+        delay, result = self._outcome(user_answer)
+        await asyncio.sleep(delay)
+        return result
+
+
+class LoadRun:
+    def __init__(self, client: httpx.AsyncClient, concurrency: int):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.latencies = defaultdict(list)
+        self.failures = 0
+        self.abandoned = 0
+
+    async def call(self, path: str, body: dict = None) -> dict:
+        start = time.perf_counter()
+        response = await self.client.post(path, json=body)
+        self.latencies[path].append(time.perf_counter() - start)
+        if response.status_code != 200 or "error" in response.json():
+            self.failures += 1
+        return response.json()
+
+    async def run_user(self, n: int):
+        async with self.semaphore:
+            data = await self.call("/start_registration")
+            session_id = data["session_id"]
+            node = data["state"]["current_node"]
+            attempts = 0
+            while True:
+                answer = ANSWERS[node].format(n=n)
+                if attempts:
+                    # A retried answer must differ, or it would hit the validation cache
+                    answer = f"{answer} (retry {attempts})"
+                data = await self.call(
+                    "/submit_response", {"session_id": session_id, "answer": answer}
+                )
+                if "next_question" not in data:
+                    break  # Registration complete
+                next_node = data["state"]["current_node"]
+                attempts = attempts + 1 if next_node == node else 0
+                if attempts >= MAX_ATTEMPTS:
+                    self.abandoned += 1
+                    return
+                node = next_node
+
+            await self.call(
+                "/edit_field",
+                {"session_id": session_id, "field_to_edit": "ask_name", "new_value": f"Jane Doe {n}"},
+            )
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+async def run(args) -> dict:
+    from main import app, warm_up
+    from db.session_store import set_session_store
+
+    if args.store == "sqlite":
+        from db.sqlite_db import SQLiteSessionStore
+
+        store = SQLiteSessionStore(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    else:
+        from db.memory_store import InMemorySessionStore
+
+        store = InMemorySessionStore()
+    set_session_store(store)
+    warm_up()  # The ASGI transport doesn't run the lifespan hook
+
+    stages_before = stage_latency.counts()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        load = LoadRun(client, args.concurrency)
+        start = time.perf_counter()
+        await asyncio.gather(*(load.run_user(n) for n in range(args.users)))
+        elapsed = time.perf_counter() - start
+    store.close()
+
+    stages_after = stage_latency.counts()
+    stages = {
+        stage: count - stages_before.get(stage, 0) for stage, count in stages_after.items()
+    }
+    all_latencies = [value for values in load.latencies.values() for value in values]
+    requests = len(all_latencies)
+    ms = 1000
+
+    return {
+        "users": args.users,
+        "requests": requests,
+        "failed_responses": load.failures,
+        "abandoned_users": load.abandoned,
+        "llm_calls": ValidatorFactory.get_validator("fake").calls,
+        "wall_time_s": round(elapsed, 3),
+        "requests_per_sec": round(requests / elapsed, 1),
+        "latency_ms": {
+            path: {
+                "p50": round(percentile(values, 0.50) * ms, 2),
+                "p95": round(percentile(values, 0.95) * ms, 2),
+                "p99": round(percentile(values, 0.99) * ms, 2),
+            }
+            for path, values in sorted({**load.latencies, "all": all_latencies}.items())
+        },
+        "db_ops_per_request": round(
+            sum(stages.get(stage, 0) for stage in ("db_fetch", "db_upsert", "db_append"))
+            / requests,
+            2,
+        ),
+        "graph_steps_per_request": round(stages.get("graph_step", 0) / requests, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--clarify-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="sqlite")
+    parser.add_argument("--rules", action="store_true", help="Keep rule pre-validation on")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if the overall p95 is above this")
+    parser.add_argument("--min-rps", type=float, help="Fail if requests/sec is below this")
+    args = parser.parse_args()
+
+    if not args.rules:
+        import validation.rules
+
+        validation.rules.RULE_PREVALIDATION_ENABLED = False  # Send every answer to the fake LLM
+
+    FakeLLMValidator.latency = args.latency_ms / 1000
+    FakeLLMValidator.jitter = args.jitter_ms / 1000
+    FakeLLMValidator.error_rate = args.error_rate
+    FakeLLMValidator.clarify_rate = args.clarify_rate
+    FakeLLMValidator.seed = args.seed
+    ValidatorFactory.register("fake", FakeLLMValidator)
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    p95_ms = report["latency_ms"]["all"]["p95"]
+    if args.max_p95_ms is not None and p95_ms > args.max_p95_ms:
+        failures.append(f"p95 {p95_ms} ms is above the {args.max_p95_ms} ms budget")
+    if args.min_rps is not None and report["requests_per_sec"] < args.min_rps:
+        failures.append(f"{report['requests_per_sec']} requests/sec is below {args.min_rps}")
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measures the cost of turning a decoded LLM validation result into the
+validator's answer, per result.
+
+Compares the fast path (`parse_output`: field checks on the dict and the
+node's cached formatter) against the strict path it replaced, which
+serializes the dict so a Guardrails guard over ValidatedLLMResponse can
+parse it back. The pydantic round trip underneath Guardrails is timed on its
+own too, so the comparison still runs where guardrails isn't installed.
+
+    python -m benchmarks.output_parsing --repeat 20000
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from validation.structured_output import guard_output, parse_output  # noqa: E402
+from validation.validated_response import ValidatedLLMResponse  # noqa: E402
+
+# One decoded engine output per registration question
+SAMPLES = [
+    ("ask_email", "What is your email address?", "John.Doe@Example.com"),
+    ("ask_name", "What is your full name?", "john doe"),
+    ("ask_address", "What is your address?", "123 main st, springfield, il 62701"),
+    ("ask_phone", "What is your phone number?", "555 123 4567"),
+    ("ask_username", "Choose a username.", "johndoe"),
+    ("ask_password", "Choose a strong password.", "Sup3rSecret!"),
+]
+OUTPUTS = [
+    (node_key, question, {"status": "valid", "feedback": "Looks good.", "formatted_answer": answer})
+    for node_key, question, answer in SAMPLES
+]
+
+
+def fast(node_key: str, question: str, output: dict):
+    return parse_output(output, question, node_key, strict=False)
+
+
+def pydantic_round_trip(node_key: str, question: str, output: dict):
+    # What guard.parse does at its core: re-parse the JSON into the model
+    return ValidatedLLMResponse.model_validate_json(
+        json.dumps(output), context={"question": question}
+    ).model_dump()
+
+
+def guardrails(node_key: str, question: str, output: dict):
+    return guard_output(output)
+
+
+def time_path(parse, repeat: int) -> float:
+    """Mean microseconds per parsed result."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for node_key, question, output in OUTPUTS:
+            parse(node_key, question, dict(output))
+    return (time.perf_counter() - start) / (repeat * len(OUTPUTS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    paths = {"fast": fast, "pydantic_round_trip": pydantic_round_trip}
+    try:
+        guardrails(*OUTPUTS[0])
+        paths["guardrails"] = guardrails
+    except ImportError:
+        print("guardrails is not installed; skipping the Guardrails path")
+
+    report = {name: round(time_path(parse, args.repeat), 2) for name, parse in paths.items()}
+    print(f"{'path':>20} {'us/result':>10} {'vs fast':>8}")
+    for name, micros in report.items():
+        print(f"{name:>20} {micros:>10.2f} {micros / report['fast']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Measures the size and serialization cost of the registration API's
+responses, full vs. delta mode, over one complete registration.
+
+The registration is driven through the app (fake LLM, in-memory store) once
+per mode to capture the real response bodies. The captured full-mode
+payloads are then re-encoded repeatedly with the previous path (FastAPI's
+jsonable_encoder and the stdlib json module, for untyped dicts) and the
+current one (response model, then orjson).
+
+    python -m benchmarks.response_payloads --repeat 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.load_suite import ANSWERS, FakeLLMValidator  # Also sets up the environment
+
+import httpx  # noqa: E402
+import orjson  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from validation.factory import ValidatorFactory  # noqa: E402
+from schemas import DeltaResponse, SubmitResponse  # noqa: E402
+
+
+async def walk_registration(client: httpx.AsyncClient, delta: bool) -> list:
+    """Answers every question once; returns the raw response bodies."""
+    response = await client.post("/start_registration")
+    data = response.json()
+    session_id, node = data["session_id"], data["state"]["current_node"]
+    bodies = [response.content]
+    params = {"delta": "true"} if delta else {}
+    while True:
+        response = await client.post(
+            "/submit_response",
+            params=params,
+            json={"session_id": session_id, "answer": ANSWERS[node].format(n=1)},
+        )
+        bodies.append(response.content)
+        data = response.json()
+        if "error" in data:
+            raise SystemExit(f"Registration failed: {data['error']}")
+        if delta:
+            if data["status"] == "complete":
+                return bodies
+            node = data["current_node"]
+        else:
+            if "next_question" not in data:
+                return bodies
+            node = data["state"]["current_node"]
+
+
+async def capture() -> dict:
+    from main import app, warm_up
+    from db.memory_store import InMemorySessionStore
+    from db.session_store import set_session_store
+
+    set_session_store(InMemorySessionStore())
+    warm_up()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return {
+            "full": await walk_registration(client, delta=False),
+            "delta": await walk_registration(client, delta=True),
+        }
+
+
+def stdlib_encode(payload: dict) -> bytes:
+    # FastAPI's path for an untyped dict, then Starlette's JSONResponse.render
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def model_encode(model_class, payload: dict) -> bytes:
+    return orjson.dumps(model_class(**payload).model_dump(exclude_none=True))
+
+
+def time_encoder(encode, payloads: list, repeat: int) -> float:
+    """Mean microseconds to encode all payloads (one registration)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for payload in payloads:
+            encode(payload)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    import validation.rules
+
+    validation.rules.RULE_PREVALIDATION_ENABLED = False
+    FakeLLMValidator.latency = 0.0
+    ValidatorFactory.register("fake", FakeLLMValidator)
+
+    bodies = asyncio.run(capture())
+    # Turn payloads only; start_registration is the same in both modes
+    full = [json.loads(body) for body in bodies["full"][1:]]
+    delta = [json.loads(body) for body in bodies["delta"][1:]]
+
+    report = {
+        "turns": len(full),
+        "bytes_per_registration": {
+            mode: sum(len(body) for body in mode_bodies) for mode, mode_bodies in bodies.items()
+        },
+        "us_per_registration": {
+            "full_stdlib": round(time_encoder(stdlib_encode, full, args.repeat), 1),
+            "full_model_orjson": round(
+                time_encoder(lambda p: model_encode(SubmitResponse, p), full, args.repeat), 1
+            ),
+            "delta_model_orjson": round(
+                time_encoder(lambda p: model_encode(DeltaResponse, p), delta, args.repeat), 1
+            ),
+        },
+    }
+    report["delta_size_ratio"] = round(
+        report["bytes_per_registration"]["delta"] / report["bytes_per_registration"]["full"], 3
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
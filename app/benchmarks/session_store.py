@@ -0,0 +1,102 @@
+"""
+Sessions/sec through the session store under concurrent writers.
+
+Every simulated turn does what /submit_response does: fetch a session, add
+an answer, upsert it. `--legacy` measures the previous implementation, which
+opened a new connection per call on a rollback-journal database.
+
+    python -m benchmarks.session_store --writers 8 --sessions 200 --turns 6
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from db.sqlite_db import SQLiteSessionStore  # noqa: E402
+
+
+class LegacyStore:
+    """Connection-per-call store, as before the pooled implementation."""
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        with sqlite3.connect(db_file) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, "
+                "collected_data TEXT, current_question TEXT, current_node TEXT)"
+            )
+
+    def upsert(self, session_id, collected_data, current_question, current_node):
+        with sqlite3.connect(self.db_file, timeout=30) as conn:
+            conn.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET "
+                "collected_data = excluded.collected_data, current_question = excluded.current_question, "
+                "current_node = excluded.current_node",
+                (session_id, json.dumps(collected_data), current_question, current_node),
+            )
+
+    def fetch(self, session_id):
+        with sqlite3.connect(self.db_file, timeout=30) as conn:
+            row = conn.execute(
+                "SELECT session_id, collected_data, current_question, current_node FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return {
+            "session_id": row[0],
+            "collected_data": json.loads(row[1]),
+            "current_question": row[2],
+            "current_node": row[3],
+        }
+
+
+def run_writer(store, writer: int, sessions: int, turns: int):
+    for s in range(sessions):
+        session_id = f"w{writer}-s{s}"
+        store.upsert(session_id, {}, "q0", "ask_q0")
+        for turn in range(turns):
+            state = store.fetch(session_id)
+            state["collected_data"][f"ask_q{turn}"] = f"answer {turn}"
+            store.upsert(session_id, state["collected_data"], f"q{turn + 1}", f"ask_q{turn + 1}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        store = LegacyStore(db_file) if args.legacy else SQLiteSessionStore(db_file)
+
+        threads = [
+            threading.Thread(target=run_writer, args=(store, w, args.sessions, args.turns))
+            for w in range(args.writers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        if not args.legacy:
+            store.close()
+
+    sessions = args.writers * args.sessions
+    print(f"store:         {'legacy' if args.legacy else 'pooled WAL + LRU'}")
+    print(f"sessions:      {sessions} ({args.turns} turns each, {args.writers} writers)")
+    print(f"elapsed:       {elapsed:.2f}s")
+    print(f"sessions/sec:  {sessions / elapsed:.1f}")
+    print(f"turns/sec:     {sessions * args.turns / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
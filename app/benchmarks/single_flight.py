@@ -0,0 +1,66 @@
+"""
+Shows that N concurrent duplicate validations share one backend call,
+for both thread-based and asyncio callers.
+
+    python -m benchmarks.single_flight --duplicates 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from validation.singleflight import SingleFlight
+
+
+def run_threads(duplicates: int, latency: float) -> int:
+    flight = SingleFlight()
+    backend_calls = []
+
+    def backend():
+        backend_calls.append(1)
+        time.sleep(latency)
+        return {"status": "valid", "feedback": "ok", "formatted_answer": "x"}
+
+    barrier = threading.Barrier(duplicates)
+
+    def caller():
+        barrier.wait()
+        flight.do("same-key", backend)
+
+    threads = [threading.Thread(target=caller) for _ in range(duplicates)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(backend_calls)
+
+
+async def run_tasks(duplicates: int, latency: float) -> int:
+    flight = SingleFlight()
+    backend_calls = []
+
+    async def backend():
+        backend_calls.append(1)
+        await asyncio.sleep(latency)
+        return {"status": "valid", "feedback": "ok", "formatted_answer": "x"}
+
+    await asyncio.gather(*(flight.ado("same-key", backend) for _ in range(duplicates)))
+    return len(backend_calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duplicates", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    sync_calls = run_threads(args.duplicates, args.latency)
+    async_calls = asyncio.run(run_tasks(args.duplicates, args.latency))
+    print(f"{args.duplicates} threaded duplicates -> {sync_calls} backend call(s)")
+    print(f"{args.duplicates} asyncio duplicates  -> {async_calls} backend call(s)")
+    if sync_calls != 1 or async_calls != 1:
+        raise SystemExit("duplicate requests were not coalesced")
+
+
+if __name__ == "__main__":
+    main()
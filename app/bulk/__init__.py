@@ -0,0 +1 @@
+# This file makes the bulk directory a proper Python package
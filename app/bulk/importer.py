@@ -0,0 +1,281 @@
+"""
+Bulk registration import.
+
+Rows are dicts keyed by the node keys of a form (e.g. a CSV with an
+`ask_email` column for the registration form). Every field goes through the
+validator layer; rows that validate completely become completed sessions,
+pinned to the form's current version and written in one transaction per
+chunk.
+
+    python -m bulk.importer partners.csv
+    python -m bulk.importer partners.csv --form partner_registration
+    python -m bulk.importer partners.jsonl --concurrency 16 --rate 10
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import random
+import uuid
+from typing import AsyncIterator, Iterable, Iterator
+from db.session_store import get_session_store
+from graph.forms import form_registry
+from helpers.config import (
+    DEFAULT_FORM,
+    BULK_CONCURRENCY,
+    BULK_LLM_RATE,
+    BULK_LLM_BURST,
+    BULK_CHUNK_SIZE,
+    BULK_MAX_RETRIES,
+    BULK_RETRY_BACKOFF,
+)
+from helpers.admission import BULK, current_priority
+from helpers.rate_limit import TokenBucket
+from helpers.telemetry import telemetry
+from validation.factory import avalidate_with_engine
+from validation.rules import current_form_rules, prevalidate
+
+SKIPPED_ANSWER = "-"  # Same marker /submit_response stores for skipped questions
+
+
+class InvalidRow:
+    """Stands in for a row that couldn't be parsed, so the import carries on."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+
+def _parse_jsonl(text: str) -> Iterator:
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield InvalidRow(f"Malformed JSON: {e}")
+
+
+def parse_rows(text: str, fmt: str) -> Iterable:
+    """
+    Parses CSV (with a header row) or JSONL text into row dicts. Lines
+    that aren't valid JSON become InvalidRow.
+    """
+    if fmt == "csv":
+        return csv.DictReader(io.StringIO(text))
+    if fmt == "jsonl":
+        return _parse_jsonl(text)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _invalid(index: int, errors: dict) -> dict:
+    return {"event": "row", "row": index, "status": "invalid", "errors": errors}
+
+
+class BulkImporter:
+    """
+    Validates rows on a bounded worker pool, rate-limiting LLM calls. The
+    calls are admitted at bulk priority; `Overloaded` rejections are retried
+    like any other transient error.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = BULK_CONCURRENCY,
+        llm_rate: float = BULK_LLM_RATE,
+        llm_burst: float = BULK_LLM_BURST,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        max_retries: int = BULK_MAX_RETRIES,
+        retry_backoff: float = BULK_RETRY_BACKOFF,
+        form_id: str = DEFAULT_FORM,
+    ):
+        self.concurrency = concurrency
+        self.llm_bucket = TokenBucket(llm_rate, llm_burst)
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.form = form_registry.definition(form_id)
+        self.question_map = self.form.question_map
+
+    async def _validate_field(self, node_key: str, answer: str) -> dict:
+        question = self.question_map[node_key]
+        result = prevalidate(question, answer, node_key)
+        if result is not None:
+            return result
+
+        for attempt in range(self.max_retries + 1):
+            await self.llm_bucket.acquire()
+            try:
+                result = await avalidate_with_engine(question, answer, node_key)
+            except Exception as e:
+                logging.error(f"[bulk] Validation of {node_key} failed: {str(e)}")
+                result = {
+                    "status": "error",
+                    "feedback": "An error occurred during validation.",
+                    "formatted_answer": answer,
+                }
+            if result["status"] != "error" or attempt == self.max_retries:
+                return result
+            # Exponential backoff with jitter before retrying transient errors
+            await asyncio.sleep(self.retry_backoff * (2 ** attempt) * (0.5 + random.random()))
+        return result
+
+    async def _process_row(self, index: int, row) -> dict:
+        if isinstance(row, InvalidRow):
+            return _invalid(index, {"row": row.reason})
+        if not isinstance(row, dict):
+            return _invalid(index, {"row": f"Expected an object, got {type(row).__name__}"})
+
+        collected_data = {}
+        errors = {}
+        for node_key in self.question_map:
+            value = row.get(node_key)
+            answer = "" if value is None else str(value).strip()
+            if answer == SKIPPED_ANSWER:
+                collected_data[node_key] = SKIPPED_ANSWER
+                continue
+            if not answer:
+                errors[node_key] = "Missing value"
+                continue
+            result = await self._validate_field(node_key, answer)
+            if result["status"] == "valid":
+                collected_data[node_key] = result["formatted_answer"]
+            else:
+                errors[node_key] = result["feedback"]
+
+        if errors:
+            return _invalid(index, errors)
+
+        session = {
+            "session_id": str(uuid.uuid4()),
+            "collected_data": collected_data,
+            "current_question": "",
+            "current_node": list(self.question_map)[-1],
+            "completed": True,
+            "form_id": self.form.form_id,
+            "form_version": self.form.version,
+        }
+        return {
+            "event": "row",
+            "row": index,
+            "status": "valid",
+            "session_id": session["session_id"],
+            "session": session,
+        }
+
+    async def run(self, rows: Iterable) -> AsyncIterator[dict]:
+        """
+        Validates and imports rows, yielding a progress event per row and
+        chunk. A row that can't be read or processed is reported as invalid;
+        it never stops the import.
+        """
+        pending: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def produce():
+            index, cancelled = -1, False
+            try:
+                for index, row in enumerate(rows):
+                    await pending.put((index, row))
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            except Exception as e:
+                # The rows iterator can't be resumed after raising, e.g. on a broken CSV
+                logging.error(f"[bulk] Reading row {index + 1} failed: {str(e)}")
+                await pending.put((index + 1, InvalidRow(f"Unreadable row: {e}")))
+            finally:
+                if not cancelled:
+                    for _ in range(self.concurrency):
+                        await pending.put(None)
+
+        async def work():
+            try:
+                while True:
+                    item = await pending.get()
+                    if item is None:
+                        break
+                    try:
+                        event = await self._process_row(*item)
+                    except Exception as e:
+                        logging.error(f"[bulk] Row {item[0]} failed: {str(e)}")
+                        event = _invalid(item[0], {"row": f"Processing failed: {e}"})
+                    await results.put(event)
+            finally:
+                results.put_nowait(None)  # Unbounded, so this never blocks
+
+        # Workers inherit bulk priority, so interactive validations go first,
+        # and the rules of the form version rows are imported at
+        priority = current_priority.set(BULK)
+        rules = current_form_rules.set(self.form.rules)
+        tasks = [asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(work()) for _ in range(self.concurrency)]
+        current_form_rules.reset(rules)
+        current_priority.reset(priority)
+        totals = {"processed": 0, "valid": 0, "invalid": 0, "written": 0}
+        chunk: list = []
+        workers_done = 0
+        try:
+            while workers_done < self.concurrency:
+                event = await results.get()
+                if event is None:
+                    workers_done += 1
+                    continue
+
+                totals["processed"] += 1
+                totals[event["status"]] += 1
+                if event["status"] == "valid":
+                    chunk.append(event.pop("session"))
+                yield event
+
+                if len(chunk) >= self.chunk_size:
+                    totals["written"] += await self._write_chunk(chunk)
+                    chunk = []
+                    yield {"event": "progress", **totals}
+
+            if chunk:
+                totals["written"] += await self._write_chunk(chunk)
+            yield {"event": "done", **totals}
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    async def _write_chunk(sessions: list) -> int:
+        return await asyncio.to_thread(get_session_store().upsert_many, sessions)
+
+
+async def _main(args):
+    with open(args.path, encoding="utf-8") as f:
+        text = f.read()
+    fmt = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+    importer = BulkImporter(
+        concurrency=args.concurrency,
+        llm_rate=args.rate,
+        chunk_size=args.chunk_size,
+        form_id=args.form,
+    )
+    telemetry.start()
+    try:
+        async for event in importer.run(parse_rows(text, fmt)):
+            if event["event"] != "row" or event["status"] == "invalid" or args.verbose:
+                print(json.dumps(event), flush=True)
+    finally:
+        await asyncio.to_thread(telemetry.stop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import registrations from CSV or JSONL.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--form", default=DEFAULT_FORM)
+    parser.add_argument("--concurrency", type=int, default=BULK_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=BULK_LLM_RATE, help="LLM calls per second")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    parser.add_argument("--verbose", action="store_true", help="Also print valid rows")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional
+from db.events import apply_events
+
+
+class StaleSessionError(Exception):
+    """Raised when a session was updated by someone else since it was fetched."""
+
+
+class SessionStore(ABC):
+    """
+    Abstract base class for session storage backends.
+
+    Sessions carry a `version` that is bumped on every write. Passing the
+    version a session was fetched at as `expected_version` makes the write
+    conditional, so two workers can't silently overwrite each other.
+    A new session is written with `expected_version=0`.
+
+    Sessions are pinned to the form version they started on (see
+    graph.forms): `form_id` and `form_version` are stored when a session is
+    created, returned by `fetch` and kept by every later write.
+
+    `completed` marks a finished session, which the sweeper archives instead
+    of expiring. Writes that leave it as None keep the stored flag.
+
+    Changes to a session's answers go through `append_events` (see
+    db.events), which journals them. Backends without a journal fold the
+    events into the session and upsert it.
+    """
+
+    @abstractmethod
+    def fetch(self, session_id: str) -> Optional[dict]:
+        """Returns the session as a dictionary, or None if it doesn't exist."""
+        pass
+
+    @abstractmethod
+    def upsert(
+        self,
+        session_id: str,
+        collected_data: dict,
+        current_question: str,
+        current_node: str,
+        expected_version: Optional[int] = None,
+        completed: Optional[bool] = None,
+        form_id: Optional[str] = None,
+        form_version: Optional[str] = None,
+    ) -> int:
+        """Writes the session and returns its new version."""
+        pass
+
+    def append_events(
+        self,
+        session_id: str,
+        events: list,
+        current_question: str,
+        current_node: str,
+        expected_version: Optional[int] = None,
+        completed: Optional[bool] = None,
+    ) -> int:
+        """Applies events to the session, moves it to `current_node` and returns its new version."""
+        session = self.fetch(session_id)
+        if session is None:
+            raise StaleSessionError(session_id)
+        collected_data = apply_events(session["collected_data"], events)
+        version = self.upsert(
+            session_id,
+            collected_data,
+            current_question,
+            current_node,
+            expected_version,
+            completed,
+        )
+        self.record_events(session_id, events)
+        return version
+
+    def record_events(self, session_id: str, events: list):
+        """Journals events that don't change the session, e.g. answers needing clarification."""
+        pass
+
+    def events(self, session_id: Optional[str] = None) -> Iterator[dict]:
+        """The journal of one session, or of every session, oldest first."""
+        return iter(())
+
+    def upsert_many(self, sessions: list) -> int:
+        """
+        Writes new sessions (dicts shaped like `fetch` results, plus an
+        optional `completed` flag) and returns how many were written.
+        Backends should override this with a single batched write.
+        """
+        for session in sessions:
+            self.upsert(
+                session["session_id"],
+                session["collected_data"],
+                session["current_question"],
+                session["current_node"],
+                expected_version=0,
+                completed=session.get("completed", False),
+                form_id=session.get("form_id"),
+                form_version=session.get("form_version"),
+            )
+        return len(sessions)
+
+    # Maintenance, called in small batches by the session sweeper. Backends
+    # that expire or compact sessions natively can keep these no-ops.
+
+    def expire_idle(self, ttl: float, limit: int) -> int:
+        """Deletes up to `limit` unfinished sessions idle for longer than `ttl` seconds."""
+        return 0
+
+    def archive_completed(self, grace: float, limit: int) -> int:
+        """Moves up to `limit` sessions finished over `grace` seconds ago out of the hot store."""
+        return 0
+
+    def reclaim_space(self, pages: int) -> int:
+        """Returns up to `pages` free pages of storage to the system."""
+        return 0
+
+    def close(self):
+        """Releases connections held by the store."""
+        pass
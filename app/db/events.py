@@ -0,0 +1,102 @@
+"""
+Session journal events.
+
+Every change to a session's answers is recorded as an event, and a
+session's `collected_data` is the fold of its events over the latest
+snapshot. Events that carry a `value` set the answer of their `node`;
+the others (e.g. an answer that needed clarification) are kept for audit
+and replay only.
+
+Answers to secret questions (those under the form's "password" rule) are
+redacted in the event. Their value travels in the event's `secret` key,
+which stores write to the session's snapshot but never to the journal.
+"""
+import time
+from typing import Dict, Iterable
+from validation.rules import is_secret
+
+ANSWER_SUBMITTED = "answer_submitted"
+ANSWER_VALIDATED = "answer_validated"
+ANSWER_SKIPPED = "answer_skipped"
+FIELD_EDITED = "field_edited"
+
+SKIPPED_ANSWER = "-"
+REDACTED = "[redacted]"
+SECRET = "secret"  # Key of a secret event's value; stripped before journaling
+
+
+def make_event(event_type: str, node: str, **data) -> dict:
+    return {"type": event_type, "node": node, "at": time.time(), **data}
+
+
+def _verdict(result: Dict[str, str], secret: bool) -> dict:
+    verdict = {
+        "status": result["status"],
+        "feedback": result["feedback"],
+        "formatted_answer": REDACTED if secret else result["formatted_answer"],
+    }
+    if result.get("degraded"):
+        verdict["degraded"] = True  # Settled by the local rules, not an engine
+    return verdict
+
+
+def _set_value(event: dict, value: str, secret: bool) -> dict:
+    event[SECRET if secret else "value"] = value
+    return event
+
+
+def answer_events(
+    node: str, question: str, answer: str, result: Dict[str, str], stored: bool
+) -> list:
+    """The events of one answered question; `stored` when the answer was kept."""
+    secret = is_secret(question, node)
+    validated = make_event(ANSWER_VALIDATED, node, **_verdict(result, secret))
+    if stored:
+        _set_value(validated, result["formatted_answer"], secret)
+    return [
+        make_event(
+            ANSWER_SUBMITTED, node, question=question, answer=REDACTED if secret else answer
+        ),
+        validated,
+    ]
+
+
+def skip_event(node: str) -> dict:
+    return make_event(ANSWER_SKIPPED, node, value=SKIPPED_ANSWER)
+
+
+def edit_event(
+    node: str, question: str, answer: str, result: Dict[str, str], stored: bool
+) -> dict:
+    secret = is_secret(question, node)
+    event = make_event(
+        FIELD_EDITED,
+        node,
+        question=question,
+        answer=REDACTED if secret else answer,
+        **_verdict(result, secret),
+    )
+    if stored:
+        _set_value(event, result["formatted_answer"], secret)
+    return event
+
+
+def journaled(event: dict) -> dict:
+    """The event as written to the journal, without a secret value."""
+    if SECRET not in event:
+        return event
+    return {key: value for key, value in event.items() if key != SECRET}
+
+
+def carries_secret(events: Iterable[dict]) -> bool:
+    return any(SECRET in event for event in events)
+
+
+def apply_events(collected_data: dict, events: Iterable[dict]) -> dict:
+    """Folds events into `collected_data` in place."""
+    for event in events:
+        if "value" in event:
+            collected_data[event["node"]] = event["value"]
+        elif SECRET in event:
+            collected_data[event["node"]] = event[SECRET]
+    return collected_data
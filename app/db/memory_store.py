@@ -0,0 +1,98 @@
+import itertools
+import threading
+import time
+from typing import Iterator, Optional
+from db.base_store import SessionStore, StaleSessionError
+from db.events import journaled
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local session store, for tests and single-process development."""
+
+    def __init__(self):
+        self._sessions: dict = {}
+        self._meta: dict = {}  # session_id -> (updated_at, completed)
+        self.archive: dict = {}
+        self._events: list = []
+        self._event_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def fetch(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            return {**session, "collected_data": dict(session["collected_data"])}
+
+    def upsert(
+        self,
+        session_id: str,
+        collected_data: dict,
+        current_question: str,
+        current_node: str,
+        expected_version: Optional[int] = None,
+        completed: Optional[bool] = None,
+        form_id: Optional[str] = None,
+        form_version: Optional[str] = None,
+    ) -> int:
+        with self._lock:
+            current = self._sessions.get(session_id)
+            current_version = current["version"] if current else 0
+            if expected_version is not None and expected_version != current_version:
+                raise StaleSessionError(session_id)
+            if current:
+                form_id, form_version = current["form_id"], current["form_version"]
+
+            self._sessions[session_id] = {
+                "session_id": session_id,
+                "collected_data": dict(collected_data),
+                "current_question": current_question,
+                "current_node": current_node,
+                "version": current_version + 1,
+                "form_id": form_id,
+                "form_version": form_version,
+            }
+            if completed is None:
+                completed = self._meta.get(session_id, (0, False))[1]
+            self._meta[session_id] = (time.time(), completed)
+            return current_version + 1
+
+    def record_events(self, session_id: str, events: list):
+        with self._lock:
+            for event in events:
+                self._events.append(
+                    {**journaled(event), "id": next(self._event_ids), "session_id": session_id}
+                )
+
+    def events(self, session_id: Optional[str] = None) -> Iterator[dict]:
+        with self._lock:
+            events = list(self._events)
+        return (e for e in events if session_id is None or e["session_id"] == session_id)
+
+    def expire_idle(self, ttl: float, limit: int) -> int:
+        cutoff = time.time() - ttl
+        with self._lock:
+            expired = [
+                session_id
+                for session_id, (updated_at, completed) in self._meta.items()
+                if not completed and updated_at < cutoff
+            ][:limit]
+            for session_id in expired:
+                del self._sessions[session_id], self._meta[session_id]
+            if expired:
+                dropped = set(expired)
+                self._events = [e for e in self._events if e["session_id"] not in dropped]
+            return len(expired)
+
+    def archive_completed(self, grace: float, limit: int) -> int:
+        cutoff = time.time() - grace
+        with self._lock:
+            done = [
+                session_id
+                for session_id, (updated_at, completed) in self._meta.items()
+                if completed and updated_at < cutoff
+            ][:limit]
+            for session_id in done:
+                self.archive[session_id] = self._sessions.pop(session_id)
+                del self._meta[session_id]
+            return len(done)
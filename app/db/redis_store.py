@@ -0,0 +1,137 @@
+import json
+import time
+import zlib
+import redis
+from typing import Iterator, Optional
+from db.base_store import SessionStore, StaleSessionError
+from db.events import journaled
+from helpers.config import REDIS_URL, SESSION_TTL
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session store on a networked key-value store shared by every app worker.
+    Conditional writes use WATCH/MULTI, so a concurrent write aborts ours.
+    Unfinished sessions expire through the key TTL; completed ones are
+    tracked in a sorted set, by completion time, until the sweeper archives
+    them. A session's journal
+    is a list next to it, expiring with it until the session is archived.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        url: str = REDIS_URL,
+        prefix: str = "session:",
+        ttl: float = SESSION_TTL,
+    ):
+        # Any client with the redis-py API works, e.g. fakeredis.FakeRedis in tests
+        self.client = client if client is not None else redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+        self.completed_key = f"{prefix}completed_at"
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _events_key(self, session_id: str) -> str:
+        return f"{self.prefix}events:{session_id}"
+
+    def fetch(self, session_id: str) -> Optional[dict]:
+        raw = self.client.get(self._key(session_id))
+        return json.loads(raw) if raw else None
+
+    def upsert(
+        self,
+        session_id: str,
+        collected_data: dict,
+        current_question: str,
+        current_node: str,
+        expected_version: Optional[int] = None,
+        completed: Optional[bool] = None,
+        form_id: Optional[str] = None,
+        form_version: Optional[str] = None,
+    ) -> int:
+        key = self._key(session_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    current = json.loads(raw) if raw else None
+                    current_version = current["version"] if current else 0
+                    if expected_version is not None and expected_version != current_version:
+                        raise StaleSessionError(session_id)
+                    if current:
+                        form_id = current.get("form_id")
+                        form_version = current.get("form_version")
+                    done = (
+                        completed
+                        if completed is not None
+                        else pipe.zscore(self.completed_key, session_id) is not None
+                    )
+
+                    session = {
+                        "session_id": session_id,
+                        "collected_data": collected_data,
+                        "current_question": current_question,
+                        "current_node": current_node,
+                        "version": current_version + 1,
+                        "form_id": form_id,
+                        "form_version": form_version,
+                    }
+                    pipe.multi()
+                    if done:
+                        pipe.set(key, json.dumps(session))
+                        pipe.zadd(self.completed_key, {session_id: time.time()})
+                    else:
+                        pipe.set(key, json.dumps(session), ex=int(self.ttl))
+                        pipe.zrem(self.completed_key, session_id)
+                    pipe.execute()
+                    return current_version + 1
+                except redis.WatchError:
+                    if expected_version is not None:
+                        raise StaleSessionError(session_id)
+                    # Unconditional write: retry on top of the newer version
+
+    def record_events(self, session_id: str, events: list):
+        if not events:
+            return
+        key = self._events_key(session_id)
+        with self.client.pipeline() as pipe:
+            pipe.rpush(key, *(json.dumps({**journaled(e), "session_id": session_id}) for e in events))
+            pipe.expire(key, int(self.ttl))
+            pipe.execute()
+
+    def events(self, session_id: Optional[str] = None) -> Iterator[dict]:
+        keys = (
+            [self._events_key(session_id)]
+            if session_id
+            else self.client.scan_iter(match=self._events_key("*"))
+        )
+        for key in keys:
+            for raw in self.client.lrange(key, 0, -1):
+                yield json.loads(raw)
+
+    def archive_completed(self, grace: float, limit: int) -> int:
+        archived = 0
+        due = self.client.zrangebyscore(
+            self.completed_key, "-inf", time.time() - grace, start=0, num=limit
+        )
+        for raw_id in due:
+            if not self.client.zrem(self.completed_key, raw_id):
+                continue  # Claimed by another worker's sweeper
+            session_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            raw = self.client.get(self._key(session_id))
+            if raw is None:
+                continue
+            with self.client.pipeline() as pipe:
+                pipe.set(f"{self.prefix}archive:{session_id}", zlib.compress(raw))
+                pipe.delete(self._key(session_id))
+                pipe.persist(self._events_key(session_id))  # Kept for audit and replay
+                pipe.execute()
+            archived += 1
+        return archived
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,99 @@
+import threading
+from typing import Optional
+from db.base_store import SessionStore, StaleSessionError  # noqa: F401
+from helpers.config import SESSION_BACKEND
+from helpers.lazy_import import load_object
+from helpers.metrics import timed
+
+
+class SessionStoreFactory:
+    """Factory class for creating session store backends."""
+
+    # Backends are imported on first use, so e.g. redis is only loaded when selected
+    _stores = {
+        "sqlite": "db.sqlite_db:SQLiteSessionStore",
+        "memory": "db.memory_store:InMemorySessionStore",
+        "redis": "db.redis_store:RedisSessionStore",
+    }
+
+    @classmethod
+    def register(cls, backend: str, store_class):
+        cls._stores[backend] = store_class
+
+    @classmethod
+    def create_store(cls, backend: str) -> SessionStore:
+        if backend not in cls._stores:
+            raise ValueError(f"Invalid session backend: {backend}")
+        return load_object(cls._stores[backend])()
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Returns the process-wide store for SESSION_BACKEND, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStoreFactory.create_store(SESSION_BACKEND)
+        return _store
+
+
+def set_session_store(store: SessionStore):
+    """Replaces the process-wide store, e.g. with an InMemorySessionStore in tests."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def upsert_session_to_db(
+    session_id: str,
+    collected_data: dict,
+    current_question: str,
+    current_node: str,
+    expected_version: Optional[int] = None,
+    completed: Optional[bool] = None,
+    form_id: Optional[str] = None,
+    form_version: Optional[str] = None,
+) -> int:
+    with timed("db_upsert", SESSION_BACKEND, current_node):
+        return get_session_store().upsert(
+            session_id,
+            collected_data,
+            current_question,
+            current_node,
+            expected_version,
+            completed,
+            form_id,
+            form_version,
+        )
+
+
+def fetch_session_from_db(session_id: str) -> Optional[dict]:
+    with timed("db_fetch", SESSION_BACKEND):
+        return get_session_store().fetch(session_id)
+
+
+def append_session_events(
+    session_id: str,
+    events: list,
+    current_question: str,
+    current_node: str,
+    expected_version: Optional[int] = None,
+    completed: Optional[bool] = None,
+) -> int:
+    with timed("db_append", SESSION_BACKEND, current_node):
+        return get_session_store().append_events(
+            session_id,
+            events,
+            current_question,
+            current_node,
+            expected_version,
+            completed,
+        )
+
+
+def record_session_events(session_id: str, events: list):
+    with timed("db_append", SESSION_BACKEND):
+        get_session_store().record_events(session_id, events)
@@ -1,10 +1,41 @@
 import sqlite3
 import json
-from typing import Optional
+import queue
+import threading
+import time
+import zlib
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
 from dataclasses import dataclass
+from db.base_store import SessionStore, StaleSessionError
+from db.events import apply_events, carries_secret, journaled
+from helpers.config import (
+    SESSION_DB_FILE,
+    SESSION_DB_POOL_SIZE,
+    SESSION_CACHE_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SYNCHRONOUS,
+    SESSION_SNAPSHOT_EVERY,
+)
 
 # Define SQLite database file
-DB_FILE = "./db/registration.db"
+DB_FILE = SESSION_DB_FILE
+
+# Columns added after the first release, with their types
+MIGRATED_COLUMNS = {
+    "version": "INTEGER",
+    "created_at": "REAL",
+    "updated_at": "REAL",
+    "completed": "INTEGER",
+    "snapshot_event_id": "INTEGER",
+    "tail_events": "INTEGER",
+    "form_id": "TEXT",
+    "form_version": "TEXT",
+}
+EVENTS_PAGE_SIZE = 1000
 
 
 @dataclass
@@ -15,68 +46,620 @@ class RegistrationState:
     current_node: str
 
 
-# Initialize the database & table if not exists
-def init_db():
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS sessions (
-                session_id TEXT PRIMARY KEY,
-                collected_data TEXT,
-                current_question TEXT,
-                current_node TEXT
-            )
-            """
+class ConnectionPool:
+    """A fixed-size pool of SQLite connections configured for concurrent access."""
+
+    def __init__(self, db_file: str, size: int = SESSION_DB_POOL_SIZE):
+        self.db_file = db_file
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(None)  # Connections are opened on first use
+
+    def _connect(self) -> sqlite3.Connection:
+        # Statements are compiled once per connection and reused from its cache
+        conn = sqlite3.connect(
+            self.db_file, check_same_thread=False, cached_statements=64
         )
-        conn.commit()
+        # Must precede WAL: auto_vacuum can only be chosen before the file is
+        # initialized. Lets maintenance reclaim free pages in small increments.
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            if conn is None:
+                conn = self._connect()
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while not self._pool.empty():
+            conn = self._pool.get_nowait()
+            if conn is not None:
+                conn.close()
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store on a pooled, WAL-mode SQLite database with a write-through
+    LRU of hot sessions, so fetches skip decoding the answers and folding in events.
+
+    With several processes on one database file, the LRU may hold an older
+    version of a session, so fetches check the row's version (a primary key
+    lookup) before serving it, and conditional writes fail with
+    StaleSessionError. Set SESSION_CACHE_SIZE=0 to always read the whole row.
+
+    Answers are journaled in `session_events`. A session's `collected_data`
+    column is a snapshot as of `snapshot_event_id`; reads fold the events
+    after it on top, and it is rewritten once `snapshot_every` events have
+    piled up. So most writes append a few small rows instead of rewriting
+    the whole blob.
+    """
+
+    def __init__(
+        self,
+        db_file: str = DB_FILE,
+        pool_size: int = SESSION_DB_POOL_SIZE,
+        cache_size: int = SESSION_CACHE_SIZE,
+        snapshot_every: int = SESSION_SNAPSHOT_EVERY,
+    ):
+        self.pool = ConnectionPool(db_file, pool_size)
+        self.cache_size = cache_size
+        self.snapshot_every = snapshot_every
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.init_db()
+
+    # Initialize the database & tables if not exists
+    def init_db(self):
+        with self.pool.connection() as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                logging.warning(
+                    f"{self.pool.db_file} predates incremental auto-vacuum; run VACUUM once to enable it."
+                )
+
+        with self.pool.connection() as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    collected_data TEXT,
+                    current_question TEXT,
+                    current_node TEXT,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL DEFAULT 0,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    snapshot_event_id INTEGER NOT NULL DEFAULT 0,
+                    tail_events INTEGER NOT NULL DEFAULT 0,
+                    form_id TEXT NOT NULL DEFAULT '',
+                    form_version TEXT NOT NULL DEFAULT ''
+                )
+                """
+            )
+            # Bring databases created by older versions up to date
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+            for column, column_type in MIGRATED_COLUMNS.items():
+                if column not in columns:
+                    default = "''" if column_type == "TEXT" else "0"
+                    conn.execute(
+                        f"ALTER TABLE sessions ADD COLUMN {column} {column_type} NOT NULL DEFAULT {default}"
+                    )
+            if "updated_at" not in columns:
+                # Don't let the sweeper expire every pre-existing session at once
+                now = time.time()
+                conn.execute("UPDATE sessions SET created_at = ?, updated_at = ?", (now, now))
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_completed_updated ON sessions (completed, updated_at)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS session_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    node TEXT,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_session_events_session ON session_events (session_id, id)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions_archive (
+                    session_id TEXT PRIMARY KEY,
+                    data BLOB,
+                    created_at REAL,
+                    completed_at REAL,
+                    archived_at REAL
+                )
+                """
+            )
+
+    def _cache_get(self, session_id: str) -> Optional[dict]:
+        with self._cache_lock:
+            session = self._cache.get(session_id)
+            if session is not None:
+                self._cache.move_to_end(session_id)
+            return session
+
+    def _cache_put(self, session: dict):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[session["session_id"]] = session
+            self._cache.move_to_end(session["session_id"])
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_evict(self, session_id: str):
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
 
+    @staticmethod
+    def _copy(session: dict) -> dict:
+        # Callers mutate collected_data in place, so never hand out cached dicts
+        return {**session, "collected_data": dict(session["collected_data"])}
 
-# Insert or update a session in SQLite
-def upsert_session_to_db(
-    session_id: str, collected_data: dict, current_question: str, current_node: str
-):
-    collected_data_json = json.dumps(collected_data)
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
+    @staticmethod
+    def _tail(conn: sqlite3.Connection, session_id: str, snapshot_event_id: int) -> list:
+        """The session's events after its snapshot."""
+        return [
+            json.loads(row[0])
+            for row in conn.execute(
+                "SELECT data FROM session_events WHERE session_id = ? AND id > ? ORDER BY id",
+                (session_id, snapshot_event_id),
+            )
+        ]
+
+    @staticmethod
+    def _insert_events(conn: sqlite3.Connection, session_id: str, events: list, now: float):
+        conn.executemany(
             """
-            INSERT INTO sessions (session_id, collected_data, current_question, current_node)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(session_id) DO UPDATE SET
-                collected_data = excluded.collected_data,
-                current_question = excluded.current_question,
-                current_node = excluded.current_node
+            INSERT INTO session_events (session_id, type, node, data, created_at)
+            VALUES (?, ?, ?, ?, ?)
             """,
-            (session_id, collected_data_json, current_question, current_node),
+            [
+                (session_id, event["type"], event.get("node"), json.dumps(journaled(event)), now)
+                for event in events
+            ],
         )
-        conn.commit()
 
+    # Insert or update a session in SQLite
+    def upsert(
+        self,
+        session_id: str,
+        collected_data: dict,
+        current_question: str,
+        current_node: str,
+        expected_version: Optional[int] = None,
+        completed: Optional[bool] = None,
+        form_id: Optional[str] = None,
+        form_version: Optional[str] = None,
+    ) -> int:
+        cached = self._cache_get(session_id)
+        now = time.time()
+        flag = None if completed is None else int(completed)  # None keeps the stored flag
+        with self.pool.connection() as conn, conn:
+            if expected_version is None:
+                conn.execute(
+                    """
+                    INSERT INTO sessions (session_id, collected_data, current_question, current_node,
+                        version, created_at, updated_at, completed, form_id, form_version)
+                    VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+                    ON CONFLICT(session_id) DO UPDATE SET
+                        collected_data = excluded.collected_data,
+                        current_question = excluded.current_question,
+                        current_node = excluded.current_node,
+                        version = sessions.version + 1,
+                        updated_at = excluded.updated_at,
+                        completed = COALESCE(?, sessions.completed),
+                        snapshot_event_id = (
+                            SELECT COALESCE(MAX(id), 0) FROM session_events
+                            WHERE session_id = excluded.session_id
+                        ),
+                        tail_events = 0
+                    """,
+                    (
+                        session_id,
+                        json.dumps(collected_data),
+                        current_question,
+                        current_node,
+                        now,
+                        now,
+                        int(bool(completed)),
+                        form_id or "",
+                        form_version or "",
+                        flag,
+                    ),
+                )
+                # Same transaction, so this is the version we just wrote
+                new_version, form_id, form_version = conn.execute(
+                    "SELECT version, form_id, form_version FROM sessions WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+            elif expected_version == 0:
+                try:
+                    conn.execute(
+                        """
+                        INSERT INTO sessions (session_id, collected_data, current_question, current_node,
+                            version, created_at, updated_at, completed, form_id, form_version)
+                        VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            session_id,
+                            json.dumps(collected_data),
+                            current_question,
+                            current_node,
+                            now,
+                            now,
+                            int(bool(completed)),
+                            form_id or "",
+                            form_version or "",
+                        ),
+                    )
+                except sqlite3.IntegrityError:
+                    raise StaleSessionError(session_id)
+                new_version = 1
+            else:
+                if (
+                    cached is not None
+                    and cached["version"] == expected_version
+                    and cached["collected_data"] == collected_data
+                ):
+                    # Only the position in the form changed; skip re-serializing the answers
+                    cursor = conn.execute(
+                        """
+                        UPDATE sessions SET current_question = ?, current_node = ?,
+                            version = version + 1, updated_at = ?, completed = COALESCE(?, completed)
+                        WHERE session_id = ? AND version = ?
+                        """,
+                        (
+                            current_question,
+                            current_node,
+                            now,
+                            flag,
+                            session_id,
+                            expected_version,
+                        ),
+                    )
+                else:
+                    cursor = conn.execute(
+                        """
+                        UPDATE sessions SET collected_data = ?, current_question = ?, current_node = ?,
+                            version = version + 1, updated_at = ?, completed = COALESCE(?, completed),
+                            snapshot_event_id = (
+                                SELECT COALESCE(MAX(id), 0) FROM session_events WHERE session_id = ?
+                            ),
+                            tail_events = 0
+                        WHERE session_id = ? AND version = ?
+                        """,
+                        (
+                            json.dumps(collected_data),
+                            current_question,
+                            current_node,
+                            now,
+                            flag,
+                            session_id,
+                            session_id,
+                            expected_version,
+                        ),
+                    )
+                if cursor.rowcount == 0:
+                    # Updated elsewhere, expired or archived since it was fetched
+                    self._cache_evict(session_id)
+                    raise StaleSessionError(session_id)
+                new_version = expected_version + 1
+                if cached is None:
+                    return new_version  # The form pin wasn't read; leave it to the next fetch
+                form_id, form_version = cached["form_id"], cached["form_version"]
 
-# Fetch a session from SQLite & return as a dictionary
-def fetch_session_from_db(session_id: str) -> Optional[dict]:
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT session_id, collected_data, current_question, current_node FROM sessions WHERE session_id = ?",
-            (session_id,),
+        self._cache_put(
+            {
+                "session_id": session_id,
+                "collected_data": dict(collected_data),
+                "current_question": current_question,
+                "current_node": current_node,
+                "version": new_version,
+                "form_id": form_id or None,
+                "form_version": form_version or None,
+            }
         )
-        result = cursor.fetchone()
-
-    if result:
-        session_id, collected_data_json, current_question, current_node = result
-        collected_data = json.loads(
-            collected_data_json
-        )  # Convert JSON string back to dict
-        return {
+        return new_version
+
+    def append_events(
+        self,
+        session_id: str,
+        events: list,
+        current_question: str,
+        current_node: str,
+        expected_version: Optional[int] = None,
+        completed: Optional[bool] = None,
+    ) -> int:
+        """Journals the events and moves the session, snapshotting it when the tail is long."""
+        cached = self._cache_get(session_id)
+        now = time.time()
+        with self.pool.connection() as conn, conn:
+            cursor = conn.execute(
+                """
+                UPDATE sessions SET current_question = ?, current_node = ?, version = version + 1,
+                    updated_at = ?, completed = COALESCE(?, completed), tail_events = tail_events + ?
+                WHERE session_id = ? AND (? IS NULL OR version = ?)
+                """,
+                (
+                    current_question,
+                    current_node,
+                    now,
+                    None if completed is None else int(completed),
+                    len(events),
+                    session_id,
+                    expected_version,
+                    expected_version,
+                ),
+            )
+            if cursor.rowcount == 0:
+                self._cache_evict(session_id)
+                raise StaleSessionError(session_id)
+            self._insert_events(conn, session_id, events, now)
+            # Same transaction, so this is the version we just wrote
+            (
+                new_version,
+                tail_events,
+                snapshot_json,
+                snapshot_event_id,
+                form_id,
+                form_version,
+            ) = conn.execute(
+                """
+                SELECT version, tail_events, collected_data, snapshot_event_id, form_id, form_version
+                FROM sessions WHERE session_id = ?
+                """,
+                (session_id,),
+            ).fetchone()
+
+            if cached is not None and cached["version"] == new_version - 1:
+                collected_data = apply_events(dict(cached["collected_data"]), events)
+            else:
+                # The journaled tail lacks secret values, so the events are folded again
+                collected_data = apply_events(
+                    apply_events(
+                        json.loads(snapshot_json), self._tail(conn, session_id, snapshot_event_id)
+                    ),
+                    events,
+                )
+            if tail_events >= self.snapshot_every or carries_secret(events):
+                # Secret values are only kept in the snapshot
+                conn.execute(
+                    """
+                    UPDATE sessions SET collected_data = ?, tail_events = 0,
+                        snapshot_event_id = (SELECT MAX(id) FROM session_events WHERE session_id = ?)
+                    WHERE session_id = ?
+                    """,
+                    (json.dumps(collected_data), session_id, session_id),
+                )
+
+        self._cache_put(
+            {
+                "session_id": session_id,
+                "collected_data": collected_data,
+                "current_question": current_question,
+                "current_node": current_node,
+                "version": new_version,
+                "form_id": form_id or None,
+                "form_version": form_version or None,
+            }
+        )
+        return new_version
+
+    def record_events(self, session_id: str, events: list):
+        if not events:
+            return
+        with self.pool.connection() as conn, conn:
+            self._insert_events(conn, session_id, events, time.time())
+            conn.execute(
+                "UPDATE sessions SET tail_events = tail_events + ? WHERE session_id = ?",
+                (len(events), session_id),
+            )
+
+    def events(self, session_id: Optional[str] = None) -> Iterator[dict]:
+        """Reads the journal in pages, so no connection is held between them."""
+        last_id = 0
+        while True:
+            with self.pool.connection() as conn:
+                if session_id is None:
+                    rows = conn.execute(
+                        "SELECT id, session_id, data FROM session_events WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, EVENTS_PAGE_SIZE),
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        """
+                        SELECT id, session_id, data FROM session_events
+                        WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?
+                        """,
+                        (session_id, last_id, EVENTS_PAGE_SIZE),
+                    ).fetchall()
+            for event_id, event_session_id, data in rows:
+                yield {**json.loads(data), "id": event_id, "session_id": event_session_id}
+            if len(rows) < EVENTS_PAGE_SIZE:
+                return
+            last_id = rows[-1][0]
+
+    def upsert_many(self, sessions: list) -> int:
+        """Inserts new sessions in a single transaction."""
+        now = time.time()
+        with self.pool.connection() as conn, conn:
+            conn.executemany(
+                """
+                INSERT INTO sessions (session_id, collected_data, current_question, current_node,
+                    version, created_at, updated_at, completed, form_id, form_version)
+                VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        session["session_id"],
+                        json.dumps(session["collected_data"]),
+                        session["current_question"],
+                        session["current_node"],
+                        now,
+                        now,
+                        int(session.get("completed", False)),
+                        session.get("form_id") or "",
+                        session.get("form_version") or "",
+                    )
+                    for session in sessions
+                ],
+            )
+        return len(sessions)
+
+    # Fetch a session & return as a dictionary
+    def fetch(self, session_id: str) -> Optional[dict]:
+        cached = self._cache_get(session_id)
+        with self.pool.connection() as conn:
+            if cached is not None:
+                # Another process may have written the session since it was cached
+                row = conn.execute(
+                    "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                if row is not None and row[0] == cached["version"]:
+                    return self._copy(cached)
+                self._cache_evict(session_id)
+                if row is None:
+                    return None
+
+            result = conn.execute(
+                """
+                SELECT session_id, collected_data, current_question, current_node, version,
+                    snapshot_event_id, form_id, form_version
+                FROM sessions WHERE session_id = ?
+                """,
+                (session_id,),
+            ).fetchone()
+            if not result:
+                return None  # Session not found
+
+            (
+                session_id,
+                collected_data_json,
+                current_question,
+                current_node,
+                version,
+                snapshot_event_id,
+                form_id,
+                form_version,
+            ) = result
+            tail = self._tail(conn, session_id, snapshot_event_id)
+
+        session = {
             "session_id": session_id,
-            "collected_data": collected_data,
+            "collected_data": apply_events(json.loads(collected_data_json), tail),
             "current_question": current_question,
             "current_node": current_node,
+            "version": version,
+            "form_id": form_id or None,
+            "form_version": form_version or None,
         }
+        self._cache_put(session)
+        return self._copy(session)
+
+    def expire_idle(self, ttl: float, limit: int) -> int:
+        """Deletes up to `limit` unfinished sessions idle for longer than `ttl` seconds."""
+        with self.pool.connection() as conn, conn:
+            session_ids = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT session_id FROM sessions WHERE completed = 0 AND updated_at < ? LIMIT ?",
+                    (time.time() - ttl, limit),
+                )
+            ]
+            conn.executemany(
+                "DELETE FROM sessions WHERE session_id = ?", [(s,) for s in session_ids]
+            )
+            conn.executemany(
+                "DELETE FROM session_events WHERE session_id = ?", [(s,) for s in session_ids]
+            )
+        for session_id in session_ids:
+            self._cache_evict(session_id)
+        return len(session_ids)
+
+    def archive_completed(self, grace: float, limit: int) -> int:
+        """
+        Moves up to `limit` sessions completed and untouched for `grace`
+        seconds to the compressed archive table. Until then they can still
+        be edited from the summary screen. Their journal is kept, for audit
+        and replay.
+        """
+        now = time.time()
+        with self.pool.connection() as conn, conn:
+            rows = conn.execute(
+                """
+                SELECT session_id, collected_data, current_question, current_node, version,
+                    created_at, updated_at, snapshot_event_id, form_id, form_version
+                FROM sessions WHERE completed = 1 AND updated_at < ? LIMIT ?
+                """,
+                (now - grace, limit),
+            ).fetchall()
+            conn.executemany(
+                "INSERT OR REPLACE INTO sessions_archive VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        row[0],
+                        zlib.compress(
+                            json.dumps(
+                                {
+                                    "session_id": row[0],
+                                    "collected_data": apply_events(
+                                        json.loads(row[1]), self._tail(conn, row[0], row[7])
+                                    ),
+                                    "current_question": row[2],
+                                    "current_node": row[3],
+                                    "version": row[4],
+                                    "form_id": row[8] or None,
+                                    "form_version": row[9] or None,
+                                }
+                            ).encode("utf-8")
+                        ),
+                        row[5],
+                        row[6],
+                        now,
+                    )
+                    for row in rows
+                ],
+            )
+            conn.executemany(
+                "DELETE FROM sessions WHERE session_id = ?", [(row[0],) for row in rows]
+            )
+        for row in rows:
+            self._cache_evict(row[0])
+        return len(rows)
 
-    return None  # Session not found
+    def fetch_archived(self, session_id: str) -> Optional[dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT data FROM sessions_archive WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
 
+    def reclaim_space(self, pages: int) -> int:
+        """Returns up to `pages` free pages to the filesystem."""
+        with self.pool.connection() as conn:
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free_pages:
+                return 0
+            # executescript steps the pragma to completion; execute() frees one page
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            return free_pages - conn.execute("PRAGMA freelist_count").fetchone()[0]
 
-# Initialize database on import
-init_db()
+    def close(self):
+        self.pool.close()
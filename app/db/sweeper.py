@@ -0,0 +1,75 @@
+import asyncio
+import contextlib
+import logging
+from typing import Optional
+from db.session_store import get_session_store
+from helpers.config import (
+    ARCHIVE_GRACE,
+    SESSION_TTL,
+    SESSION_SWEEP_INTERVAL,
+    SESSION_SWEEP_BATCH,
+    SESSION_VACUUM_EVERY,
+    SESSION_VACUUM_PAGES,
+)
+
+
+class SessionSweeper:
+    """
+    Background task that expires idle sessions, archives completed ones and
+    reclaims free pages. Each tick touches at most `batch` sessions per step
+    and runs off the event loop, so it never stalls request handling.
+    """
+
+    def __init__(
+        self,
+        interval: float = SESSION_SWEEP_INTERVAL,
+        ttl: float = SESSION_TTL,
+        grace: float = ARCHIVE_GRACE,
+        batch: int = SESSION_SWEEP_BATCH,
+        vacuum_every: int = SESSION_VACUUM_EVERY,
+        vacuum_pages: int = SESSION_VACUUM_PAGES,
+    ):
+        self.interval = interval
+        self.ttl = ttl
+        self.grace = grace
+        self.batch = batch
+        self.vacuum_every = vacuum_every
+        self.vacuum_pages = vacuum_pages
+        self.ticks = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def tick(self) -> dict:
+        """Runs one bounded round of maintenance."""
+        store = get_session_store()
+        self.ticks += 1
+        result = {
+            "expired": store.expire_idle(self.ttl, self.batch),
+            "archived": store.archive_completed(self.grace, self.batch),
+            "reclaimed_pages": (
+                store.reclaim_space(self.vacuum_pages)
+                if self.vacuum_every and self.ticks % self.vacuum_every == 0
+                else 0
+            ),
+        }
+        if any(result.values()):
+            logging.info(f"[sweeper] {result}")
+        return result
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.tick)
+            except Exception as e:
+                logging.error(f"[sweeper] Maintenance failed: {str(e)}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
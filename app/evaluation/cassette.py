@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+import httpx
+
+MODES = ("record", "replay", "auto")
+# Recorded bodies are stored decoded, so only these headers are replayed
+REPLAYED_HEADERS = ("content-type",)
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+class Cassette:
+    """
+    Records LLM HTTP exchanges to a JSONL file and replays them.
+
+    Requests are keyed by method, URL and body (never headers, so API keys
+    stay out of the file). In "record" mode every request goes to the
+    provider and is saved; in "replay" mode only recorded responses are
+    served; "auto" replays what it has and records the rest.
+    """
+
+    def __init__(self, path: str, mode: str = "auto"):
+        if mode not in MODES:
+            raise ValueError(f"Invalid cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self._entries: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_seconds = 0.0
+
+        if mode == "record" and os.path.exists(path):
+            os.remove(path)  # Re-record from scratch
+        elif os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    @staticmethod
+    def key(request: httpx.Request) -> str:
+        digest = hashlib.sha256()
+        digest.update(request.method.encode())
+        digest.update(str(request.url).encode())
+        digest.update(request.content)
+        return digest.hexdigest()
+
+    def lookup(self, request: httpx.Request) -> Optional[httpx.Response]:
+        if self.mode == "record":
+            return None
+        entry = self._entries.get(self.key(request))
+        if entry is None:
+            if self.mode == "replay":
+                raise CassetteMiss(f"No recording for {request.method} {request.url}")
+            return None
+
+        self._account(entry, hit=True)
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            content=entry["body"].encode("utf-8"),
+            request=request,
+        )
+
+    def record(self, request: httpx.Request, response: httpx.Response, seconds: float):
+        entry = {
+            "key": self.key(request),
+            "method": request.method,
+            "url": str(request.url),
+            "status": response.status_code,
+            "headers": {
+                name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers
+            },
+            "body": response.text,
+            "seconds": seconds,
+            "usage": _usage(response.text),
+        }
+        self._account(entry, hit=False)
+        if response.status_code >= 400:
+            return  # Don't replay transient provider errors
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def _account(self, entry: dict, hit: bool):
+        usage = entry.get("usage") or {}
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+            self.llm_seconds += entry.get("seconds", 0.0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "llm_seconds": self.llm_seconds,
+            }
+
+    def transports(self, inner: httpx.BaseTransport, async_inner: httpx.AsyncBaseTransport):
+        """(sync, async) transports serving this cassette in front of `inner`."""
+        return CassetteTransport(self, inner), AsyncCassetteTransport(self, async_inner)
+
+
+def _usage(body: str) -> dict:
+    try:
+        usage = json.loads(body).get("usage") or {}
+    except (ValueError, AttributeError):
+        return {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+    }
+
+
+class CassetteTransport(httpx.BaseTransport):
+    def __init__(self, cassette: Cassette, inner: httpx.BaseTransport):
+        self.cassette = cassette
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        response = self.cassette.lookup(request)
+        if response is not None:
+            return response
+
+        start = time.perf_counter()
+        response = self.inner.handle_request(request)
+        response.read()
+        self.cassette.record(request, response, time.perf_counter() - start)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cassette: Cassette, inner: httpx.AsyncBaseTransport):
+        self.cassette = cassette
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        response = self.cassette.lookup(request)
+        if response is not None:
+            return response
+
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        await response.aread()
+        self.cassette.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
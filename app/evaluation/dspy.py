@@ -1,12 +1,16 @@
-import mlflow
-from typing import List, Dict
+import argparse
+import asyncio
+from typing import List, Dict, Optional
 
-# Import your custom DSPyValidator
-from app.validation.dspy_validator import DSPyValidator  # Update to use absolute import
+from evaluation.harness import compare_engines, log_to_mlflow, print_comparison
+from evaluation.cassette import Cassette
+from evaluation.replay import journal_samples
+from helpers.config import MLFLOW_EXPERIMENT_NAME
 
 # Example test dataset
 # Each sample has: question, user_answer, expected_status, expected_formatted_answer
-test_data = [
+# Larger datasets live in evaluation/datasets and run through evaluation.harness.
+test_data: List[Dict[str, str]] = [
     {
         "question": "What is your email address?",
         "user_answer": "paul@gmail.com",
@@ -16,64 +20,35 @@ test_data = [
     # Add more test samples...
 ]
 
-def run_evaluation():
+def run_evaluation(
+    cassette_path: str = "evaluation/cassettes/dspy.jsonl",
+    journal_limit: Optional[int] = None,
+):
     """
-    Evaluates the DSPyValidator on a small dataset,
+    Evaluates the DSPyValidator on a small dataset, plus up to
+    `journal_limit` samples replayed from the session journal,
     logging metrics to MLflow.
     """
-    # Initialize your validator
-    validator = DSPyValidator()
-
-    # Start a new MLflow run for the entire evaluation
-    with mlflow.start_run(run_name="dspy_evaluation"):
-        total_samples = len(test_data)
-        correct_status = 0
-        correct_format = 0
-
-        for i, sample in enumerate(test_data):
-            question = sample["question"]
-            user_answer = sample["user_answer"]
-            expected_status = sample["expected_status"]
-            expected_formatted = sample["expected_formatted"]
-
-            # Use the DSPyValidator to validate
-            result = validator.validate(question, user_answer)
-            predicted_status = result["status"]
-            predicted_formatted = result["formatted_answer"]
-
-            # Compare predictions with expected
-            status_is_correct = (predicted_status == expected_status)
-            format_is_correct = (predicted_formatted == expected_formatted)
-
-            if status_is_correct:
-                correct_status += 1
-            if format_is_correct:
-                correct_format += 1
-
-            # Log each sample's details as a nested run or as a param
-            with mlflow.start_run(
-                nested=True, 
-                run_name=f"sample_{i}", 
-                description=f"Evaluation of sample #{i}"
-            ):
-                mlflow.log_param("question", question)
-                mlflow.log_param("user_answer", user_answer)
-                mlflow.log_param("predicted_status", predicted_status)
-                mlflow.log_param("expected_status", expected_status)
-                mlflow.log_param("predicted_formatted", predicted_formatted)
-                mlflow.log_param("expected_formatted", expected_formatted)
-
-                mlflow.log_metric("status_correct", 1 if status_is_correct else 0)
-                mlflow.log_metric("format_correct", 1 if format_is_correct else 0)
-
-        # After all samples, log aggregate metrics
-        mlflow.log_metric("overall_status_accuracy", correct_status / total_samples)
-        mlflow.log_metric("overall_format_accuracy", correct_format / total_samples)
-
-        print(f"Evaluation complete on {total_samples} samples.")
-        print(f"Status accuracy: {correct_status / total_samples:.2%}")
-        print(f"Format accuracy: {correct_format / total_samples:.2%}")
+    samples = test_data
+    dataset = "evaluation.dspy.test_data"
+    if journal_limit:
+        samples = test_data + journal_samples(journal_limit)
+        dataset += "+journal"
+    summaries, records = asyncio.run(
+        compare_engines(["dspy"], samples, Cassette(cassette_path), concurrency=8)
+    )
+    log_to_mlflow(summaries, records, dataset, MLFLOW_EXPERIMENT_NAME)
+
+    summary = summaries["dspy"]
+    print(f"Evaluation complete on {summary['samples']} samples.")
+    print(f"Status accuracy: {summary['status_accuracy']:.2%}")
+    print(f"Format accuracy: {summary['format_accuracy']:.2%}")
+    print_comparison(summaries)
 
 
 if __name__ == "__main__":
-    run_evaluation()
+    parser = argparse.ArgumentParser(description="Evaluate the DSPy validator.")
+    parser.add_argument(
+        "--journal", type=int, metavar="N", help="Add up to N samples replayed from the session journal"
+    )
+    run_evaluation(journal_limit=parser.parse_args().journal)
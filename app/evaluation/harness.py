@@ -0,0 +1,225 @@
+"""
+Evaluates validation engines side by side on a JSONL dataset.
+
+Each line of the dataset is a sample:
+
+    {"question": "...", "user_answer": "...", "expected_status": "valid",
+     "expected_formatted": "..."}
+
+Samples run concurrently (bounded by --concurrency) through each engine in
+turn. LLM HTTP traffic goes through a cassette, so a recorded run can be
+replayed offline in seconds with `--mode replay`. Accuracy, latency and
+token cost per engine are printed and, unless --no-mlflow, logged to a
+single MLflow run with one batched call.
+
+    python -m evaluation.harness --dataset evaluation/datasets/registration.jsonl \\
+        --engines dspy,chatgpt --cassette evaluation/cassettes/registration.jsonl
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+from evaluation.cassette import Cassette
+from helpers.config import MLFLOW_EXPERIMENT_NAME
+
+DEFAULT_DATASET = "evaluation/datasets/registration.jsonl"
+DEFAULT_CASSETTE = "evaluation/cassettes/registration.jsonl"
+MAX_METRICS_PER_CALL = 1000  # MLflow's log_batch limit
+
+# USD per million (prompt, completion) tokens
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+
+def load_dataset(path: str, limit: Optional[int] = None) -> List[dict]:
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                samples.append(json.loads(line))
+                if limit and len(samples) >= limit:
+                    break
+    return samples
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def _create_validator(engine: str):
+    from validation.factory import ValidatorFactory
+
+    validator = ValidatorFactory.create_validator(engine)
+    if engine == "dspy":
+        import dspy
+
+        # DSPy's local response cache would hide calls from the cassette
+        dspy.settings.lm.cache = False
+    return validator
+
+
+async def evaluate_engine(
+    engine: str, samples: List[dict], concurrency: int
+) -> List[dict]:
+    """Validates every sample with one engine; returns a record per sample."""
+    validator = _create_validator(engine)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_sample(index: int, sample: dict) -> dict:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await validator.avalidate(sample["question"], sample["user_answer"])
+            except Exception as e:
+                result = {"status": "error", "feedback": str(e), "formatted_answer": ""}
+            seconds = time.perf_counter() - start
+        return {
+            "engine": engine,
+            "sample": index,
+            "question": sample["question"],
+            "user_answer": sample["user_answer"],
+            "expected_status": sample["expected_status"],
+            "predicted_status": result["status"],
+            "expected_formatted": sample.get("expected_formatted"),
+            "predicted_formatted": result["formatted_answer"],
+            "status_correct": result["status"] == sample["expected_status"],
+            "format_correct": result["formatted_answer"] == sample.get("expected_formatted"),
+            "seconds": seconds,
+        }
+
+    return await asyncio.gather(*(run_sample(i, s) for i, s in enumerate(samples)))
+
+
+def summarize(records: List[dict], usage: dict, model: str, wall_seconds: float) -> dict:
+    total = len(records)
+    latencies = [record["seconds"] for record in records]
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return {
+        "samples": total,
+        "status_accuracy": sum(r["status_correct"] for r in records) / total,
+        "format_accuracy": sum(r["format_correct"] for r in records) / total,
+        "errors": sum(r["predicted_status"] == "error" for r in records),
+        "latency_p50_ms": _percentile(latencies, 0.50) * 1000,
+        "latency_p95_ms": _percentile(latencies, 0.95) * 1000,
+        # Provider time as recorded, so replayed runs still report real LLM latency
+        "llm_seconds_recorded": usage["llm_seconds"],
+        "wall_seconds": wall_seconds,
+        "prompt_tokens": usage["prompt_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+        "cost_usd": (
+            usage["prompt_tokens"] * prompt_price + usage["completion_tokens"] * completion_price
+        ) / 1_000_000,
+        "cassette_hits": usage["hits"],
+        "cassette_misses": usage["misses"],
+    }
+
+
+def _engine_model(engine: str) -> str:
+    if engine == "dspy":
+        from validation.dspy_validator import LM_MODEL
+
+        return LM_MODEL
+    if engine == "chatgpt":
+        from validation.chatgpt_validator import ChatGPTValidator
+
+        return ChatGPTValidator.model
+    return engine
+
+
+async def compare_engines(
+    engines: List[str], samples: List[dict], cassette: Cassette, concurrency: int
+):
+    """Runs each engine in turn, so cassette usage can be attributed per engine."""
+    from validation.http_pool import HTTPConnectionPool, pooled_transports, set_http_pool
+
+    transport, async_transport = cassette.transports(*pooled_transports())
+    set_http_pool(HTTPConnectionPool(transport=transport, async_transport=async_transport))
+
+    summaries: Dict[str, dict] = {}
+    records: List[dict] = []
+    for engine in engines:
+        before = cassette.stats()
+        start = time.perf_counter()
+        engine_records = await evaluate_engine(engine, samples, concurrency)
+        wall_seconds = time.perf_counter() - start
+        after = cassette.stats()
+        usage = {key: after[key] - before[key] for key in after}
+        summaries[engine] = summarize(engine_records, usage, _engine_model(engine), wall_seconds)
+        records.extend(engine_records)
+    return summaries, records
+
+
+def log_to_mlflow(
+    summaries: Dict[str, dict], records: List[dict], dataset: str, experiment_name: str
+):
+    """Logs every engine's aggregates and the per-sample table to one MLflow run."""
+    from mlflow.entities import Metric, Param
+    from mlflow.tracking import MlflowClient
+
+    client = MlflowClient()
+    experiment = client.get_experiment_by_name(experiment_name)
+    experiment_id = (
+        experiment.experiment_id if experiment else client.create_experiment(experiment_name)
+    )
+    run_id = client.create_run(experiment_id, run_name="engine_comparison").info.run_id
+
+    timestamp = int(time.time() * 1000)
+    metrics = [
+        Metric(f"{engine}.{name}", float(value), timestamp, 0)
+        for engine, summary in summaries.items()
+        for name, value in summary.items()
+    ]
+    params = [
+        Param("dataset", dataset),
+        Param("engines", ", ".join(summaries)),
+    ]
+    client.log_batch(run_id, metrics=metrics[:MAX_METRICS_PER_CALL], params=params)
+    for start in range(MAX_METRICS_PER_CALL, len(metrics), MAX_METRICS_PER_CALL):
+        client.log_batch(run_id, metrics=metrics[start : start + MAX_METRICS_PER_CALL])
+    client.log_text(
+        run_id, "\n".join(json.dumps(record) for record in records), "samples.jsonl"
+    )
+    client.set_terminated(run_id)
+    return run_id
+
+
+def print_comparison(summaries: Dict[str, dict]):
+    engines = list(summaries)
+    print(f"{'metric':<24}" + "".join(f"{engine:>16}" for engine in engines))
+    for name in next(iter(summaries.values())):
+        row = "".join(f"{summaries[engine][name]:>16.4g}" for engine in engines)
+        print(f"{name:<24}{row}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--engines", default="dspy,chatgpt")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--limit", type=int, help="Only evaluate the first N samples")
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--mode", choices=["record", "replay", "auto"], default="auto")
+    parser.add_argument("--experiment", default=MLFLOW_EXPERIMENT_NAME)
+    parser.add_argument("--no-mlflow", action="store_true")
+    args = parser.parse_args()
+
+    samples = load_dataset(args.dataset, args.limit)
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+    cassette = Cassette(args.cassette, args.mode)
+
+    summaries, records = asyncio.run(
+        compare_engines(engines, samples, cassette, args.concurrency)
+    )
+    print_comparison(summaries)
+    if not args.no_mlflow:
+        run_id = log_to_mlflow(summaries, records, args.dataset, args.experiment)
+        print(f"Logged to MLflow run {run_id}")
+
+
+if __name__ == "__main__":
+    main()
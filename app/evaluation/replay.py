@@ -0,0 +1,84 @@
+"""
+Turns the session journal into evaluation samples.
+
+Every validated answer and edit in the journal becomes a sample labelled
+with the verdict it got in production, so a new engine or prompt can be
+checked for agreement with real traffic. Redacted answers, errors and
+verdicts settled by the local rules are left out; repeated (question,
+answer) pairs are kept once.
+
+    python -m evaluation.replay --out evaluation/datasets/replayed.jsonl
+    python -m evaluation.harness --dataset evaluation/datasets/replayed.jsonl
+"""
+import argparse
+import json
+import os
+from typing import Iterable, Iterator, Optional
+from db.events import ANSWER_SUBMITTED, ANSWER_VALIDATED, FIELD_EDITED, REDACTED
+
+
+def _sample(answer_event: dict, verdict_event: dict) -> Optional[dict]:
+    if (
+        answer_event["answer"] == REDACTED
+        or verdict_event["status"] == "error"
+        or verdict_event.get("degraded")
+    ):
+        return None
+    return {
+        "question": answer_event["question"],
+        "user_answer": answer_event["answer"],
+        "expected_status": verdict_event["status"],
+        "expected_formatted": verdict_event["formatted_answer"],
+        "session_id": answer_event.get("session_id"),
+    }
+
+
+def replay_samples(events: Iterable[dict], limit: Optional[int] = None) -> Iterator[dict]:
+    """Samples from journal events, as read from `SessionStore.events()`."""
+    submitted = {}  # (session_id, node) -> answer awaiting its verdict
+    seen = set()
+    count = 0
+    for event in events:
+        key = (event.get("session_id"), event["node"])
+        if event["type"] == ANSWER_SUBMITTED:
+            submitted[key] = event
+            continue
+        if event["type"] == ANSWER_VALIDATED and key in submitted:
+            sample = _sample(submitted.pop(key), event)
+        elif event["type"] == FIELD_EDITED:
+            sample = _sample(event, event)
+        else:
+            continue
+
+        if sample is None or (sample["question"], sample["user_answer"]) in seen:
+            continue
+        seen.add((sample["question"], sample["user_answer"]))
+        yield sample
+        count += 1
+        if limit and count >= limit:
+            return
+
+
+def journal_samples(limit: Optional[int] = None) -> list:
+    """Samples from the configured session store's journal."""
+    from db.session_store import get_session_store
+
+    return list(replay_samples(get_session_store().events(), limit))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", default="evaluation/datasets/replayed.jsonl")
+    parser.add_argument("--limit", type=int, help="Stop after N samples")
+    args = parser.parse_args()
+
+    samples = journal_samples(args.limit)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        for sample in samples:
+            f.write(json.dumps(sample) + "\n")
+    print(f"Wrote {len(samples)} samples to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
-from langgraph.graph import StateGraph, END
+from dataclasses import fields, is_dataclass
+from langgraph.graph import StateGraph, START, END
 from helpers.config import GRAPH_OUTPUT_DIR
+from helpers.metrics import timed
+import hashlib
+import json
 import logging
 import os
+import threading
+
+DIAGRAM_FORMATS = {"mermaid": "mmd", "png": "png"}
 
 class BaseGraphManager:
     """A generic graph manager that builds and runs a state machine from a question map."""
@@ -16,8 +23,21 @@ class BaseGraphManager:
         self.question_map = question_map
         self.state_class = state_class
         self.graph = StateGraph(state_class)
+
+        # Transition table mirrored from the StateGraph, so we can step
+        # straight to the successor of a node instead of replaying the graph.
+        self._nodes: dict = {}
+        self._edges: dict = {}
+        self._branches: dict = {}
+        self._entry_point = None
+
+        # Rendered diagrams keyed by (structure hash, format)
+        self._diagrams: dict = {}
+        self._diagram_lock = threading.Lock()
+
         self._build_graph()
         self.compiled_graph = self.graph.compile()
+        self._structure_hash = self._hash_structure()
 
     def _ask_question(self, state, question_text: str):
         """Helper function for node logic."""
@@ -27,6 +47,23 @@ class BaseGraphManager:
             "current_question": question_text,
         }
 
+    def _add_node(self, key: str, action):
+        """Adds a node to the StateGraph and the transition table."""
+        self.graph.add_node(key, action)
+        self._nodes[key] = action
+
+    def _set_entry_point(self, key: str):
+        self.graph.set_entry_point(key)
+        self._entry_point = key
+
+    def _add_edge(self, source: str, target: str):
+        self.graph.add_edge(source, target)
+        self._edges[source] = target
+
+    def _add_conditional_edges(self, source: str, path, path_map: dict):
+        self.graph.add_conditional_edges(source=source, path=path, path_map=path_map)
+        self._branches[source] = (path, path_map)
+
     def _build_graph(self):
         """
         A generic build process that:
@@ -36,59 +73,136 @@ class BaseGraphManager:
         """
         # Create nodes
         for key, question_text in self.question_map.items():
-            self.graph.add_node(
-                key, lambda s, q=question_text: self._ask_question(s, q)
-            )
+            self._add_node(key, lambda s, q=question_text: self._ask_question(s, q))
 
         # Set entry point
         nodes = list(self.question_map.keys())
-        self.graph.set_entry_point(nodes[0])  # First question
+        self._set_entry_point(nodes[0])  # First question
 
         # Linear path from first to last, then END
         for i in range(len(nodes) - 1):
-            self.graph.add_edge(nodes[i], nodes[i + 1])
-        self.graph.add_edge(nodes[-1], END)
+            self._add_edge(nodes[i], nodes[i + 1])
+        self._add_edge(nodes[-1], END)
+
+    def _to_state(self, state: dict):
+        """Coerces a session dict into the graph's state class."""
+        if not is_dataclass(self.state_class):
+            return self.state_class(**state)
+        return self.state_class(
+            **{f.name: state.get(f.name) for f in fields(self.state_class)}
+        )
+
+    def next_node(self, state: dict):
+        """Returns the key of the node following `current_node`, or END."""
+        current_node = state.get("current_node")
+        if not current_node:
+            return self._entry_point
+
+        if current_node in self._branches:
+            path, path_map = self._branches[current_node]
+            return path_map[path(self._to_state(state))]
+
+        return self._edges.get(current_node, END)
 
     def resume_and_step_graph(self, state: dict):
         """Resumes the graph from the current node and advances exactly one step."""
-        current_node = state.get("current_node")
-        execution = self.compiled_graph.stream(state)
-
-        logging.info(f"[{self.name}] Resuming graph at: {current_node}")
+        logging.info(f"[{self.name}] Resuming graph at: {state.get('current_node')}")
 
-        if not current_node:
-            # Start from the beginning
-            try:
-                return next(execution)
-            except StopIteration:
+        with timed("graph_step", question=state.get("current_node")):
+            node_key = self.next_node(state)
+            if node_key is None or node_key == END:
                 logging.info(f"[{self.name}] Graph execution completed.")
                 return None
 
-        # Advance until we find current_node, then yield one more step
-        for step in execution:
-            node_key = list(step.keys())[0]
-            if node_key == current_node:
-                try:
-                    return next(execution)
-                except StopIteration:
-                    return None
-        return None
-
-    def generate_mermaid_diagram(self, filename="graph.png"):
-        """Generate a Mermaid diagram PNG from the compiled LangGraph."""
-
-        os.makedirs(GRAPH_OUTPUT_DIR, exist_ok=True)
-
-        # Get the Mermaid code from the compiled graph
-        png_data = self.compiled_graph.get_graph().draw_mermaid_png()
+            return {node_key: self._nodes[node_key](self._to_state(state))}
+
+    def start_graph(self, state: dict):
+        """Runs the entry node and returns its step."""
+        return self.resume_and_step_graph({**state, "current_node": None})
+
+    def structure_hash(self) -> str:
+        """Hash of the graph's nodes, edges and conditional path maps."""
+        return self._structure_hash
+
+    def _hash_structure(self) -> str:
+        structure = {
+            "entry_point": self._entry_point,
+            "nodes": sorted(self._nodes),
+            "edges": sorted(self._edges.items()),
+            "branches": {
+                source: sorted(path_map.items())
+                for source, (_, path_map) in sorted(self._branches.items())
+            },
+        }
+        payload = json.dumps(structure, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()[:16]
+
+    def mermaid_source(self) -> str:
+        """Builds the Mermaid flowchart from the transition table, without rendering."""
+        lines = ["graph TD;", f"\t{START} --> {self._entry_point};"]
+        for source, target in self._edges.items():
+            lines.append(f"\t{source} --> {target};")
+        for source, (_, path_map) in self._branches.items():
+            for label, target in path_map.items():
+                lines.append(f"\t{source} -. {label} .-> {target};")
+        return "\n".join(lines) + "\n"
+
+    def _render_diagram(self, fmt: str) -> bytes:
+        if fmt == "mermaid":
+            return self.mermaid_source().encode("utf-8")
+        # draw_mermaid_png calls out to the mermaid.ink rendering service
+        return self.compiled_graph.get_graph().draw_mermaid_png()
+
+    def diagram_path(self, fmt: str = "png") -> str:
+        """Content-addressed location of the diagram in GRAPH_OUTPUT_DIR."""
+        filename = f"{self.name}-{self.structure_hash()}.{DIAGRAM_FORMATS[fmt]}"
+        return os.path.join(GRAPH_OUTPUT_DIR, filename)
+
+    def get_diagram(self, fmt: str = "mermaid") -> bytes:
+        """
+        Returns the rendered diagram, checking memory, then disk, then rendering.
+        Diagrams are keyed by the structure hash, so an unchanged graph is
+        rendered once and shared across restarts and replicas using the same
+        GRAPH_OUTPUT_DIR.
+        """
+        if fmt not in DIAGRAM_FORMATS:
+            raise ValueError(f"Unsupported diagram format: {fmt}")
+
+        key = (self.structure_hash(), fmt)
+        cached = self._diagrams.get(key)
+        if cached is not None:
+            return cached
+
+        with self._diagram_lock:
+            if key in self._diagrams:
+                return self._diagrams[key]
+
+            path = self.diagram_path(fmt)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    data = f.read()
+            else:
+                data = self._render_diagram(fmt)
+                os.makedirs(GRAPH_OUTPUT_DIR, exist_ok=True)
+                # Write-then-rename so concurrent replicas never read a partial file
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                logging.info(f"Graph diagram saved at: {path}")
+
+            self._diagrams[key] = data
+            return data
+
+    def generate_mermaid_diagram(self, filename=None):
+        """Generate a Mermaid diagram PNG, reusing the cached render when the graph is unchanged."""
+        data = self.get_diagram("png")
+        if filename is None:
+            return self.diagram_path("png")
 
-        # Save the Mermaid code to a temporary file
-        # Define file path
         png_file = os.path.join(GRAPH_OUTPUT_DIR, filename)
-
-        # Save PNG file
         with open(png_file, "wb") as f:  # "wb" for writing binary files
-            f.write(png_data)
+            f.write(data)
 
         logging.info(f"Graph saved at: {png_file}")
         return png_file
@@ -0,0 +1,72 @@
+from langgraph.graph import END
+from db.sqlite_db import RegistrationState
+from graph.base_graph import BaseGraphManager
+from graph.forms import END as FORM_END, FormDefinition
+
+
+def _flag_set(state, flag: str) -> bool:
+    """Whether a skip flag is set on the session or in its collected data."""
+    if isinstance(state, dict):
+        return bool(state.get(flag) or (state.get("collected_data") or {}).get(flag))
+    return bool((getattr(state, "collected_data", None) or {}).get(flag))
+
+
+class FormGraphManager(BaseGraphManager):
+    """Graph manager compiled from a declarative form definition (see graph.forms)."""
+
+    def __init__(self, definition: FormDefinition):
+        self.definition = definition
+        super().__init__(definition.form_id, definition.question_map, RegistrationState)
+
+    @property
+    def version(self) -> str:
+        return self.definition.version
+
+    def _target(self, node: str) -> str:
+        return END if node == FORM_END else node
+
+    def _skipped(self, node: str, state) -> bool:
+        return any(_flag_set(state, flag) for flag in self.definition.skip_if.get(node, ()))
+
+    def _build_graph(self):
+        """
+        One node per question and one edge per definition edge. An edge into
+        a skippable question becomes a conditional edge that can also jump
+        to any question after it, past every skipped one.
+        """
+        definition = self.definition
+        for key, question_text in self.question_map.items():
+            self._add_node(key, lambda s, q=question_text: self._ask_question(s, q))
+        self._set_entry_point(definition.entry)
+
+        for source, target in definition.edges.items():
+            if target not in definition.skip_if:
+                self._add_edge(source, self._target(target))
+                continue
+
+            candidates = [target]
+            while candidates[-1] in definition.skip_if:
+                candidates.append(definition.edges[candidates[-1]])
+
+            def path(state, first=target):
+                node = first
+                while node in definition.skip_if and self._skipped(node, state):
+                    node = definition.edges[node]
+                return node
+
+            self._add_conditional_edges(
+                source=source,
+                path=path,
+                path_map={node: self._target(node) for node in candidates},
+            )
+
+    def next_node(self, state: dict):
+        """
+        Like BaseGraphManager.next_node, but skip conditions see the whole
+        session, including flags set for the current turn only.
+        """
+        current_node = state.get("current_node")
+        if current_node in self._branches:
+            path, path_map = self._branches[current_node]
+            return path_map[path(state)]
+        return super().next_node(state)
@@ -0,0 +1,318 @@
+"""
+Registry of the forms the API can run, loaded from declarative files.
+
+Each form is a `<form_id>.json` file in FORMS_DIR:
+
+    {
+      "title": "Registration",
+      "entry": "ask_email",
+      "questions": {
+        "ask_email": {"text": "What is your email address?", "rule": "email"},
+        "ask_phone": {"text": "...", "rule": "phone", "skip_if": ["skip_ask_phone"]},
+        ...
+      },
+      "edges": {"ask_email": "ask_phone", ..., "ask_password": "END"}
+    }
+
+`rule` names a rule of validation.rules.RULES_BY_NAME; sessions are
+validated with the rules of the version they are pinned to. A question is skipped
+when any of its `skip_if` flags is set on the session or in its collected
+data; the graph then moves on along the skipped question's edge.
+
+A form's version is the hash of its definition. Graphs are compiled on
+first use and cached per version, and files are re-checked at most every
+FORM_RELOAD_INTERVAL seconds, so editing a file switches new sessions to
+the new version without a restart. Every version is also saved under
+FORM_VERSIONS_DIR, so sessions keep running on the version they started
+on, across restarts and workers. This module doesn't import langgraph;
+compiling the first graph does.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from helpers.config import DEFAULT_FORM, FORM_RELOAD_INTERVAL, FORM_VERSIONS_DIR, FORMS_DIR
+from validation.rules import RULES_BY_NAME
+
+END = "END"  # Edge target that finishes the form
+FORM_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class FormNotFound(LookupError):
+    """Raised for an unknown form, or a form version that is no longer available."""
+
+
+class InvalidForm(ValueError):
+    """Raised when a form definition is malformed."""
+
+
+@dataclass(frozen=True)
+class FormDefinition:
+    form_id: str
+    version: str
+    title: str
+    entry: str
+    question_map: Dict[str, str]  # Node key -> question text, in form order
+    rules: Dict[str, str]  # Node key -> rule name
+    edges: Dict[str, str]  # Node key -> next node key, or END
+    skip_if: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+
+def _canonical(raw: dict) -> bytes:
+    # Key order is kept: it is the order of the questions
+    return json.dumps(raw, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def form_version(raw: dict) -> str:
+    """Hash of a parsed definition; whitespace-only edits keep the version."""
+    return hashlib.sha256(_canonical(raw)).hexdigest()[:16]
+
+
+def parse_form(form_id: str, raw: dict) -> FormDefinition:
+    """Checks a parsed definition file and builds its FormDefinition, or raises InvalidForm."""
+    if not isinstance(raw, dict):
+        raise InvalidForm(f"{form_id}: the definition must be an object")
+    questions = raw.get("questions")
+    if not isinstance(questions, dict) or not questions:
+        raise InvalidForm(f"{form_id}: 'questions' must be a non-empty object")
+
+    question_map, rules, skip_if = {}, {}, {}
+    for key, question in questions.items():
+        if isinstance(question, str):
+            question = {"text": question}
+        if not isinstance(question, dict) or not isinstance(question.get("text"), str):
+            raise InvalidForm(f"{form_id}: question {key} needs a 'text'")
+        question_map[key] = question["text"]
+        if "rule" in question:
+            if question["rule"] not in RULES_BY_NAME:
+                raise InvalidForm(f"{form_id}: unknown rule {question['rule']!r} for {key}")
+            rules[key] = question["rule"]
+        flags = question.get("skip_if", [])
+        if not isinstance(flags, list) or not all(isinstance(flag, str) for flag in flags):
+            raise InvalidForm(f"{form_id}: 'skip_if' of {key} must be a list of flag names")
+        if flags:
+            skip_if[key] = tuple(flags)
+
+    entry = raw.get("entry", next(iter(question_map)))
+    if entry not in question_map:
+        raise InvalidForm(f"{form_id}: unknown entry {entry!r}")
+    if entry in skip_if:
+        raise InvalidForm(f"{form_id}: the entry question can't be skipped")
+
+    edges = raw.get("edges")
+    if edges is None:
+        # Questions in order, as with BaseGraphManager's default graph
+        nodes = list(question_map)
+        edges = dict(zip(nodes, nodes[1:] + [END]))
+    if not isinstance(edges, dict):
+        raise InvalidForm(f"{form_id}: 'edges' must be an object")
+    for source in question_map:
+        if source not in edges:
+            raise InvalidForm(f"{form_id}: question {source} has no outgoing edge")
+    for source, target in edges.items():
+        if source not in question_map or (target != END and target not in question_map):
+            raise InvalidForm(f"{form_id}: edge {source} -> {target} refers to an unknown question")
+
+    # Skipping a chain of questions must still end somewhere
+    for node in skip_if:
+        seen = set()
+        while node in skip_if:
+            if node in seen:
+                raise InvalidForm(f"{form_id}: skippable questions {sorted(seen)} form a cycle")
+            seen.add(node)
+            node = edges[node]
+
+    return FormDefinition(
+        form_id=form_id,
+        version=form_version(raw),
+        title=raw.get("title", form_id),
+        entry=entry,
+        question_map=question_map,
+        rules=rules,
+        edges=dict(edges),
+        skip_if=skip_if,
+    )
+
+
+@dataclass
+class _FormFile:
+    """What was last read from a form's file."""
+
+    mtime_ns: int
+    size: int
+    version: str
+    checked_at: float
+
+
+class FormRegistry:
+    """
+    Loads form definitions from `forms_dir` and hands out their compiled
+    graphs, pinned to a version or at the file's current one.
+    """
+
+    def __init__(
+        self,
+        forms_dir: str = FORMS_DIR,
+        versions_dir: str = FORM_VERSIONS_DIR,
+        reload_interval: float = FORM_RELOAD_INTERVAL,
+    ):
+        self.forms_dir = forms_dir
+        self.versions_dir = versions_dir
+        self.reload_interval = reload_interval
+        self._files: Dict[str, _FormFile] = {}
+        self._definitions: Dict[Tuple[str, str], FormDefinition] = {}
+        self._graphs: dict = {}  # (form_id, version) -> compiled graph manager
+        self._lock = threading.Lock()
+        self._compile_lock = threading.Lock()
+        self.compiles = 0
+        self.reloads = 0
+        self.reload_errors = 0
+
+    def _path(self, form_id: str) -> str:
+        if not FORM_ID_PATTERN.match(form_id):
+            raise FormNotFound(form_id)
+        return os.path.join(self.forms_dir, f"{form_id}.json")
+
+    def _version_path(self, form_id: str, version: str) -> str:
+        return os.path.join(self.versions_dir, f"{form_id}-{version}.json")
+
+    def _register(self, definition: FormDefinition, raw: dict):
+        """Keeps a new version in memory and on disk."""
+        key = (definition.form_id, definition.version)
+        if key in self._definitions:
+            return
+        self._definitions[key] = definition
+
+        path = self._version_path(*key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(self.versions_dir, exist_ok=True)
+            # Write-then-rename so concurrent workers never read a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_canonical(raw))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Couldn't save version {key[1]} of form {key[0]}: {e}")
+
+    def current_version(self, form_id: str = DEFAULT_FORM) -> str:
+        """The version in the form's file, re-reading it when it has changed."""
+        path = self._path(form_id)
+        with self._lock:
+            known = self._files.get(form_id)
+            now = time.monotonic()
+            if known and now - known.checked_at < self.reload_interval:
+                return known.version
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._files.pop(form_id, None)
+                raise FormNotFound(form_id)
+            if known and (stat.st_mtime_ns, stat.st_size) == (known.mtime_ns, known.size):
+                known.checked_at = now
+                return known.version
+
+            try:
+                with open(path, "rb") as f:
+                    raw = json.loads(f.read())
+                definition = parse_form(form_id, raw)
+            except (ValueError, OSError) as e:
+                if known is None:
+                    raise InvalidForm(f"{form_id}: {e}") from e
+                # Keep serving the last good version until the file is fixed
+                self.reload_errors += 1
+                logging.error(f"Keeping version {known.version} of form {form_id}: {e}")
+                known.mtime_ns, known.size, known.checked_at = stat.st_mtime_ns, stat.st_size, now
+                return known.version
+
+            self._register(definition, raw)
+            if known and known.version != definition.version:
+                self.reloads += 1
+                logging.info(f"Form {form_id} reloaded: {known.version} -> {definition.version}")
+            self._files[form_id] = _FormFile(
+                stat.st_mtime_ns, stat.st_size, definition.version, now
+            )
+            return definition.version
+
+    def definition(self, form_id: str = DEFAULT_FORM, version: Optional[str] = None) -> FormDefinition:
+        """The definition of a form version, by default the current one."""
+        version = version or self.current_version(form_id)
+        definition = self._definitions.get((form_id, version))
+        if definition is not None:
+            return definition
+
+        # A version from before a restart, or written by another worker
+        path = self._version_path(form_id, version)
+        try:
+            with open(path, "rb") as f:
+                raw = json.loads(f.read())
+        except FileNotFoundError:
+            raise FormNotFound(f"{form_id}@{version}")
+        definition = parse_form(form_id, raw)
+        with self._lock:
+            self._register(definition, raw)
+        return definition
+
+    def get(self, form_id: str = DEFAULT_FORM, version: Optional[str] = None):
+        """The compiled graph of a form version, by default the current one."""
+        version = version or self.current_version(form_id)
+        graph = self._graphs.get((form_id, version))
+        if graph is not None:
+            return graph
+
+        definition = self.definition(form_id, version)
+        with self._compile_lock:
+            graph = self._graphs.get((form_id, version))
+            if graph is None:
+                from graph.form_graph import FormGraphManager
+
+                graph = FormGraphManager(definition)
+                self._graphs[(form_id, version)] = graph
+                self.compiles += 1
+                logging.info(f"Compiled form {form_id} at version {version}")
+            return graph
+
+    def peek(self, form_id: str = DEFAULT_FORM, version: Optional[str] = None):
+        """
+        The compiled graph of a form version if it is ready without reading
+        files or compiling, else None; see `get`.
+        """
+        if version is None:
+            with self._lock:
+                known = self._files.get(form_id)
+                if known is None or time.monotonic() - known.checked_at >= self.reload_interval:
+                    return None
+                version = known.version
+        return self._graphs.get((form_id, version))
+
+    def form_ids(self) -> list:
+        try:
+            names = os.listdir(self.forms_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name[: -len(".json")]
+            for name in names
+            if name.endswith(".json") and FORM_ID_PATTERN.match(name[: -len(".json")])
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            current = {form_id: known.version for form_id, known in self._files.items()}
+        return {
+            "current": current,
+            "versions_loaded": len(self._definitions),
+            "graphs_compiled": self.compiles,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
+
+
+form_registry = FormRegistry()
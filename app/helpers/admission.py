@@ -0,0 +1,257 @@
+import asyncio
+import collections
+import contextvars
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from helpers.rate_limit import TokenBucket
+from helpers.config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_QUEUE_SIZE,
+    LLM_INTERACTIVE_RESERVE,
+    LLM_SESSION_TOKEN_CAP,
+    RATE_LIMIT_MAX_KEYS,
+    SESSION_RATE,
+    SESSION_BURST,
+    IP_RATE,
+    IP_BURST,
+    DRAFT_SESSION_RATE,
+    DRAFT_SESSION_BURST,
+    DRAFT_IP_RATE,
+    DRAFT_IP_BURST,
+)
+
+# Priority classes; lower values are served first
+INTERACTIVE, BULK = 0, 1
+
+# Who an LLM call is made for. Endpoints set the session; bulk and
+# speculative work lower the priority. Tasks and asyncio.to_thread inherit both.
+current_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_session", default=None
+)
+current_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "current_priority", default=INTERACTIVE
+)
+
+
+class RateLimited(Exception):
+    """Raised when a client should back off; the API answers 429 with Retry-After."""
+
+    message = "Too many requests"
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"{self.message}, retry in {math.ceil(retry_after)}s")
+        self.retry_after = retry_after
+
+
+class Overloaded(RateLimited):
+    """Raised when the LLM wait queue is full."""
+
+    message = "Too many validations in progress"
+
+
+class KeyedRateLimiter:
+    """A token bucket per key (session, client IP), keeping the most recent `max_keys`."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def check(self, key: str) -> float:
+        """Takes a token for `key`. Returns 0 if allowed, else seconds until it would be."""
+        with self._lock:
+            bucket = self._buckets.pop(key, None) or TokenBucket(self.rate, self.burst)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        wait = bucket.try_acquire()
+        if wait:
+            self.limited += 1
+        return wait
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._buckets), "limited": self.limited}
+
+
+class LLMAdmission:
+    """
+    Caps the number of LLM validations in flight. Callers beyond the cap wait
+    in a bounded priority queue, interactive before bulk, and `Overloaded`
+    is raised when the queue is full. Bulk work may only use the slots left
+    after `interactive_reserve`, so interactive users never queue behind it.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        queue_size: int = LLM_QUEUE_SIZE,
+        interactive_reserve: int = LLM_INTERACTIVE_RESERVE,
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.interactive_reserve = min(interactive_reserve, max_concurrency - 1)
+        self._active = 0
+        self._waiters: list = []  # Heap of (priority, seq, loop, future)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._avg_seconds = 1.0  # Moving average of slot hold time
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def _limit(self, priority: int) -> int:
+        if priority == INTERACTIVE:
+            return self.max_concurrency
+        return self.max_concurrency - self.interactive_reserve
+
+    def retry_after(self) -> float:
+        """Rough time until the current queue has drained."""
+        rounds = (len(self._waiters) + 1) / self.max_concurrency
+        return max(1.0, rounds * self._avg_seconds)
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[int] = None):
+        priority = current_priority.get() if priority is None else priority
+        with self._lock:
+            if self._active < self._limit(priority) and not self._queued_ahead(priority):
+                self._active += 1
+                future = None
+            elif len(self._waiters) >= self.queue_size:
+                self.rejected += 1
+                raise Overloaded(self.retry_after())
+            else:
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                heapq.heappush(self._waiters, (priority, next(self._seq), loop, future))
+                self.queued += 1
+
+        if future is not None:
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if future.done() and not future.cancelled():
+                        self._active -= 1  # Got the slot just as we were cancelled
+                        self._wake()
+                raise
+
+        self.admitted += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (time.monotonic() - start)
+                self._active -= 1
+                self._wake()
+
+    def try_acquire(self, priority: Optional[int] = None) -> bool:
+        """
+        Takes a slot only if one is free right away, for optional extra calls
+        such as hedges. A True result must be paired with `release`.
+        """
+        priority = current_priority.get() if priority is None else priority
+        with self._lock:
+            if self._active >= self._limit(priority) or self._queued_ahead(priority):
+                return False
+            self._active += 1
+            self.admitted += 1
+            return True
+
+    def release(self):
+        """Gives back a slot taken by `try_acquire`."""
+        with self._lock:
+            self._active -= 1
+            self._wake()
+
+    def _queued_ahead(self, priority: int) -> bool:
+        """Whether a waiter of equal or better priority is queued; called with the lock held."""
+        while self._waiters and self._waiters[0][3].cancelled():
+            heapq.heappop(self._waiters)
+        return bool(self._waiters) and self._waiters[0][0] <= priority
+
+    def _wake(self):
+        """Hands free slots to the best waiters; called with the lock held."""
+        while self._waiters:
+            priority, _, loop, future = self._waiters[0]
+            if future.cancelled():
+                heapq.heappop(self._waiters)
+                continue
+            if self._active >= self._limit(priority):
+                return
+            heapq.heappop(self._waiters)
+            self._active += 1
+            loop.call_soon_threadsafe(self._resolve, future)
+
+    def _resolve(self, future: asyncio.Future):
+        """Hands a slot granted by `_wake` to its waiter, on the waiter's loop."""
+        if future.cancelled():
+            self.release()  # Cancelled after the slot was granted; nobody will use it
+        elif not future.done():
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": self._active,
+                "waiting": len(self._waiters),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+            }
+
+
+class TokenMeter:
+    """Counts LLM tokens per session, keeping the most recent `max_sessions`."""
+
+    def __init__(self, cap: int = LLM_SESSION_TOKEN_CAP, max_sessions: int = RATE_LIMIT_MAX_KEYS):
+        self.cap = cap
+        self.max_sessions = max_sessions
+        self._spent: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.capped = 0
+
+    def record(self, tokens: int, session_id: Optional[str] = None):
+        session_id = session_id or current_session.get()
+        if not session_id or not tokens:
+            return
+        with self._lock:
+            self._spent[session_id] = self._spent.pop(session_id, 0) + tokens
+            if len(self._spent) > self.max_sessions:
+                self._spent.popitem(last=False)
+
+    def spent(self, session_id: str) -> int:
+        with self._lock:
+            return self._spent.get(session_id, 0)
+
+    def exhausted(self, session_id: Optional[str] = None) -> bool:
+        """Whether the session has used up its token cap (0 disables the cap)."""
+        session_id = session_id or current_session.get()
+        if not self.cap or not session_id:
+            return False
+        with self._lock:
+            if self._spent.get(session_id, 0) < self.cap:
+                return False
+            self.capped += 1
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._spent), "capped": self.capped}
+
+
+session_limiter = KeyedRateLimiter(SESSION_RATE, SESSION_BURST)
+ip_limiter = KeyedRateLimiter(IP_RATE, IP_BURST)
+draft_session_limiter = KeyedRateLimiter(DRAFT_SESSION_RATE, DRAFT_SESSION_BURST)
+draft_ip_limiter = KeyedRateLimiter(DRAFT_IP_RATE, DRAFT_IP_BURST)
+llm_admission = LLMAdmission()
+token_meter = TokenMeter()
@@ -11,4 +11,71 @@ if not OPENAI_API_KEY:
 VALIDATION_ENGINE = os.getenv("VALIDATION_ENGINE", "dspy")
 MLFLOW_ENABLED = os.getenv("MLFLOW_ENABLED", "False").lower() in ("true", "1")
 MLFLOW_EXPERIMENT_NAME = os.getenv("MLFLOW_EXPERIMENT_NAME", "DefaultExperiment")
+# Traces every LLM call synchronously, on the request path; for debugging only
+MLFLOW_AUTOLOG = os.getenv("MLFLOW_AUTOLOG", "False").lower() in ("true", "1")
 GRAPH_OUTPUT_DIR = os.getenv("GRAPH_OUTPUT_DIR", "graph_images")
+DSPY_ASYNC_MAX_WORKERS = int(os.getenv("DSPY_ASYNC_MAX_WORKERS", "64"))
+OPENAI_POOL_MAX_CONNECTIONS = int(os.getenv("OPENAI_POOL_MAX_CONNECTIONS", "100"))
+OPENAI_POOL_MAX_KEEPALIVE = int(os.getenv("OPENAI_POOL_MAX_KEEPALIVE", "20"))
+OPENAI_POOL_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_POOL_KEEPALIVE_EXPIRY", "60"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+RULE_PREVALIDATION_ENABLED = os.getenv("RULE_PREVALIDATION_ENABLED", "True").lower() in ("true", "1")
+VALIDATION_CACHE_SIZE = int(os.getenv("VALIDATION_CACHE_SIZE", "10000"))
+VALIDATION_CACHE_TTL = float(os.getenv("VALIDATION_CACHE_TTL", "86400"))
+VALIDATION_CACHE_DB = os.getenv("VALIDATION_CACHE_DB", "")  # Empty disables the SQLite tier
+SESSION_DB_FILE = os.getenv("SESSION_DB_FILE", "./db/registration.db")
+SESSION_DB_POOL_SIZE = int(os.getenv("SESSION_DB_POOL_SIZE", "8"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))  # 0 disables the in-process cache
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SESSION_TTL = float(os.getenv("SESSION_TTL", "86400"))  # Idle seconds before an unfinished session expires
+ARCHIVE_GRACE = float(os.getenv("ARCHIVE_GRACE", "3600"))  # Seconds a finished session stays editable before it is archived
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+SESSION_SWEEP_BATCH = int(os.getenv("SESSION_SWEEP_BATCH", "500"))
+SESSION_VACUUM_EVERY = int(os.getenv("SESSION_VACUUM_EVERY", "10"))  # In sweeper ticks
+SESSION_VACUUM_PAGES = int(os.getenv("SESSION_VACUUM_PAGES", "256"))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "8"))
+BULK_LLM_RATE = float(os.getenv("BULK_LLM_RATE", "5"))  # LLM calls per second
+BULK_LLM_BURST = float(os.getenv("BULK_LLM_BURST", "10"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "200"))
+BULK_MAX_RETRIES = int(os.getenv("BULK_MAX_RETRIES", "3"))
+BULK_RETRY_BACKOFF = float(os.getenv("BULK_RETRY_BACKOFF", "0.5"))  # Seconds, doubled per retry
+MLFLOW_QUEUE_SIZE = int(os.getenv("MLFLOW_QUEUE_SIZE", "10000"))
+MLFLOW_BATCH_SIZE = int(os.getenv("MLFLOW_BATCH_SIZE", "500"))
+MLFLOW_FLUSH_INTERVAL = float(os.getenv("MLFLOW_FLUSH_INTERVAL", "10"))  # Seconds
+MLFLOW_SAMPLE_RATE = float(os.getenv("MLFLOW_SAMPLE_RATE", "1.0"))
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "True").lower() in ("true", "1")
+ROUTER_ENGINES = [e.strip() for e in os.getenv("ROUTER_ENGINES", "dspy,chatgpt").split(",") if e.strip()]
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))  # Of recent latencies, before hedging
+HEDGE_INITIAL_DELAY = float(os.getenv("HEDGE_INITIAL_DELAY", "2.0"))  # Seconds, until enough samples
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.2"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))  # Seconds before a probe
+DRAFT_DEBOUNCE_MS = float(os.getenv("DRAFT_DEBOUNCE_MS", "300"))
+DRAFT_LLM_BUDGET = int(os.getenv("DRAFT_LLM_BUDGET", "10"))  # Speculative LLM calls per session
+DRAFT_TTL = float(os.getenv("DRAFT_TTL", "600"))  # Seconds a finished draft can be reused
+DRAFT_MAX_SESSIONS = int(os.getenv("DRAFT_MAX_SESSIONS", "10000"))
+SESSION_RATE = float(os.getenv("SESSION_RATE", "2"))  # Validation requests per second per session
+SESSION_BURST = float(os.getenv("SESSION_BURST", "10"))
+IP_RATE = float(os.getenv("IP_RATE", "20"))  # Validation requests per second per client IP
+IP_BURST = float(os.getenv("IP_BURST", "60"))
+# Drafts have their own buckets, so typing never uses up the ones of submitted answers
+DRAFT_SESSION_RATE = float(os.getenv("DRAFT_SESSION_RATE", "10"))  # Drafts per second per session
+DRAFT_SESSION_BURST = float(os.getenv("DRAFT_SESSION_BURST", "30"))
+DRAFT_IP_RATE = float(os.getenv("DRAFT_IP_RATE", "50"))  # Drafts per second per client IP
+DRAFT_IP_BURST = float(os.getenv("DRAFT_IP_BURST", "150"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))  # LLM validations in flight
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "256"))  # Waiting beyond this gets a 429
+LLM_INTERACTIVE_RESERVE = int(os.getenv("LLM_INTERACTIVE_RESERVE", "8"))  # Slots bulk work can't use
+LLM_SESSION_TOKEN_CAP = int(os.getenv("LLM_SESSION_TOKEN_CAP", "20000"))  # 0 disables the cap
+SESSION_SNAPSHOT_EVERY = int(os.getenv("SESSION_SNAPSHOT_EVERY", "8"))  # Journal events between snapshots
+FORMS_DIR = os.getenv("FORMS_DIR", "forms")  # One <form_id>.json definition per form
+FORM_VERSIONS_DIR = os.getenv("FORM_VERSIONS_DIR", os.path.join(FORMS_DIR, ".versions"))
+FORM_RELOAD_INTERVAL = float(os.getenv("FORM_RELOAD_INTERVAL", "2"))  # Seconds between file checks
+DEFAULT_FORM = os.getenv("DEFAULT_FORM", "registration")
+GUARDRAILS_STRICT = os.getenv("GUARDRAILS_STRICT", "False").lower() in ("true", "1")  # Parse LLM output through Guardrails
@@ -0,0 +1,12 @@
+import importlib
+
+
+def load_object(target):
+    """
+    Resolves a "package.module:attribute" path, importing the module on
+    first use. Anything else (e.g. a class) is returned unchanged.
+    """
+    if not isinstance(target, str):
+        return target
+    module_name, _, attribute = target.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
@@ -0,0 +1,133 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Seconds; spans a rule check (sub-millisecond) to a slow LLM call
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+LABEL_NAMES = ("stage", "engine", "question")
+
+
+class Histogram:
+    """
+    A cumulative latency histogram with Prometheus semantics, keyed by label
+    values. Observations are cheap (a bisect and a few additions under a lock).
+    """
+
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, labels: Tuple[str, ...]):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += seconds
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+
+        for labels, series in sorted(snapshot.items()):
+            label_text = ",".join(
+                f'{name}="{_escape(value)}"' for name, value in zip(LABEL_NAMES, labels)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label_text},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+    def counts(self, label: str = "stage") -> Dict[str, int]:
+        """Number of observations per value of one label, summed over the others."""
+        index = LABEL_NAMES.index(label)
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for labels, series in self._series.items():
+                counts[labels[index]] = counts.get(labels[index], 0) + sum(series[:-1])
+        return counts
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+stage_latency = Histogram(
+    "registration_stage_duration_seconds",
+    "Time spent in each stage of request handling.",
+)
+
+# Per-request list of (stage, seconds), set only when a trace was requested.
+# asyncio.to_thread copies the context, so stages run in worker threads land
+# in the same list.
+_trace: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar(
+    "stage_trace", default=None
+)
+
+
+@contextmanager
+def timed(stage: str, engine: str = "", question: Optional[str] = None):
+    """Times the enclosed block into `stage_latency` and the active request trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_latency.observe(elapsed, (stage, engine, question or ""))
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((stage, elapsed))
+
+
+def start_trace() -> list:
+    """Starts collecting stage timings for the current request."""
+    trace: list = []
+    _trace.set(trace)
+    return trace
+
+
+def server_timing(trace: list) -> str:
+    """Formats a trace as a Server-Timing header, summing repeated stages."""
+    totals: Dict[str, float] = {}
+    for stage, elapsed in trace:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return ", ".join(f"{stage};dur={elapsed * 1000:.2f}" for stage, elapsed in totals.items())
+
+
+def render_metrics(stats: Optional[dict] = None) -> str:
+    """
+    Renders the latency histogram in the Prometheus text format, followed by
+    any numeric values of `stats` (e.g. `validation_stats()`) as gauges.
+    """
+    lines = stage_latency.render()
+    if stats:
+        lines.append("# TYPE registration_component_stat gauge")
+        for component, values in sorted(stats.items()):
+            for name, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(
+                    f'registration_component_stat{{component="{_escape(component)}",'
+                    f'name="{_escape(name)}"}} {value}'
+                )
+    return "\n".join(lines) + "\n"
+
@@ -0,0 +1,161 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Optional
+from helpers.metrics import timed
+from helpers.config import (
+    MLFLOW_ENABLED,
+    MLFLOW_EXPERIMENT_NAME,
+    MLFLOW_QUEUE_SIZE,
+    MLFLOW_BATCH_SIZE,
+    MLFLOW_FLUSH_INTERVAL,
+    MLFLOW_SAMPLE_RATE,
+)
+
+_STOP = object()
+MAX_METRICS_PER_CALL = 1000  # MLflow's log_batch limit
+
+
+class ValidationTelemetry:
+    """
+    Buffers validation records and logs them to MLflow from a background
+    thread, one run per flush, so tracking I/O stays off the request path.
+    A flush happens when `batch_size` records are queued or every
+    `flush_interval` seconds. When the queue is full, records are dropped
+    instead of blocking the caller.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = MLFLOW_ENABLED,
+        experiment_name: str = MLFLOW_EXPERIMENT_NAME,
+        max_queue: int = MLFLOW_QUEUE_SIZE,
+        batch_size: int = MLFLOW_BATCH_SIZE,
+        flush_interval: float = MLFLOW_FLUSH_INTERVAL,
+        sample_rate: float = MLFLOW_SAMPLE_RATE,
+        tracking_uri: Optional[str] = None,
+    ):
+        self.enabled = enabled
+        self.experiment_name = experiment_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.tracking_uri = tracking_uri
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._experiment_id: Optional[str] = None
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+
+    def record(self, engine: str, question: str, user_answer: str, result: dict):
+        """Queues one validation for logging; never blocks."""
+        if not self.enabled or self._thread is None:
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait(
+                {
+                    "timestamp": int(time.time() * 1000),
+                    "validation_engine": engine,
+                    "question": question,
+                    "input_answer": user_answer,
+                    "status": result.get("status", "error"),
+                    "feedback": result.get("feedback", "No feedback"),
+                    "formatted_answer": result.get("formatted_answer", user_answer),
+                }
+            )
+            self.recorded += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="mlflow-telemetry", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 30):
+        """Flushes everything queued so far and stops the background thread."""
+        if self._thread is None:
+            return
+        thread, self._thread = self._thread, None
+        self._queue.put(_STOP)  # Blocking is fine here: we're shutting down
+        thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if batch:
+                try:
+                    with timed("mlflow_flush", "mlflow"):
+                        self._flush(batch)
+                except Exception as e:
+                    logging.error(f"[telemetry] MLflow flush failed: {str(e)}")
+
+    def _flush(self, batch: list):
+        # Imported here so processes with MLflow disabled never load it
+        from mlflow.entities import Metric, Param
+        from mlflow.tracking import MlflowClient
+
+        client = MlflowClient(tracking_uri=self.tracking_uri)
+        if self._experiment_id is None:
+            experiment = client.get_experiment_by_name(self.experiment_name)
+            self._experiment_id = (
+                experiment.experiment_id
+                if experiment
+                else client.create_experiment(self.experiment_name)
+            )
+
+        run_id = client.create_run(
+            self._experiment_id, run_name="validation-telemetry"
+        ).info.run_id
+        engines = sorted({record["validation_engine"] for record in batch})
+        metrics = [
+            Metric("valid", 1.0 if record["status"] == "valid" else 0.0, record["timestamp"], step)
+            for step, record in enumerate(batch)
+        ]
+        client.log_batch(
+            run_id,
+            metrics=metrics[:MAX_METRICS_PER_CALL],
+            params=[Param("validation_engine", ", ".join(engines))],
+        )
+        for start in range(MAX_METRICS_PER_CALL, len(metrics), MAX_METRICS_PER_CALL):
+            client.log_batch(run_id, metrics=metrics[start : start + MAX_METRICS_PER_CALL])
+        client.log_text(
+            run_id, "\n".join(json.dumps(record) for record in batch), "validations.jsonl"
+        )
+        client.set_terminated(run_id)
+        self.flushed += len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "queued": self._queue.qsize(),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+        }
+
+
+telemetry = ValidationTelemetry()
@@ -1,12 +1,120 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import (
+    Depends,
+    FastAPI,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import json
 import uuid
 import logging
-from validation.factory import validate_user_input
-from db.sqlite_db import fetch_session_from_db, upsert_session_to_db, RegistrationState
-from graph.registration_graph import RegistrationGraphManager
+import math
+import time
+from typing import Optional, Union
+from pydantic import BaseModel
+from validation.factory import (
+    ValidatorFactory,
+    astream_user_input,
+    avalidate_user_input,
+    avalidate_user_inputs,
+    validation_stats,
+)
+from validation.drafts import draft_validator
+from validation.http_pool import close_http_pool
+from validation.rules import current_form_rules
+from helpers.admission import (
+    KeyedRateLimiter,
+    RateLimited,
+    current_session,
+    draft_ip_limiter,
+    draft_session_limiter,
+    ip_limiter,
+    session_limiter,
+)
+from helpers.telemetry import telemetry
+from helpers.metrics import render_metrics, server_timing, start_trace
+from schemas import (
+    DeltaResponse,
+    EditFieldResponse,
+    ErrorResponse,
+    SessionState,
+    SubmitResponse,
+)
+from db.sqlite_db import RegistrationState
+from db.session_store import (
+    get_session_store,
+    fetch_session_from_db,
+    upsert_session_to_db,
+    append_session_events,
+    record_session_events,
+    StaleSessionError,
+)
+from db.events import answer_events, edit_event, skip_event
+from db.sweeper import SessionSweeper
+from bulk.importer import BulkImporter, parse_rows
+from graph.forms import FormNotFound, InvalidForm, form_registry
+from helpers.config import DEFAULT_FORM, VALIDATION_ENGINE, WARMUP_ON_STARTUP
+
+
+session_sweeper = SessionSweeper()
+
+
+async def form_graph(form_id: str = DEFAULT_FORM, version: Optional[str] = None):
+    """
+    The compiled graph of a form version. Graphs are compiled on first use,
+    and the first one is what imports langgraph, so reading files and
+    compiling happen off the event loop.
+    """
+    graph = form_registry.peek(form_id, version)
+    if graph is None:
+        graph = await asyncio.to_thread(form_registry.get, form_id, version)
+    return graph
+
+
+async def session_graph(session: dict):
+    """
+    The compiled graph of the form version a session is pinned to; the
+    request's validations use that version's rules from here on. Sessions
+    from before forms were versioned run on the current version.
+    """
+    graph = await form_graph(session.get("form_id") or DEFAULT_FORM, session.get("form_version"))
+    current_form_rules.set(graph.definition.rules)
+    return graph
+
+
+async def session_form(session: dict):
+    """The definition of the form version a session is pinned to; see `session_graph`."""
+    return (await session_graph(session)).definition
+
+
+def warm_up():
+    """Does the heavy, one-off setup so the first request doesn't pay for it."""
+    form_registry.get(DEFAULT_FORM)
+    get_session_store()
+    ValidatorFactory.get_validator(VALIDATION_ENGINE)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        await asyncio.to_thread(warm_up)
+    session_sweeper.start()
+    telemetry.start()
+    yield
+    await session_sweeper.stop()
+    await asyncio.to_thread(telemetry.stop)
+    await close_http_pool()
+
 
-app = FastAPI()
+# orjson for every JSON response; much faster than the stdlib encoder
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,78 +126,231 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
-registration_questions = {
-    "ask_email": "What is your email address?",
-    "ask_name": "What is your full name?",
-    "ask_address": "What is your address?",
-    "ask_phone": "What is your phone number?",
-    "ask_username": "Choose a username.",
-    "ask_password": "Choose a strong password.",
-}
+# Clients send this header to get a per-stage breakdown of one call
+TRACE_REQUEST_HEADER = "x-trace-timing"
 
-registration_graph = RegistrationGraphManager("registration", registration_questions)
-registration_graph.generate_mermaid_diagram()
 
+@app.middleware("http")
+async def stage_timing_trace(request: Request, call_next):
+    if request.headers.get(TRACE_REQUEST_HEADER, "").lower() not in ("1", "true"):
+        return await call_next(request)
 
-@app.post("/start_registration")
-def start_registration():
+    trace = start_trace()
+    start = time.perf_counter()
+    response = await call_next(request)
+    trace.append(("total", time.perf_counter() - start))
+    response.headers["Server-Timing"] = server_timing(trace)
+    return response
+
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited):
+    return ORJSONResponse(
+        status_code=429,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+@app.exception_handler(FormNotFound)
+async def form_not_found_handler(request: Request, exc: FormNotFound):
+    return ORJSONResponse(
+        status_code=404,
+        content={"error": f"Form not available: {exc.args[0]}. Please restart registration."},
+    )
+
+
+def _check_rate(
+    client_host: Optional[str],
+    session_id: Optional[str],
+    by_ip: KeyedRateLimiter = ip_limiter,
+    by_session: KeyedRateLimiter = session_limiter,
+):
+    """Takes a token from the client IP's and the session's buckets, or raises RateLimited."""
+    wait = by_ip.check(client_host) if client_host else 0.0
+    if not wait and session_id:
+        wait = by_session.check(session_id)
+    if wait:
+        raise RateLimited(wait)
+
+
+async def _admit(request: Request, by_ip: KeyedRateLimiter, by_session: KeyedRateLimiter):
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    session_id = body.get("session_id") if isinstance(body, dict) else None
+    session_id = str(session_id) if session_id else None
+    _check_rate(request.client.host if request.client else None, session_id, by_ip, by_session)
+    if session_id:
+        current_session.set(session_id)
+
+
+async def admit_validation(request: Request):
+    """
+    Dependency of the endpoints that validate answers: rate-limits them per
+    client IP and session, and tags the LLM calls they make with the session
+    so its token cap applies.
+    """
+    await _admit(request, ip_limiter, session_limiter)
+
+
+async def admit_draft(request: Request):
+    """
+    Like `admit_validation` for drafts, on buckets of their own: a user
+    typing must not run out of tokens for submitting the answer.
+    """
+    await _admit(request, draft_ip_limiter, draft_session_limiter)
+
+
+def _reply(model: BaseModel) -> ORJSONResponse:
+    """
+    Serializes an already-validated response model. Returning the Response
+    directly skips FastAPI's dump-and-revalidate pass over the model.
+    """
+    return ORJSONResponse(model.model_dump(exclude_none=True))
+
+
+async def _create_session(form_id: str = DEFAULT_FORM) -> dict:
+    """
+    Runs the entry node of the form's graph for a new session and saves it,
+    pinned to the form's current version.
+    """
     session_id = str(uuid.uuid4())
+    graph = await form_graph(form_id)
 
     # Our initial state
     initial_state: RegistrationState = {
         "collected_data": {},
         "current_question": "",
-        "current_node": "ask_email",
+        "current_node": graph.definition.entry,
         "session_id": session_id,
     }
 
-    # Start the graph & get the first node
-    execution = registration_graph.compiled_graph.stream(initial_state)
-    try:
-        steps = list(execution)  # Fully consume the generator
-        if not steps:
-            raise RuntimeError("Generator exited before producing any states.")
-        first_step = steps[0]
-    except GeneratorExit:
-        raise RuntimeError("GeneratorExit detected before first transition!")
+    # Run only the entry node of the graph
+    first_step = graph.start_graph(initial_state)
+    if not first_step:
+        raise RuntimeError("Graph has no entry node.")
 
     # Extract state from the first node
     first_node_key = list(first_step.keys())[0]
     first_node_state = first_step[first_node_key]
     first_node_state["current_node"] = first_node_key
     first_node_state["session_id"] = session_id
+    first_node_state["form_id"] = form_id
+    first_node_state["form_version"] = graph.version
 
     # Save to session
-    upsert_session_to_db(
+    first_node_state["version"] = await asyncio.to_thread(
+        upsert_session_to_db,
         session_id,
         first_node_state["collected_data"],
         first_node_state["current_question"],
         first_node_state["current_node"],
+        expected_version=0,
+        completed=False,
+        form_id=form_id,
+        form_version=graph.version,
     )
+    return first_node_state
+
+
+async def _advance_session(session_id: str, current_state: dict, events: list):
+    """
+    Steps the graph past the current node and journals the turn's `events`.
+    Returns the next node's state, or None when registration is complete;
+    `current_state` is moved to the next node and its new version either way.
+    """
+    graph = await session_graph(current_state)
+    next_step = graph.resume_and_step_graph(current_state)
+
+    if not next_step or next_step == {}:
+        # Means we've hit the END node or no more steps
+        current_state["version"] = await asyncio.to_thread(
+            append_session_events,
+            session_id,
+            events,
+            current_state["current_question"],
+            current_state["current_node"],
+            expected_version=current_state["version"],
+            completed=True,
+        )
+        return None
+
+    next_node_key = list(next_step.keys())[0]
+    next_node_state = next_step[next_node_key]
+    next_node_state["current_node"] = next_node_key
+
+    current_state["version"] = await asyncio.to_thread(
+        append_session_events,
+        session_id,
+        events,
+        next_node_state["current_question"],
+        next_node_state["current_node"],
+        expected_version=current_state["version"],
+    )
+    current_state["current_question"] = next_node_state["current_question"]
+    current_state["current_node"] = next_node_key
+    return next_node_state
+
+
+def _skip_steps(current_state: dict, skip_steps: list):
+    for node_key in skip_steps:
+        logging.info(f"skip_{node_key}")
+        current_state[f"skip_{node_key}"] = True
+
+
+# Validation result recorded for a question the user skipped
+SKIPPED_RESULT = {
+    "status": "valid",
+    "feedback": "Skipped this question",
+    "formatted_answer": "-",
+}
+
+
+@app.post("/start_registration")
+async def start_registration(form_id: str = Query(DEFAULT_FORM, alias="form")):
+    first_node_state = await _create_session(form_id)
+    version = first_node_state.pop("version")
 
     return {
-        "session_id": session_id,
+        "session_id": first_node_state["session_id"],
         "message": first_node_state["current_question"],
         "state": first_node_state,
+        "version": version,
     }
 
 
-@app.post("/submit_response")
-def submit_response(response: dict):
+@app.get("/session_state", response_model=Union[SessionState, ErrorResponse])
+async def session_state(session_id: str):
+    """The full session, for delta-mode clients to reconcile against."""
+    current_state = await asyncio.to_thread(fetch_session_from_db, session_id)
+    if not current_state:
+        return {"error": "Session not found. Please restart registration."}
+    return _reply(SessionState(**current_state))
+
+
+@app.post(
+    "/submit_response",
+    dependencies=[Depends(admit_validation)],
+    response_model=Union[SubmitResponse, DeltaResponse, ErrorResponse],
+    response_model_exclude_none=True,
+)
+async def submit_response(response: dict, delta: bool = Query(False)):
     session_id = response.get("session_id")
     if not session_id:
         return {"error": "Missing session_id"}
 
-    current_state = fetch_session_from_db(session_id)
+    current_state = await asyncio.to_thread(fetch_session_from_db, session_id)
     if not current_state:
         return {"error": "Session not found. Please restart registration."}
+    await session_graph(current_state)
 
     skip_steps = response.get("skip_steps", [])
-    for node_key in skip_steps:
-        logging.info(f"skip_{node_key}")
-        current_state[f"skip_{node_key}"] = True
+    _skip_steps(current_state, skip_steps)
 
     user_answer = response.get("answer")
     if user_answer is None:
@@ -101,69 +362,275 @@ def submit_response(response: dict):
     # Use dspy to validate the answer with fallbacks
     if current_node in skip_steps:
         # If user is skipping this question, create a dummy validation result
-        validation_result = {
-            "status": "valid",
-            "feedback": "Skipped this question",
-            "formatted_answer": "-",
-        }
+        validation_result = SKIPPED_RESULT
+        events = [skip_event(current_node)]
         logging.info(f"Skipping validation for {current_node}")
     else:
-        # Normal validation
-        validation_result = validate_user_input(current_question, user_answer)
+        # Normal validation, unless a draft of this exact answer was already validated
+        validation_result = draft_validator.take(
+            session_id, current_node, user_answer
+        ) or await avalidate_user_input(current_question, user_answer, node_key=current_node)
 
         # If there's a clarify/error
         if validation_result["status"] in ("clarify", "error"):
-            return {
-                "next_question": current_question,
-                "validation_feedback": validation_result["feedback"],
-                "user_answer": user_answer,
-                "formatted_answer": validation_result["formatted_answer"],
-                "state": current_state,
-            }
-
-    current_state["collected_data"][current_state["current_node"]] = validation_result[
-        "formatted_answer"
-    ]
+            await asyncio.to_thread(
+                record_session_events,
+                session_id,
+                answer_events(
+                    current_node, current_question, user_answer, validation_result, stored=False
+                ),
+            )
+            if delta:
+                return _reply(
+                    DeltaResponse(
+                        version=current_state["version"],
+                        status=validation_result["status"],
+                        validation_feedback=validation_result["feedback"],
+                        formatted_answer=validation_result["formatted_answer"],
+                    )
+                )
+            return _reply(
+                SubmitResponse(
+                    next_question=current_question,
+                    validation_feedback=validation_result["feedback"],
+                    user_answer=user_answer,
+                    formatted_answer=validation_result["formatted_answer"],
+                    state=current_state,
+                    version=current_state["version"],
+                )
+            )
+
+        events = answer_events(
+            current_node, current_question, user_answer, validation_result, stored=True
+        )
+
+    current_state["collected_data"][current_node] = validation_result["formatted_answer"]
 
     if "current_node" not in current_state or not current_state.get("collected_data"):
         return {"error": "Corrupt session state, restart registration."}
 
-    next_step = registration_graph.resume_and_step_graph(current_state)
+    try:
+        next_node_state = await _advance_session(session_id, current_state, events)
+    except StaleSessionError:
+        return {"error": "Session was updated concurrently. Please retry."}
+
+    if next_node_state is None:
+        draft_validator.forget(session_id)
+
+    if delta:
+        return _reply(
+            DeltaResponse(
+                version=current_state["version"],
+                status="complete" if next_node_state is None else validation_result["status"],
+                changes={current_node: validation_result["formatted_answer"]},
+                current_node=None if next_node_state is None else current_state["current_node"],
+                next_question=None if next_node_state is None else current_state["current_question"],
+                validation_feedback=validation_result["feedback"],
+                formatted_answer=validation_result["formatted_answer"],
+            )
+        )
+
+    if next_node_state is None:
+        return _reply(
+            SubmitResponse(
+                message="Registration complete!",
+                validation_feedback=validation_result["feedback"],
+                user_answer=user_answer,
+                formatted_answer=validation_result["formatted_answer"],
+                state=current_state,
+                summary=current_state["collected_data"],
+                version=current_state["version"],
+            )
+        )
+
+    return _reply(
+        SubmitResponse(
+            next_question=next_node_state["current_question"],
+            validation_feedback=validation_result["feedback"],
+            user_answer=user_answer,
+            formatted_answer=validation_result["formatted_answer"],
+            state=next_node_state,
+            summary=current_state["collected_data"],
+            version=current_state["version"],
+        )
+    )
 
-    if not next_step or next_step == {}:
-        # Means we've hit the END node or no more steps
-        return {
-            "message": "Registration complete!",
-            "validation_feedback": validation_result["feedback"],
-            "user_answer": user_answer,
-            "formatted_answer": validation_result["formatted_answer"],
-            "state": current_state,
-            "summary": current_state["collected_data"],
-        }
 
-    next_node_key = list(next_step.keys())[0]
-    next_node_state = next_step[next_node_key]
-    next_node_state["current_node"] = next_node_key
+@app.post("/draft_response", dependencies=[Depends(admit_draft)])
+async def draft_response(request: dict):
+    """
+    Validates the answer being typed for the current question, so the final
+    /submit_response of the same answer returns without an LLM call. The
+    frontend should debounce calls; a newer draft cancels the previous one.
+    """
+    session_id = request.get("session_id")
+    if not session_id:
+        return {"error": "Missing session_id"}
+    user_answer = request.get("answer")
+    if user_answer is None:
+        return {"error": "Missing answer"}
 
-    upsert_session_to_db(
-        session_id,
-        current_state["collected_data"],
-        next_node_state["current_question"],
-        next_node_state["current_node"],
+    current_state = await asyncio.to_thread(fetch_session_from_db, session_id)
+    if not current_state:
+        return {"error": "Session not found. Please restart registration."}
+    current_node = current_state["current_node"]
+    graph = await session_graph(current_state)
+
+    def next_node(formatted_answer: str):
+        collected_data = {**current_state["collected_data"], current_node: formatted_answer}
+        return graph.next_node({**current_state, "collected_data": collected_data})
+
+    result = await draft_validator.draft(
+        session_id, current_node, current_state["current_question"], str(user_answer), next_node
     )
+    if result["status"] in ("superseded", "over_budget"):
+        return {"status": result["status"]}
 
     return {
-        "next_question": next_node_state["current_question"],
-        "validation_feedback": validation_result["feedback"],
-        "user_answer": user_answer,
-        "formatted_answer": validation_result["formatted_answer"],
-        "state": next_node_state,
-        "summary": current_state["collected_data"],
+        "status": result["status"],
+        "validation_feedback": result["feedback"],
+        "formatted_answer": result["formatted_answer"],
+        "next_node": result["next_node"],
+        "next_question": graph.question_map.get(result["next_node"]),
     }
 
 
-@app.post("/edit_field")
-def edit_field(request: dict):
+@app.websocket("/ws/registration")
+async def registration_socket(
+    websocket: WebSocket, session_id: Optional[str] = None, form: str = DEFAULT_FORM
+):
+    """
+    One connection per registration; new sessions start on `form`. The server sends a "question", then for
+    every {"answer": ..., "skip_steps": [...]} message: "ack", a "rule" verdict
+    when rules settle the answer, "token" chunks of LLM feedback, the final
+    "result", and the next "question" (or "complete"). The session is only
+    fetched when the connection opens.
+    """
+    await websocket.accept()
+    if session_id:
+        current_state = await asyncio.to_thread(fetch_session_from_db, session_id)
+        if not current_state:
+            await websocket.send_json(
+                {"type": "error", "error": "Session not found. Please restart registration."}
+            )
+            await websocket.close()
+            return
+    else:
+        try:
+            current_state = await _create_session(form)
+        except FormNotFound:
+            await websocket.send_json({"type": "error", "error": f"Form not available: {form}"})
+            await websocket.close()
+            return
+        session_id = current_state["session_id"]
+    current_session.set(session_id)
+    await session_graph(current_state)
+    client_host = websocket.client.host if websocket.client else None
+
+    await websocket.send_json(
+        {
+            "type": "question",
+            "session_id": session_id,
+            "question": current_state["current_question"],
+            "state": current_state,
+        }
+    )
+
+    try:
+        while True:
+            message = await websocket.receive_json()
+            user_answer = message.get("answer")
+            if user_answer is None:
+                await websocket.send_json({"type": "error", "error": "Missing answer"})
+                continue
+            user_answer = str(user_answer)
+            current_node = current_state["current_node"]
+            await websocket.send_json({"type": "ack", "node": current_node, "answer": user_answer})
+
+            skip_steps = message.get("skip_steps", [])
+            _skip_steps(current_state, skip_steps)
+            try:
+                _check_rate(client_host, session_id)
+                if current_node in skip_steps:
+                    validation_result = SKIPPED_RESULT
+                    events = [skip_event(current_node)]
+                else:
+                    async for kind, payload in astream_user_input(
+                        current_state["current_question"], user_answer, node_key=current_node
+                    ):
+                        if kind == "result":
+                            validation_result = payload
+                        elif kind == "token":
+                            await websocket.send_json({"type": "token", "text": payload})
+                        else:
+                            await websocket.send_json({"type": kind, **payload})
+            except RateLimited as e:
+                await websocket.send_json(
+                    {"type": "error", "error": str(e), "retry_after": math.ceil(e.retry_after)}
+                )
+                continue
+
+            await websocket.send_json({"type": "result", "user_answer": user_answer, **validation_result})
+            if current_node not in skip_steps:
+                stored = validation_result["status"] not in ("clarify", "error")
+                events = answer_events(
+                    current_node,
+                    current_state["current_question"],
+                    user_answer,
+                    validation_result,
+                    stored=stored,
+                )
+                if not stored:
+                    await asyncio.to_thread(record_session_events, session_id, events)
+                    continue  # Ask the same question again
+
+            current_state["collected_data"][current_node] = validation_result["formatted_answer"]
+            try:
+                next_node_state = await _advance_session(session_id, current_state, events)
+            except StaleSessionError:
+                current_state = await asyncio.to_thread(fetch_session_from_db, session_id)
+                if not current_state:
+                    await websocket.send_json(
+                        {"type": "error", "error": "Session not found. Please restart registration."}
+                    )
+                    await websocket.close()
+                    return
+                await websocket.send_json(
+                    {
+                        "type": "error",
+                        "error": "Session was updated concurrently. Please retry.",
+                        "state": current_state,
+                    }
+                )
+                continue
+
+            if next_node_state is None:
+                await websocket.send_json(
+                    {"type": "complete", "summary": current_state["collected_data"]}
+                )
+                await websocket.close()
+                return
+
+            await websocket.send_json(
+                {
+                    "type": "question",
+                    "session_id": session_id,
+                    "question": next_node_state["current_question"],
+                    "state": current_state,
+                    "summary": current_state["collected_data"],
+                }
+            )
+    except WebSocketDisconnect:
+        logging.info(f"Registration socket closed for session {session_id}")
+
+
+@app.post(
+    "/edit_field",
+    dependencies=[Depends(admit_validation)],
+    response_model=Union[EditFieldResponse, DeltaResponse, ErrorResponse],
+    response_model_exclude_none=True,
+)
+async def edit_field(request: dict, delta: bool = Query(False)):
     session_id = request.get("session_id")
     if not session_id:
         return {"error": "Missing session_id"}
@@ -171,45 +638,239 @@ def edit_field(request: dict):
     field_to_edit = request.get("field_to_edit")
     new_value = request.get("new_value")
 
-    current_state = fetch_session_from_db(session_id)
+    current_state = await asyncio.to_thread(fetch_session_from_db, session_id)
     if not current_state:
         logging.error("Session not found. Please restart registration.")
         return {"error": "Session not found. Please restart registration."}
 
     if not isinstance(field_to_edit, str):
         return {"error": "Invalid field_to_edit: must be a string"}
-    question_text = registration_questions.get(field_to_edit)
+    question_text = (await session_form(current_state)).question_map.get(field_to_edit)
     if not question_text:
         logging.error(f"Invalid field_to_edit: {field_to_edit}")
         return {"error": f"Invalid field_to_edit: {field_to_edit}"}
 
-    validation_result = validate_user_input(
-        question=question_text, user_answer=str(new_value)
+    validation_result = await avalidate_user_input(
+        question=question_text, user_answer=str(new_value), node_key=field_to_edit
     )
 
     if validation_result["status"] == "clarify":
-        return {
-            "message": "Needs clarification",
-            "validation_feedback": validation_result["feedback"],
-            "raw_answer": new_value,
-            "formatted_answer": validation_result["formatted_answer"],
-        }
+        await asyncio.to_thread(
+            record_session_events,
+            session_id,
+            [edit_event(field_to_edit, question_text, str(new_value), validation_result, stored=False)],
+        )
+        if delta:
+            return _reply(
+                DeltaResponse(
+                    version=current_state["version"],
+                    status="clarify",
+                    validation_feedback=validation_result["feedback"],
+                    formatted_answer=validation_result["formatted_answer"],
+                )
+            )
+        return _reply(
+            EditFieldResponse(
+                message="Needs clarification",
+                validation_feedback=validation_result["feedback"],
+                raw_answer=new_value,
+                formatted_answer=validation_result["formatted_answer"],
+                version=current_state["version"],
+            )
+        )
 
     current_state["collected_data"][field_to_edit] = validation_result[
         "formatted_answer"
     ]
 
-    upsert_session_to_db(
-        session_id,
-        current_state["collected_data"],
-        current_state["current_question"],
-        current_state["current_node"],
+    try:
+        version = await asyncio.to_thread(
+            append_session_events,
+            session_id,
+            [edit_event(field_to_edit, question_text, str(new_value), validation_result, stored=True)],
+            current_state["current_question"],
+            current_state["current_node"],
+            expected_version=current_state["version"],
+        )
+    except StaleSessionError:
+        return {"error": "Session was updated concurrently. Please retry."}
+
+    if delta:
+        return _reply(
+            DeltaResponse(
+                version=version,
+                status=validation_result["status"],
+                changes={field_to_edit: validation_result["formatted_answer"]},
+                validation_feedback=validation_result["feedback"],
+                formatted_answer=validation_result["formatted_answer"],
+            )
+        )
+    return _reply(
+        EditFieldResponse(
+            message="Field updated successfully!",
+            validation_feedback=validation_result["feedback"],
+            raw_answer=new_value,
+            formatted_answer=validation_result["formatted_answer"],
+            summary=current_state["collected_data"],
+            version=version,
+        )
     )
 
+
+@app.post("/edit_fields", dependencies=[Depends(admit_validation)])
+async def edit_fields(request: dict):
+    """Edits several fields at once, validating them in a single LLM call."""
+    session_id = request.get("session_id")
+    if not session_id:
+        return {"error": "Missing session_id"}
+
+    fields = request.get("fields")
+    if not isinstance(fields, dict) or not fields:
+        return {"error": "Invalid fields: must be a non-empty object"}
+
+    current_state = await asyncio.to_thread(fetch_session_from_db, session_id)
+    if not current_state:
+        logging.error("Session not found. Please restart registration.")
+        return {"error": "Session not found. Please restart registration."}
+
+    question_map = (await session_form(current_state)).question_map
+    invalid_fields = [key for key in fields if key not in question_map]
+    if invalid_fields:
+        logging.error(f"Invalid fields: {invalid_fields}")
+        return {"error": f"Invalid fields: {', '.join(invalid_fields)}"}
+
+    validation_results = await avalidate_user_inputs(
+        {
+            key: (question_map[key], str(value))
+            for key, value in fields.items()
+        }
+    )
+
+    results, events = {}, []
+    for key, validation_result in validation_results.items():
+        stored = validation_result["status"] == "valid"
+        events.append(
+            edit_event(
+                key, question_map[key], str(fields[key]), validation_result, stored
+            )
+        )
+        if stored:
+            current_state["collected_data"][key] = validation_result["formatted_answer"]
+        results[key] = {
+            "status": validation_result["status"],
+            "validation_feedback": validation_result["feedback"],
+            "raw_answer": fields[key],
+            "formatted_answer": validation_result["formatted_answer"],
+        }
+
+    if any(result["status"] == "valid" for result in results.values()):
+        try:
+            await asyncio.to_thread(
+                append_session_events,
+                session_id,
+                events,
+                current_state["current_question"],
+                current_state["current_node"],
+                expected_version=current_state["version"],
+            )
+        except StaleSessionError:
+            return {"error": "Session was updated concurrently. Please retry."}
+    else:
+        await asyncio.to_thread(record_session_events, session_id, events)
+
+    all_valid = all(result["status"] == "valid" for result in results.values())
     return {
-        "message": "Field updated successfully!",
-        "validation_feedback": validation_result["feedback"],
-        "raw_answer": new_value,
-        "formatted_answer": validation_result["formatted_answer"],
+        "message": "Fields updated successfully!" if all_valid else "Some fields need clarification",
+        "results": results,
         "summary": current_state["collected_data"],
     }
+
+
+@app.post("/bulk_import")
+async def bulk_import(
+    file: UploadFile,
+    file_format: str = Query("csv", alias="format"),
+    form_id: str = Query(DEFAULT_FORM, alias="form"),
+):
+    """Imports CSV/JSONL registrations, streaming NDJSON progress events."""
+    text = (await file.read()).decode("utf-8-sig")
+    if file_format not in ("csv", "jsonl"):
+        return {"error": f"Unsupported import format: {file_format}"}
+    importer = await asyncio.to_thread(BulkImporter, form_id=form_id)
+
+    async def progress():
+        async for event in importer.run(parse_rows(text, file_format)):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+
+DIAGRAM_MEDIA_TYPES = {"mermaid": "text/vnd.mermaid; charset=utf-8", "png": "image/png"}
+
+
+@app.get("/forms")
+async def list_forms():
+    """The forms new sessions can start, at their current versions."""
+    return await asyncio.to_thread(_list_forms)
+
+
+def _list_forms() -> dict:
+    forms = []
+    for form_id in form_registry.form_ids():
+        try:
+            definition = form_registry.definition(form_id)
+        except (FormNotFound, InvalidForm) as e:
+            logging.error(f"Form {form_id} can't be loaded: {e}")
+            continue
+        forms.append(
+            {"form_id": form_id, "title": definition.title, "version": definition.version}
+        )
+    return {"forms": forms, "registry": form_registry.stats()}
+
+
+@app.get("/graph_diagram")
+async def graph_diagram(
+    request: Request,
+    diagram_format: str = Query("mermaid", alias="format"),
+    form_id: str = Query(DEFAULT_FORM, alias="form"),
+    form_version: Optional[str] = Query(None, alias="version"),
+):
+    """Serves a form's graph diagram, cached by a hash of the graph structure."""
+    if diagram_format not in DIAGRAM_MEDIA_TYPES:
+        return {"error": f"Unsupported diagram format: {diagram_format}"}
+
+    graph = await form_graph(form_id, form_version)
+    etag = f'"{graph.structure_hash()}-{diagram_format}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    # PNG renders may hit the network on a cold cache, so keep them off the event loop
+    data = await asyncio.to_thread(graph.get_diagram, diagram_format)
+    return Response(
+        content=data, media_type=DIAGRAM_MEDIA_TYPES[diagram_format], headers=headers
+    )
+
+
+def _validation_stats() -> dict:
+    return {
+        **validation_stats(),
+        "drafts": draft_validator.stats(),
+        "ip_rate_limit": ip_limiter.stats(),
+        "session_rate_limit": session_limiter.stats(),
+        "draft_ip_rate_limit": draft_ip_limiter.stats(),
+        "draft_session_rate_limit": draft_session_limiter.stats(),
+    }
+
+
+@app.get("/validation_stats")
+async def get_validation_stats():
+    return _validation_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage latency histograms and validation counters in the Prometheus text format."""
+    return PlainTextResponse(
+        render_metrics(_validation_stats()), media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,64 @@
+"""
+Response models of the registration API.
+
+Every turn can be answered in full (the whole session state and summary)
+or, when the client asks for `?delta=true`, as a `DeltaResponse` carrying
+only what the turn changed. Both carry the session `version`: a client
+holding version N that receives version N + 1 applies the delta, and on
+any other gap refetches `/session_state`.
+"""
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class SessionState(BaseModel):
+    # Graph nodes may add keys of their own (e.g. skip flags)
+    model_config = ConfigDict(extra="allow")
+
+    session_id: Optional[str] = None  # Not set on states produced by a graph step
+    collected_data: Dict[str, str]
+    current_question: str
+    current_node: str
+    version: Optional[int] = None
+    form_id: Optional[str] = None  # The form and version the session is pinned to
+    form_version: Optional[str] = None
+
+
+class ErrorResponse(BaseModel):
+    error: str
+
+
+class SubmitResponse(BaseModel):
+    message: Optional[str] = None  # Set when registration is complete
+    next_question: Optional[str] = None
+    validation_feedback: str
+    user_answer: str
+    formatted_answer: str
+    state: SessionState
+    summary: Optional[Dict[str, str]] = None
+    version: int
+
+
+class EditFieldResponse(BaseModel):
+    message: str
+    validation_feedback: str
+    raw_answer: Any
+    formatted_answer: str
+    summary: Optional[Dict[str, str]] = None
+    version: int
+
+
+class DeltaResponse(BaseModel):
+    """
+    What one turn changed. `status` is the validation status, or "complete"
+    once the last question is answered; `changes` holds the collected
+    fields the turn set.
+    """
+
+    version: int
+    status: str
+    changes: Dict[str, str] = {}
+    current_node: Optional[str] = None
+    next_question: Optional[str] = None
+    validation_feedback: Optional[str] = None
+    formatted_answer: Optional[str] = None
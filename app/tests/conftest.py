@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+
+# Tests import the app's modules the way uvicorn does, from the app directory
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# Before helpers.config is imported: no real keys, databases or tracking
+_scratch = tempfile.mkdtemp(prefix="registration-tests-")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("MLFLOW_ENABLED", "False")
+os.environ.setdefault("WARMUP_ON_STARTUP", "False")
+os.environ.setdefault("VALIDATION_CACHE_DB", "")
+os.environ.setdefault("SESSION_DB_FILE", os.path.join(_scratch, "sessions.db"))
+os.environ.setdefault("FORMS_DIR", os.path.join(APP_DIR, "forms"))
+os.environ.setdefault("FORM_VERSIONS_DIR", os.path.join(_scratch, "form-versions"))
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from helpers.admission import BULK, INTERACTIVE, LLMAdmission, Overloaded
+
+
+async def _hold(admission: LLMAdmission, priority: int, release: asyncio.Event, admitted: list):
+    async with admission.slot(priority):
+        admitted.append(priority)
+        await release.wait()
+
+
+def test_interactive_caller_skips_queued_bulk_work():
+    async def scenario():
+        admission = LLMAdmission(max_concurrency=4, queue_size=10, interactive_reserve=1)
+        release, admitted = asyncio.Event(), []
+        # Bulk fills its three slots and two more bulk callers queue behind them
+        tasks = [asyncio.create_task(_hold(admission, BULK, release, admitted)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert admission.stats()["active"] == 3
+        assert admission.stats()["waiting"] == 2
+
+        # The reserved slot goes to an interactive caller straight away
+        interactive = asyncio.create_task(_hold(admission, INTERACTIVE, release, admitted))
+        await asyncio.sleep(0)
+        assert admitted == [BULK] * 3 + [INTERACTIVE]
+        assert admission.stats() == {
+            "active": 4, "waiting": 2, "admitted": 4, "queued": 2, "rejected": 0,
+        }
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(interactive, *tasks), timeout=5)
+        assert admitted.count(BULK) == 5
+        assert admission.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_callers_queue_in_priority_order_when_full():
+    async def scenario():
+        admission = LLMAdmission(max_concurrency=1, queue_size=2, interactive_reserve=0)
+        release, admitted = asyncio.Event(), []
+        first = asyncio.create_task(_hold(admission, INTERACTIVE, release, admitted))
+        await asyncio.sleep(0)
+        bulk = asyncio.create_task(_hold(admission, BULK, release, admitted))
+        interactive = asyncio.create_task(_hold(admission, INTERACTIVE, release, admitted))
+        await asyncio.sleep(0)
+        assert admission.stats()["waiting"] == 2
+
+        with pytest.raises(Overloaded):
+            async with admission.slot(INTERACTIVE):
+                pass
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(first, bulk, interactive), timeout=5)
+        assert admitted == [INTERACTIVE, INTERACTIVE, BULK]
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_a_waiter_after_its_slot_was_granted_frees_the_slot():
+    async def scenario():
+        admission = LLMAdmission(max_concurrency=1, queue_size=2, interactive_reserve=0)
+        assert admission.try_acquire(INTERACTIVE)
+        release, admitted = asyncio.Event(), []
+        waiter = asyncio.create_task(_hold(admission, INTERACTIVE, release, admitted))
+        await asyncio.sleep(0)
+        assert admission.stats()["waiting"] == 1
+
+        admission.release()  # Grants the slot to the waiter, resolved on the next loop turn
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+
+        assert admitted == []
+        assert admission.stats()["active"] == 0
+        assert admission.try_acquire(INTERACTIVE)
+
+    asyncio.run(scenario())
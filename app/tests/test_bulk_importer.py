@@ -0,0 +1,62 @@
+import asyncio
+import bulk.importer
+from bulk.importer import BulkImporter, parse_rows
+from db.memory_store import InMemorySessionStore
+from db.session_store import set_session_store
+
+VALID_ROW = (
+    '{"ask_email": "jane@example.com", "ask_name": "Jane Doe", '
+    '"ask_address": "-", "ask_phone": "5551234567", '
+    '"ask_username": "jdoe", "ask_password": "Sup3rSecret!"}'
+)
+
+
+async def _engine(question, user_answer, node_key=None):
+    return {"status": "valid", "feedback": "ok", "formatted_answer": user_answer}
+
+
+async def _import(text: str) -> list:
+    importer = BulkImporter(concurrency=2)
+    return [event async for event in importer.run(parse_rows(text, "jsonl"))]
+
+
+def test_bad_rows_are_reported_without_stopping_the_import(monkeypatch):
+    monkeypatch.setattr(bulk.importer, "avalidate_with_engine", _engine)
+    store = InMemorySessionStore()
+    set_session_store(store)
+    lines = [
+        VALID_ROW,
+        '{"ask_email": ',  # Malformed JSON
+        '["not", "an", "object"]',
+        VALID_ROW.replace('"5551234567"', "5551234567"),  # A number, not a string
+        '"just a string"',
+        VALID_ROW,
+    ]
+
+    events = asyncio.run(asyncio.wait_for(_import("\n".join(lines)), timeout=10))
+
+    rows = {event["row"]: event for event in events if event["event"] == "row"}
+    assert sorted(rows) == list(range(len(lines)))
+    assert [rows[i]["status"] for i in range(len(lines))] == [
+        "valid", "invalid", "invalid", "valid", "invalid", "valid",
+    ]
+    assert "Malformed JSON" in rows[1]["errors"]["row"]
+    assert "list" in rows[2]["errors"]["row"]
+    assert events[-1] == {
+        "event": "done", "processed": 6, "valid": 3, "invalid": 3, "written": 3,
+    }
+    assert len(store._sessions) == 3
+
+
+def test_processing_errors_become_invalid_rows(monkeypatch):
+    async def failing_validate(self, node_key, answer):
+        raise RuntimeError("engine exploded")
+
+    monkeypatch.setattr(BulkImporter, "_validate_field", failing_validate)
+    set_session_store(InMemorySessionStore())
+
+    events = asyncio.run(asyncio.wait_for(_import(VALID_ROW), timeout=10))
+
+    assert events[0]["status"] == "invalid"
+    assert "engine exploded" in events[0]["errors"]["row"]
+    assert events[-1]["event"] == "done"
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import main
+import validation.drafts as drafts
+import validation.factory as factory
+from benchmarks.load_suite import FakeLLMValidator
+from db.memory_store import InMemorySessionStore
+from db.session_store import set_session_store
+from helpers.admission import KeyedRateLimiter
+
+
+@pytest.fixture
+def client(monkeypatch):
+    set_session_store(InMemorySessionStore())
+    factory.ValidatorFactory.register("fake", FakeLLMValidator)
+    monkeypatch.setattr(factory, "VALIDATION_ENGINE", "fake")
+    # Fresh buckets, so other tests' requests don't count
+    for name, limiter in (
+        ("ip_limiter", main.ip_limiter),
+        ("session_limiter", main.session_limiter),
+        ("draft_ip_limiter", main.draft_ip_limiter),
+        ("draft_session_limiter", main.draft_session_limiter),
+    ):
+        monkeypatch.setattr(main, name, KeyedRateLimiter(limiter.rate, limiter.burst))
+    monkeypatch.setattr(main.draft_validator, "debounce", 0)
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_typing_drafts_never_rate_limit_the_submit(client):
+    session_id = client.post("/start_registration").json()["session_id"]
+    email = "jane@example.com"
+    for i in range(1, len(email) + 1):
+        response = client.post(
+            "/draft_response", json={"session_id": session_id, "answer": email[:i]}
+        )
+        assert response.status_code == 200, response.text
+
+    response = client.post("/submit_response", json={"session_id": session_id, "answer": email})
+    assert response.status_code == 200, response.text
+    assert response.json()["formatted_answer"] == email
+
+
+def _engine(monkeypatch, *outcomes):
+    """Makes the drafts' engine return (or raise) `outcomes` in turn."""
+    outcomes = list(outcomes)
+
+    async def avalidate_with_engine(question, user_answer, node_key=None):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def apeek_user_input(question, user_answer, node_key=None):
+        return None
+
+    monkeypatch.setattr(drafts, "avalidate_with_engine", avalidate_with_engine)
+    monkeypatch.setattr(drafts, "apeek_user_input", apeek_user_input)
+
+
+VALID = {"status": "valid", "feedback": "ok", "formatted_answer": "Jane"}
+ERROR = {"status": "error", "feedback": "Engine unavailable", "formatted_answer": "Jane"}
+
+
+def test_a_failed_draft_is_validated_again(monkeypatch):
+    _engine(monkeypatch, RuntimeError("engine down"), VALID)
+    validator = drafts.DraftValidator(debounce=0)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await validator.draft("s1", "ask_name", "Name?", "Jane", lambda _: None)
+        return await validator.draft("s1", "ask_name", "Name?", "Jane", lambda _: None)
+
+    assert asyncio.run(scenario())["status"] == "valid"
+
+
+def test_engine_errors_of_drafts_never_become_the_submitted_verdict(monkeypatch):
+    _engine(monkeypatch, ERROR)
+    validator = drafts.DraftValidator(debounce=0)
+
+    async def scenario():
+        await validator.draft("s1", "ask_name", "Name?", "Jane", lambda _: None)
+        return validator.take("s1", "ask_name", "Jane")
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+from graph.forms import FormRegistry
+from validation.base_validator import BaseValidator
+from validation.factory import _cache_key
+from validation.rules import fallback_verdict, form_rules, node_formatter, prevalidate
+from validation.structured_output import parse_output
+
+QUESTION = "How can we reach you?"
+
+
+def _write_form(forms_dir, form_id: str, rule: str):
+    definition = {
+        "title": form_id,
+        "questions": {"ask_contact": {"text": QUESTION, "rule": rule}},
+        "edges": {"ask_contact": "END"},
+    }
+    with open(os.path.join(forms_dir, f"{form_id}.json"), "w") as f:
+        json.dump(definition, f)
+    # Make sure the registry sees a change even within the mtime granularity
+    os.utime(os.path.join(forms_dir, f"{form_id}.json"), ns=(0, len(rule) * 10**9))
+
+
+def _registry(tmp_path) -> FormRegistry:
+    forms_dir = tmp_path / "forms"
+    forms_dir.mkdir()
+    return FormRegistry(str(forms_dir), str(tmp_path / "versions"), reload_interval=0)
+
+
+def test_sessions_keep_the_rules_of_their_form_version(tmp_path):
+    registry = _registry(tmp_path)
+    _write_form(registry.forms_dir, "contact", "name")
+    old = registry.definition("contact")
+    _write_form(registry.forms_dir, "contact", "email")
+    new = registry.definition("contact")
+    assert old.version != new.version
+
+    with form_rules(old.rules):
+        assert prevalidate(QUESTION, "jane doe", "ask_contact")["formatted_answer"] == "Jane Doe"
+        assert node_formatter(QUESTION, "ask_contact")("jane doe") == "Jane Doe"
+    with form_rules(new.rules):
+        assert prevalidate(QUESTION, "jane doe", "ask_contact")["status"] == "clarify"
+        assert prevalidate(QUESTION, "Jane@Example.com", "ask_contact")["formatted_answer"] == (
+            "jane@example.com"
+        )
+        assert fallback_verdict(QUESTION, "jane doe", "ask_contact")["status"] == "clarify"
+
+    # Loading the new version didn't change the old one, even from its saved copy
+    reloaded = FormRegistry(registry.forms_dir, registry.versions_dir)
+    assert reloaded.definition("contact", old.version).rules == {"ask_contact": "name"}
+
+
+def test_forms_sharing_a_node_key_validate_concurrently(tmp_path):
+    registry = _registry(tmp_path)
+    _write_form(registry.forms_dir, "by_name", "name")
+    _write_form(registry.forms_dir, "by_email", "email")
+
+    async def validate(form_id: str):
+        with form_rules(registry.definition(form_id).rules):
+            await asyncio.sleep(0)  # Let the other form's task run in between
+            return prevalidate(QUESTION, "jane doe", "ask_contact")["status"]
+
+    async def both():
+        return await asyncio.gather(validate("by_name"), validate("by_email"))
+
+    assert asyncio.run(both()) == ["valid", "clarify"]
+
+
+def test_cached_results_are_kept_per_rule(tmp_path):
+    class Validator:
+        prompt_version = "v1"
+
+    with form_rules({"ask_contact": "name"}):
+        by_name = _cache_key(Validator, QUESTION, "jane doe", "ask_contact")
+    with form_rules({"ask_contact": "email"}):
+        by_email = _cache_key(Validator, QUESTION, "jane doe", "ask_contact")
+    assert by_name != by_email
+
+
+def test_fields_validated_one_by_one_are_formatted_by_their_node_rule():
+    class Validator(BaseValidator):
+        # Like the engines' fallback after a failed batch: only the question is passed
+        def validate(self, question, user_answer):
+            data = {"status": "valid", "feedback": "ok", "formatted_answer": user_answer}
+            return parse_output(data, question, engine="test")
+
+    fields = {"ask_contact": (QUESTION, "Jane@Example.COM")}
+    with form_rules({"ask_contact": "email"}):
+        results = Validator().validate_many(fields)
+        async_results = asyncio.run(Validator().avalidate_many(fields))
+    assert results["ask_contact"]["formatted_answer"] == "jane@example.com"
+    assert async_results["ask_contact"]["formatted_answer"] == "jane@example.com"
+
+
+def test_graphs_are_only_peeked_once_compiled(tmp_path):
+    registry = _registry(tmp_path)
+    registry.reload_interval = 60
+    _write_form(registry.forms_dir, "contact", "name")
+    definition = registry.definition("contact")
+
+    assert registry.peek("contact", definition.version) is None
+    graph = registry.get("contact", definition.version)
+    assert registry.peek("contact", definition.version) is graph
+    assert registry.peek("contact") is graph
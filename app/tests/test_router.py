@@ -0,0 +1,125 @@
+import asyncio
+import time
+import pytest
+import validation.router as router
+from helpers.admission import LLMAdmission
+from validation.factory import ValidatorFactory
+from validation.router import ValidationRouter
+from validation.structured_output import validating_node
+
+VALID = {"status": "valid", "feedback": "ok", "formatted_answer": "answer"}
+
+
+class SlowEngine:
+    prompt_version = "slow"
+    latency = 0.3
+
+    def validate(self, question, user_answer):
+        time.sleep(self.latency)
+        return {**VALID, "formatted_answer": "slow"}
+
+    async def avalidate(self, question, user_answer):
+        await asyncio.sleep(self.latency)
+        return {**VALID, "formatted_answer": "slow"}
+
+
+class QuickEngine(SlowEngine):
+    prompt_version = "quick"
+
+    def validate(self, question, user_answer):
+        return {**VALID, "formatted_answer": "quick"}
+
+    async def avalidate(self, question, user_answer):
+        return {**VALID, "formatted_answer": "quick"}
+
+
+class BrokenEngine(SlowEngine):
+    prompt_version = "broken"
+
+    def validate(self, question, user_answer):
+        raise RuntimeError("engine down")
+
+    async def avalidate(self, question, user_answer):
+        raise RuntimeError("engine down")
+
+    def validate_many(self, fields):
+        raise RuntimeError("engine down")
+
+    async def avalidate_many(self, fields):
+        raise RuntimeError("engine down")
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    for name, engine in (("slow", SlowEngine), ("quick", QuickEngine), ("broken", BrokenEngine)):
+        ValidatorFactory.register(name, engine)
+    monkeypatch.setattr(router, "HEDGE_INITIAL_DELAY", 0.02)
+    admission = LLMAdmission(max_concurrency=2, queue_size=4, interactive_reserve=0)
+    monkeypatch.setattr(router, "llm_admission", admission)
+    return admission
+
+
+def test_hedges_take_a_free_admission_slot(admission):
+    validation_router = ValidationRouter(["slow", "quick"])
+
+    async def validate():
+        async with admission.slot():  # As the factory does around every call
+            return await validation_router.avalidate("Q?", "a")
+
+    assert asyncio.run(validate())["formatted_answer"] == "quick"
+    assert validation_router.hedges == 1
+    assert validation_router.hedge_wins == 1
+    assert admission.stats()["admitted"] == 2
+    assert admission.stats()["active"] == 0
+
+    assert validation_router.validate("Q?", "a")["formatted_answer"] == "quick"
+    assert validation_router.hedges == 2
+    time.sleep(SlowEngine.latency * 2)  # The losing call finishes in the background
+    assert admission.stats()["active"] == 0
+
+
+def test_hedges_lost_to_a_faster_engine_still_count_as_latency(admission):
+    validation_router = ValidationRouter(["slow", "quick"])
+
+    async def validate():
+        async with admission.slot():
+            return await validation_router.avalidate("Q?", "a")
+
+    assert asyncio.run(validate())["formatted_answer"] == "quick"
+    # The cancelled slow call took at least the hedge delay
+    samples = list(validation_router._latencies["slow"]._samples)
+    assert len(samples) == 1 and samples[0] >= 0.02
+    assert validation_router._breakers["slow"].failures == 0
+
+
+def test_hedges_are_skipped_when_the_llm_cap_is_reached(admission):
+    validation_router = ValidationRouter(["slow", "quick"])
+
+    async def validate_at_capacity():
+        async with admission.slot(), admission.slot():
+            result = await validation_router.avalidate("Q?", "a")
+            assert admission.stats()["active"] == 2  # Never more than the cap
+            return result
+
+    assert asyncio.run(validate_at_capacity())["formatted_answer"] == "slow"
+    assert validation_router.hedges == 0
+    assert validation_router.hedges_skipped == 1
+    assert admission.stats()["active"] == 0
+
+
+def test_fallbacks_keep_the_node_rules(admission):
+    validation_router = ValidationRouter(["broken"])
+
+    with validating_node("ask_phone"):
+        result = validation_router.validate("Anything else?", "555 123 4567")
+    assert result["formatted_answer"] == "(555) 123-4567"
+    assert result["degraded"] == "true"
+
+    async def validate():
+        with validating_node("ask_phone"):
+            return await validation_router.avalidate("Anything else?", "555 123 4567")
+
+    assert asyncio.run(validate())["formatted_answer"] == "(555) 123-4567"
+
+    results = validation_router.validate_many({"ask_email": ("Anything else?", "Jane@Example.com")})
+    assert results["ask_email"]["formatted_answer"] == "jane@example.com"
@@ -0,0 +1,227 @@
+import json
+import time
+import pytest
+from db.base_store import StaleSessionError
+from db.events import answer_events, edit_event, skip_event
+from db.memory_store import InMemorySessionStore
+from db.sqlite_db import SQLiteSessionStore
+from validation.rules import form_rules
+
+VALID = {"status": "valid", "feedback": "ok", "formatted_answer": "jane@example.com"}
+
+
+def _redis_store(client=None):
+    fakeredis = pytest.importorskip("fakeredis")
+    from db.redis_store import RedisSessionStore
+
+    return RedisSessionStore(client=client if client is not None else fakeredis.FakeRedis())
+
+
+@pytest.fixture(params=["sqlite", "memory", "redis"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"), snapshot_every=3)
+    elif request.param == "memory":
+        store = InMemorySessionStore()
+    else:
+        store = _redis_store()
+    yield store
+    store.close()
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def two_workers(request, tmp_path):
+    """Two stores on the same backend, as two app processes would have."""
+    if request.param == "sqlite":
+        db_file = str(tmp_path / "sessions.db")
+        stores = SQLiteSessionStore(db_file), SQLiteSessionStore(db_file)
+    else:
+        first = _redis_store()
+        stores = first, _redis_store(first.client)
+    yield stores
+    for store in stores:
+        store.close()
+
+
+def _create(store, session_id="s1"):
+    return store.upsert(
+        session_id, {}, "What is your email?", "ask_email",
+        expected_version=0, form_id="registration", form_version="abc",
+    )
+
+
+def test_fetch_of_unknown_session(store):
+    assert store.fetch("missing") is None
+
+
+def test_new_sessions_are_pinned_to_their_form_version(store):
+    assert _create(store) == 1
+    session = store.fetch("s1")
+    assert session == {
+        "session_id": "s1",
+        "collected_data": {},
+        "current_question": "What is your email?",
+        "current_node": "ask_email",
+        "version": 1,
+        "form_id": "registration",
+        "form_version": "abc",
+    }
+
+    # Later writes keep the pin, whatever they pass
+    assert store.upsert("s1", {"ask_email": "x"}, "Name?", "ask_name", 1, form_id="other") == 2
+    assert store.fetch("s1")["form_id"] == "registration"
+    assert store.fetch("s1")["form_version"] == "abc"
+
+
+def test_conditional_writes_reject_stale_versions(store):
+    _create(store)
+    with pytest.raises(StaleSessionError):
+        _create(store)
+    with pytest.raises(StaleSessionError):
+        store.upsert("s1", {}, "Name?", "ask_name", expected_version=5)
+    assert store.upsert("s1", {}, "Name?", "ask_name", expected_version=1) == 2
+    assert store.upsert("s1", {}, "Name?", "ask_name") == 3  # Unconditional
+
+
+def test_fetched_sessions_are_copies(store):
+    _create(store)
+    store.fetch("s1")["collected_data"]["ask_email"] = "changed"
+    assert store.fetch("s1")["collected_data"] == {}
+
+
+def test_appended_events_fold_into_the_answers(store):
+    _create(store)
+    version = store.append_events(
+        "s1",
+        answer_events("ask_email", "What is your email?", "Jane@Example.com", VALID, stored=True),
+        "What is your name?",
+        "ask_name",
+        expected_version=1,
+    )
+    assert version == 2
+    for node in ("ask_name", "ask_phone", "ask_address"):
+        version = store.append_events("s1", [skip_event(node)], "Next?", node, version)
+
+    session = store.fetch("s1")
+    assert session["version"] == 5
+    assert session["collected_data"] == {
+        "ask_email": "jane@example.com",
+        "ask_name": "-",
+        "ask_phone": "-",
+        "ask_address": "-",
+    }
+    assert session["form_version"] == "abc"
+    with pytest.raises(StaleSessionError):
+        store.append_events("s1", [skip_event("ask_username")], "Next?", "ask_username", 4)
+    with pytest.raises(StaleSessionError):
+        store.append_events("missing", [skip_event("ask_email")], "Next?", "ask_name", 0)
+
+
+def test_upsert_many_writes_new_sessions(store):
+    sessions = [
+        {
+            "session_id": f"bulk-{i}",
+            "collected_data": {"ask_email": f"user{i}@example.com"},
+            "current_question": "",
+            "current_node": "ask_password",
+            "completed": True,
+            "form_id": "registration",
+            "form_version": "abc",
+        }
+        for i in range(3)
+    ]
+    assert store.upsert_many(sessions) == 3
+    session = store.fetch("bulk-2")
+    assert session["collected_data"] == {"ask_email": "user2@example.com"}
+    assert session["version"] == 1
+    assert session["form_version"] == "abc"
+
+
+def test_finished_sessions_stay_editable_until_the_archive_grace(store):
+    _create(store)
+    store.append_events(
+        "s1",
+        answer_events("ask_email", "What is your email?", "jane@example.com", VALID, stored=True),
+        "",
+        "END",
+        completed=True,
+    )
+    assert store.archive_completed(grace=3600, limit=10) == 0
+    assert store.fetch("s1")["collected_data"] == {"ask_email": "jane@example.com"}
+
+    time.sleep(0.01)
+    assert store.archive_completed(grace=0, limit=10) == 1
+    assert store.fetch("s1") is None
+    assert store.archive_completed(grace=0, limit=10) == 0
+
+
+def test_editing_a_finished_session_keeps_it_finished(store):
+    _create(store)
+    store.append_events("s1", [skip_event("ask_email")], "", "END", completed=True)
+    store.append_events(
+        "s1",
+        [edit_event("ask_email", "What is your email?", "jane@example.com", VALID, stored=True)],
+        "",
+        "END",
+    )
+    time.sleep(0.01)
+    assert store.expire_idle(ttl=0, limit=10) == 0
+    assert store.archive_completed(grace=0, limit=10) == 1
+
+
+SECRET = "S3cure-pass-1"
+SECRET_RESULT = {"status": "valid", "feedback": "ok", "formatted_answer": SECRET}
+
+
+def test_secret_answers_reach_the_session_but_not_the_journal(store):
+    _create(store)
+    # Any node under the form's "password" rule is secret, whatever its name
+    with form_rules({"ask_passphrase": "password"}):
+        version = store.append_events(
+            "s1",
+            answer_events("ask_passphrase", "Pick a passphrase", SECRET, SECRET_RESULT, stored=True),
+            "",
+            "END",
+            expected_version=1,
+        )
+        store.append_events(
+            "s1",
+            [edit_event("ask_passphrase", "Pick a passphrase", SECRET, SECRET_RESULT, stored=True)],
+            "",
+            "END",
+            expected_version=version,
+        )
+    for node in ("ask_name", "ask_phone", "ask_address"):
+        store.append_events("s1", [skip_event(node)], "Next?", node)
+
+    assert store.fetch("s1")["collected_data"]["ask_passphrase"] == SECRET
+    journal = json.dumps(list(store.events("s1")))
+    assert SECRET not in journal and "[redacted]" in journal
+
+
+def test_secret_answers_survive_a_worker_without_the_session_cached(two_workers):
+    first, second = two_workers
+    _create(first)
+    first.fetch("s1")
+    second.append_events(
+        "s1",
+        answer_events("ask_password", "Choose a password", SECRET, SECRET_RESULT, stored=True),
+        "",
+        "END",
+    )
+    second.append_events("s1", [skip_event("ask_name")], "", "END")
+    assert first.fetch("s1")["collected_data"]["ask_password"] == SECRET
+
+
+def test_workers_never_serve_a_session_another_worker_changed(two_workers):
+    first, second = two_workers
+    _create(first)
+    assert second.fetch("s1")["version"] == 1
+
+    first.append_events("s1", [skip_event("ask_email")], "What is your name?", "ask_name", 1)
+
+    session = second.fetch("s1")
+    assert session["version"] == 2
+    assert session["current_node"] == "ask_name"
+    assert session["collected_data"] == {"ask_email": "-"}
+    assert second.upsert("s1", session["collected_data"], "Phone?", "ask_phone", 2) == 3
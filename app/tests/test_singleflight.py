@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+import pytest
+import validation.factory as factory
+from validation.factory import ValidatorFactory, avalidate_with_engine, validate_with_engine
+from validation.singleflight import SingleFlight
+
+CALLERS = 8
+RESULT = {"status": "valid", "feedback": "ok", "formatted_answer": "Jane Doe"}
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _release_when_all_joined(flight: SingleFlight, release: threading.Event):
+    """Lets the leader's call finish once every other caller waits on it."""
+
+    def run():
+        _wait_for(lambda: flight.shared == CALLERS - 1)
+        release.set()
+
+    threading.Thread(target=run).start()
+
+
+def _run_threads(target) -> list:
+    outcomes = [None] * CALLERS
+
+    def run(i):
+        try:
+            outcomes[i] = target()
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_concurrent_sync_calls_share_one_call():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    def call():
+        return flight.do("key", fn)
+
+    _release_when_all_joined(flight, release)
+    assert _run_threads(call) == ["result"] * CALLERS
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "shared": CALLERS - 1, "in_flight": 0}
+
+
+def test_sync_errors_reach_every_waiter():
+    flight, release = SingleFlight(), threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise RuntimeError("backend down")
+
+    _release_when_all_joined(flight, release)
+    outcomes = _run_threads(lambda: flight.do("key", fn))
+    assert all(isinstance(e, RuntimeError) and str(e) == "backend down" for e in outcomes)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_concurrent_async_calls_share_one_call():
+    async def scenario():
+        flight, calls = SingleFlight(), []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.ado("key", fn) for _ in range(CALLERS)))
+        assert results == ["result"] * CALLERS
+        assert len(calls) == 1
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("backend down")
+
+        outcomes = await asyncio.gather(
+            *(flight.ado("other", failing) for _ in range(CALLERS)), return_exceptions=True
+        )
+        assert all(isinstance(e, RuntimeError) for e in outcomes)
+        assert flight.stats() == {"calls": 2, "shared": 2 * (CALLERS - 1), "in_flight": 0}
+
+    asyncio.run(scenario())
+
+
+class CountingValidator:
+    """An engine that blocks until released, counting its backend calls."""
+
+    prompt_version = "counting"
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.error = None
+
+    def _result(self):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return dict(RESULT)
+
+    def validate(self, question, user_answer):
+        self.release.wait(5)
+        return self._result()
+
+    async def avalidate(self, question, user_answer):
+        await asyncio.sleep(0.01)
+        return self._result()
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    ValidatorFactory.register("counting", CountingValidator)
+    monkeypatch.setattr(factory, "VALIDATION_ENGINE", "counting")
+    monkeypatch.setattr(factory, "single_flight", SingleFlight())
+    # Every round must reach the engine, not the results of the previous one
+    async def aget(key):
+        return None
+
+    monkeypatch.setattr(factory.validation_cache, "get", lambda key: None)
+    monkeypatch.setattr(factory.validation_cache, "aget", aget)
+    yield ValidatorFactory.get_validator("counting")
+    ValidatorFactory._instances.pop("counting", None)
+
+
+def test_identical_validations_make_one_backend_call(engine):
+    _release_when_all_joined(factory.single_flight, engine.release)
+    results = _run_threads(lambda: validate_with_engine("Your name?", "jane doe", "ask_name"))
+    assert results == [RESULT] * CALLERS
+    assert engine.calls == 1
+
+    async def validate_all():
+        return await asyncio.gather(
+            *(avalidate_with_engine("Your name?", "john doe", "ask_name") for _ in range(CALLERS)),
+            return_exceptions=True,
+        )
+
+    assert asyncio.run(validate_all()) == [RESULT] * CALLERS
+    assert engine.calls == 2
+
+    engine.error = RuntimeError("rate limited")
+    outcomes = asyncio.run(validate_all())
+    assert engine.calls == 3
+    assert all(isinstance(e, RuntimeError) and str(e) == "rate limited" for e in outcomes)
@@ -0,0 +1,58 @@
+import json
+import pytest
+from helpers.telemetry import ValidationTelemetry
+
+pytest.importorskip("mlflow")
+from mlflow.tracking import MlflowClient  # noqa: E402
+
+RECORDS = 25
+
+
+def test_validations_reach_a_file_tracking_store(tmp_path, monkeypatch):
+    tracking_uri = (tmp_path / "mlruns").as_uri()
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", tracking_uri)
+    telemetry = ValidationTelemetry(
+        enabled=True,
+        experiment_name="telemetry-test",
+        batch_size=10,
+        flush_interval=60,
+        sample_rate=1.0,
+    )
+    telemetry.start()
+    for i in range(RECORDS):
+        status = "valid" if i % 5 else "clarify"
+        telemetry.record(
+            "fake", "What is your name?", f"user {i}",
+            {"status": status, "feedback": "ok", "formatted_answer": f"User {i}"},
+        )
+    telemetry.stop()
+
+    assert telemetry.stats() == {
+        "enabled": True, "queued": 0, "recorded": RECORDS, "dropped": 0, "flushed": RECORDS,
+    }
+
+    client = MlflowClient(tracking_uri=tracking_uri)
+    experiment = client.get_experiment_by_name("telemetry-test")
+    runs = client.search_runs([experiment.experiment_id])
+    assert len(runs) == 3  # Two full batches and the rest, flushed on stop
+    assert {run.data.params["validation_engine"] for run in runs} == {"fake"}
+
+    values, records = [], []
+    for run in runs:
+        assert run.info.status == "FINISHED"
+        values += [m.value for m in client.get_metric_history(run.info.run_id, "valid")]
+        path = client.download_artifacts(run.info.run_id, "validations.jsonl", str(tmp_path))
+        with open(path) as f:
+            records += [json.loads(line) for line in f]
+    assert sorted(values) == [0.0] * 5 + [1.0] * 20
+    assert sorted(record["input_answer"] for record in records) == sorted(
+        f"user {i}" for i in range(RECORDS)
+    )
+
+
+def test_full_queue_drops_instead_of_blocking():
+    telemetry = ValidationTelemetry(enabled=True, max_queue=2, flush_interval=60)
+    telemetry._thread = object()  # Started, but never draining the queue
+    for _ in range(5):
+        telemetry.record("fake", "Q?", "a", {"status": "valid"})
+    assert (telemetry.recorded, telemetry.dropped) == (2, 3)
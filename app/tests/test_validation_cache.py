@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from validation.cache import ValidationCache
+
+RESULT = {"status": "valid", "feedback": "ok", "formatted_answer": "jane@example.com"}
+
+
+def test_disk_tier_is_used_off_the_event_loop(tmp_path, monkeypatch):
+    db_file = str(tmp_path / "cache.db")
+    disk_threads = []
+
+    def spy(method):
+        def wrapper(self, *args):
+            disk_threads.append(threading.current_thread())
+            return method(self, *args)
+
+        return wrapper
+
+    monkeypatch.setattr(ValidationCache, "_get_disk", spy(ValidationCache._get_disk))
+    monkeypatch.setattr(ValidationCache, "_set_disk", spy(ValidationCache._set_disk))
+
+    async def scenario():
+        cache = ValidationCache(db_file=db_file)
+        key = cache.make_key("Email?", "Jane@Example.com", "fake", "v1")
+        assert await cache.aget(key) is None
+        await cache.aset(key, RESULT, "fake", "v1")
+        assert await cache.aget(key) == RESULT  # From memory, no thread needed
+
+        restarted = ValidationCache(db_file=db_file)
+        assert await restarted.aget(key) == RESULT
+        assert restarted.stats()["disk_hits"] == 1
+        assert await restarted.aget(key) == RESULT
+        assert restarted.stats()["hits"] == 1
+
+        # Transient results stay out of both tiers
+        await restarted.aset("other", {**RESULT, "degraded": "true"}, "fake", "v1")
+        assert await ValidationCache(db_file=db_file).aget("other") is None
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(scenario())
+    assert len(disk_threads) == 4  # Miss, write, cold read, then the "other" miss
+    assert loop_thread not in disk_threads
+
+
+def test_memory_only_cache_counts_misses():
+    async def scenario():
+        cache = ValidationCache(db_file="")
+        assert await cache.aget("key") is None
+        await cache.aset("key", RESULT, "fake", "v1")
+        assert await cache.aget("key") == RESULT
+        return cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (1, 0, 1)
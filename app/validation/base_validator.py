@@ -1,10 +1,60 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import AsyncIterator, Dict, Tuple
+from validation.structured_output import validating_node
 
 class BaseValidator(ABC):
     """Abstract base class for validation strategies."""
 
+    # Identifies the prompt/signature behind the results; cached results are
+    # keyed by it, so changing a prompt must change its version.
+    prompt_version: str = "unversioned"
+
     @abstractmethod
     def validate(self, question: str, user_answer: str) -> Dict[str, str]:
         """Validate the user input and return a structured response."""
-        pass
\ No newline at end of file
+        pass
+
+    async def avalidate(self, question: str, user_answer: str) -> Dict[str, str]:
+        """
+        Async variant of `validate`. Subclasses with a native async client
+        should override this; the default runs `validate` in a worker thread.
+        """
+        return await asyncio.to_thread(self.validate, question, user_answer)
+
+    async def astream(
+        self, question: str, user_answer: str
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Yields ("token", text) chunks of feedback as the engine produces them,
+        then ("result", result). Engines that can't stream only yield the result.
+        """
+        yield "result", await self.avalidate(question, user_answer)
+
+    def validate_many(
+        self, fields: Dict[str, Tuple[str, str]]
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Validates several (question, user_answer) pairs keyed by node key.
+        Subclasses that can validate them in a single LLM call should
+        override this; the default validates one field at a time, each
+        formatted by its node's rule.
+        """
+        results = {}
+        for key, (question, user_answer) in fields.items():
+            with validating_node(key):
+                results[key] = self.validate(question, user_answer)
+        return results
+
+    async def _avalidate_node(self, node_key: str, question: str, user_answer: str):
+        with validating_node(node_key):
+            return await self.avalidate(question, user_answer)
+
+    async def avalidate_many(
+        self, fields: Dict[str, Tuple[str, str]]
+    ) -> Dict[str, Dict[str, str]]:
+        """Async variant of `validate_many`."""
+        results = await asyncio.gather(
+            *(self._avalidate_node(key, *field) for key, field in fields.items())
+        )
+        return dict(zip(fields, results))
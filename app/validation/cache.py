@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+from helpers.config import (
+    VALIDATION_CACHE_SIZE,
+    VALIDATION_CACHE_TTL,
+    VALIDATION_CACHE_DB,
+)
+
+
+def fingerprint(*parts: str) -> str:
+    """Short, stable hash used to version prompts and signatures."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_answer(user_answer: str) -> str:
+    """Normalization that never changes what a validator would return."""
+    return unicodedata.normalize("NFC", " ".join(user_answer.split()))
+
+
+class ValidationCache:
+    """
+    LRU cache of validation results with a TTL, keyed by
+    (question, normalized answer, engine, prompt version, rule).
+    An optional SQLite tier keeps entries across restarts; `aget` and `aset`
+    read and write it in a thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = VALIDATION_CACHE_SIZE,
+        ttl: float = VALIDATION_CACHE_TTL,
+        db_file: str = VALIDATION_CACHE_DB,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()  # The SQLite tier, so memory hits never wait on disk
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if db_file:
+            self._conn = sqlite3.connect(db_file, check_same_thread=False)
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS validation_cache (
+                    key TEXT PRIMARY KEY,
+                    engine TEXT,
+                    prompt_version TEXT,
+                    result TEXT,
+                    expires_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_validation_cache_version
+                    ON validation_cache (engine, prompt_version);
+                """
+            )
+
+    @staticmethod
+    def make_key(
+        question: str, user_answer: str, engine: str, prompt_version: str, rule: str = ""
+    ) -> str:
+        return fingerprint(question, normalize_answer(user_answer), engine, prompt_version, rule)
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, _, result = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(result)
+                del self._entries[key]
+            if self._conn is None:
+                self.misses += 1
+            return None
+
+    def _get_disk(self, key: str) -> Optional[Dict[str, str]]:
+        with self._disk_lock:
+            row = self._conn.execute(
+                "SELECT engine, prompt_version, result, expires_at FROM validation_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        with self._lock:
+            if row and row[3] > time.time():
+                engine, prompt_version, result_json, expires_at = row
+                result = json.loads(result_json)
+                self._store(key, (expires_at, engine, prompt_version, result))
+                self.disk_hits += 1
+                return dict(result)
+            self.misses += 1
+            return None
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        result = self._get_memory(key)
+        if result is None and self._conn is not None:
+            result = self._get_disk(key)
+        return result
+
+    async def aget(self, key: str) -> Optional[Dict[str, str]]:
+        result = self._get_memory(key)
+        if result is None and self._conn is not None:
+            result = await asyncio.to_thread(self._get_disk, key)
+        return result
+
+    def _set_memory(self, key: str, result: Dict[str, str], engine: str, prompt_version: str):
+        """Caches a result in memory; returns its disk row, or None if it isn't cached."""
+        if result.get("status") == "error" or result.get("degraded"):
+            return None  # Errors and offline fallbacks are transient; never cache them
+
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, (expires_at, engine, prompt_version, dict(result)))
+        return (key, engine, prompt_version, json.dumps(result), expires_at)
+
+    def _set_disk(self, row: tuple):
+        with self._disk_lock:
+            self._conn.execute("INSERT OR REPLACE INTO validation_cache VALUES (?, ?, ?, ?, ?)", row)
+            self._conn.commit()
+
+    def set(self, key: str, result: Dict[str, str], engine: str, prompt_version: str):
+        row = self._set_memory(key, result, engine, prompt_version)
+        if row is not None and self._conn is not None:
+            self._set_disk(row)
+
+    async def aset(self, key: str, result: Dict[str, str], engine: str, prompt_version: str):
+        row = self._set_memory(key, result, engine, prompt_version)
+        if row is not None and self._conn is not None:
+            await asyncio.to_thread(self._set_disk, row)
+
+    def _store(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, engine: Optional[str] = None, prompt_version: Optional[str] = None) -> int:
+        """
+        Drops entries for an engine (optionally only one prompt version),
+        or everything when no engine is given. Returns the number removed
+        from memory.
+        """
+        def matches(entry_engine, entry_version):
+            return (engine is None or entry_engine == engine) and (
+                prompt_version is None or entry_version == prompt_version
+            )
+
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if matches(e[1], e[2])]
+            for key in stale:
+                del self._entries[key]
+        if self._conn is not None:
+            with self._disk_lock:
+                if engine is None:
+                    self._conn.execute("DELETE FROM validation_cache")
+                elif prompt_version is None:
+                    self._conn.execute("DELETE FROM validation_cache WHERE engine = ?", (engine,))
+                else:
+                    self._conn.execute(
+                        "DELETE FROM validation_cache WHERE engine = ? AND prompt_version = ?",
+                        (engine, prompt_version),
+                    )
+                self._conn.commit()
+        return len(stale)
+
+    def invalidate_stale_versions(self, engine: str, prompt_version: str):
+        """Drops persisted entries written under an older prompt or signature."""
+        with self._lock:
+            stale = [
+                k for k, e in self._entries.items() if e[1] == engine and e[2] != prompt_version
+            ]
+            for key in stale:
+                del self._entries[key]
+        if self._conn is not None:
+            with self._disk_lock:
+                self._conn.execute(
+                    "DELETE FROM validation_cache WHERE engine = ? AND prompt_version != ?",
+                    (engine, prompt_version),
+                )
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+validation_cache = ValidationCache()
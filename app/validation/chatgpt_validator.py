@@ -1,75 +1,244 @@
 import openai
-import guardrails as gd
 import json
-from typing import Dict
+import re
+from typing import AsyncIterator, Dict, Optional, Tuple
 from validation.base_validator import BaseValidator
-from validation.validated_response import ValidatedLLMResponse
-from helpers.config import OPENAI_API_KEY, MLFLOW_ENABLED, MLFLOW_EXPERIMENT_NAME
-import mlflow
+from validation.structured_output import PARSER_VERSION, parse_output
+from validation.http_pool import get_http_pool
+from validation.cache import fingerprint
+from helpers.config import OPENAI_API_KEY, MLFLOW_AUTOLOG
+from helpers.telemetry import telemetry
+from helpers.admission import token_meter
 
-if MLFLOW_ENABLED:
-    mlflow.openai.autolog()
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that validates user responses. "
+    "You must respond in JSON format with a clear validation status. "
+    "If the response is valid, return: {'status': 'valid', 'feedback': '<feedback message>', 'formatted_answer': '<formatted response>'}. "
+    "If the response needs clarification, return: {'status': 'clarify', 'feedback': '<clarification message>', 'formatted_answer': '<original response>'}."
+    "Ensure proper formatting: lowercase emails, capitalized names, standardized phone numbers and addresses."
+)
+USER_PROMPT = "Question: {question}\nUser Answer: {user_answer}\nValidate the answer."
+BATCH_USER_PROMPT = (
+    "Validate each of these answers independently. Respond with a JSON object "
+    "mapping every field key to its own validation object as described above.\n{answers}"
+)
 
-guard = gd.Guard.for_pydantic(ValidatedLLMResponse)
+
+FEEDBACK_START = re.compile(r'"feedback"\s*:\s*"')
+JSON_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+
+class FeedbackStream:
+    """Extracts the "feedback" string of a JSON completion as it streams in."""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = None
+        self._done = False
+
+    def feed(self, delta: str) -> str:
+        """Adds a chunk of the completion; returns the new feedback text, if any."""
+        self._buffer += delta
+        if self._done:
+            return ""
+        if self._pos is None:
+            match = FEEDBACK_START.search(self._buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        text, i, buffer = [], self._pos, self._buffer
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self._done = True
+                break
+            if char == "\\":
+                if buffer[i + 1 : i + 2] == "u":
+                    if i + 6 > len(buffer):
+                        break  # Wait for the rest of the escape
+                    text.append(chr(int(buffer[i + 2 : i + 6], 16)))
+                    i += 6
+                    continue
+                if i + 1 >= len(buffer):
+                    break
+                text.append(JSON_ESCAPES.get(buffer[i + 1], buffer[i + 1]))
+                i += 2
+                continue
+            text.append(char)
+            i += 1
+        self._pos = i
+        return "".join(text)
 
 
 class ChatGPTValidator(BaseValidator):
     """ChatGPT-based implementation of the validation strategy."""
 
-    def validate(self, question: str, user_answer: str) -> Dict[str, str]:
-        """Uses OpenAI ChatGPT to validate responses."""
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    model = "gpt-3.5-turbo"
+    prompt_version = fingerprint(model, SYSTEM_PROMPT, USER_PROMPT, PARSER_VERSION)
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a helpful assistant that validates user responses. "
-                        "You must respond in JSON format with a clear validation status. "
-                        "If the response is valid, return: {'status': 'valid', 'feedback': '<feedback message>', 'formatted_answer': '<formatted response>'}. "
-                        "If the response needs clarification, return: {'status': 'clarify', 'feedback': '<clarification message>', 'formatted_answer': '<original response>'}."
-                        "Ensure proper formatting: lowercase emails, capitalized names, standardized phone numbers and addresses."
-                    ),
-                },
+    def __init__(self):
+        if MLFLOW_AUTOLOG:
+            import mlflow
+
+            mlflow.openai.autolog()
+
+        # Long-lived clients on the shared keep-alive pool, so validations
+        # don't pay a new TLS handshake each time.
+        pool = get_http_pool()
+        self.client = openai.OpenAI(api_key=OPENAI_API_KEY, http_client=pool.client)
+        self.async_client = openai.AsyncOpenAI(
+            api_key=OPENAI_API_KEY, http_client=pool.async_client
+        )
+
+    def _request_kwargs(self, question: str, user_answer: str) -> dict:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {
                     "role": "user",
-                    "content": f"Question: {question}\nUser Answer: {user_answer}\nValidate the answer.",
+                    "content": USER_PROMPT.format(
+                        question=question, user_answer=user_answer
+                    ),
                 },
             ],
-            response_format={"type": "json_object"},
-        )
+            "response_format": {"type": "json_object"},
+        }
 
+    def _batch_request_kwargs(self, fields: Dict[str, Tuple[str, str]]) -> dict:
+        answers = {
+            key: {"question": question, "user_answer": user_answer}
+            for key, (question, user_answer) in fields.items()
+        }
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": BATCH_USER_PROMPT.format(answers=json.dumps(answers))},
+            ],
+            "response_format": {"type": "json_object"},
+        }
+
+    @staticmethod
+    def _parse_result(
+        validation_result: dict, question: str, user_answer: str, node_key: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Checks and formats one decoded validation result."""
         try:
-            validation_str = response.choices[0].message.content.strip() if response.choices[0].message.content else ""
-            validation_result = json.loads(validation_str)
-            print(validation_result)
-
-            # Apply Guardrails AI
-            validated_result = guard.parse(json.dumps(validation_result))
-            validated_dict = validated_result.validated_output
-            print(validated_dict)
-        except (json.JSONDecodeError, KeyError):
-            validation_result = {
+            return parse_output(validation_result, question, node_key, engine="chatgpt")
+        except (KeyError, TypeError, ValueError):
+            return {
                 "status": "error",
                 "feedback": "Error processing validation response.",
                 "formatted_answer": user_answer,
             }
 
-        if MLFLOW_ENABLED:
-            mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
-            with mlflow.start_run(nested=True):
-                mlflow.log_param("validation_engine", "ChatGPT")
-                mlflow.log_param("question", question)
-                mlflow.log_param("input_answer", user_answer)
-                mlflow.log_param("status", validated_dict.get("status", "error"))
-                mlflow.log_param(
-                    "feedback", validated_dict.get("feedback", "No feedback")
-                )
-                mlflow.log_param(
-                    "formatted_answer",
-                    validated_dict.get("formatted_answer", user_answer),
-                )
+    @staticmethod
+    def _log_result(question: str, user_answer: str, validated_dict: Dict[str, str]):
+        telemetry.record("ChatGPT", question, user_answer, validated_dict)
+
+    @staticmethod
+    def _content(response) -> str:
+        content = response.choices[0].message.content
+        return content.strip() if content else ""
 
+    def _process_response(self, response, question: str, user_answer: str) -> Dict[str, str]:
+        """Parses and checks the completion and queues it for MLflow."""
+        return self._process_content(self._content(response), question, user_answer)
+
+    def _process_content(self, content: str, question: str, user_answer: str) -> Dict[str, str]:
+        try:
+            validated_dict = self._parse_result(json.loads(content), question, user_answer)
+        except json.JSONDecodeError:
+            validated_dict = {
+                "status": "error",
+                "feedback": "Error processing validation response.",
+                "formatted_answer": user_answer,
+            }
+        self._log_result(question, user_answer, validated_dict)
         return validated_dict
+
+    def _process_batch_response(
+        self, response, fields: Dict[str, Tuple[str, str]]
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Returns the results for the fields the batched completion answered
+        properly; the caller re-validates the missing ones one by one.
+        """
+        try:
+            batch = json.loads(self._content(response))
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(batch, dict):
+            return {}
+
+        results = {}
+        for key, (question, user_answer) in fields.items():
+            if not isinstance(batch.get(key), dict):
+                continue
+            validated_dict = self._parse_result(batch[key], question, user_answer, key)
+            if validated_dict["status"] != "error":
+                self._log_result(question, user_answer, validated_dict)
+                results[key] = validated_dict
+        return results
+
+    def validate(self, question: str, user_answer: str) -> Dict[str, str]:
+        """Uses OpenAI ChatGPT to validate responses."""
+        response = self.client.chat.completions.create(
+            **self._request_kwargs(question, user_answer)
+        )
+        return self._process_response(response, question, user_answer)
+
+    async def avalidate(self, question: str, user_answer: str) -> Dict[str, str]:
+        """Uses the async OpenAI client so the event loop is never blocked."""
+        response = await self.async_client.chat.completions.create(
+            **self._request_kwargs(question, user_answer)
+        )
+        return self._process_response(response, question, user_answer)
+
+    async def astream(
+        self, question: str, user_answer: str
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """Streams the completion, yielding the feedback text as it arrives."""
+        stream = await self.async_client.chat.completions.create(
+            **self._request_kwargs(question, user_answer),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        content, feedback = [], FeedbackStream()
+        async for chunk in stream:
+            if chunk.usage:
+                # Streams bypass the pool's usage hook; the last chunk carries the totals
+                token_meter.record(chunk.usage.total_tokens)
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            content.append(delta)
+            text = feedback.feed(delta)
+            if text:
+                yield "token", text
+        yield "result", self._process_content("".join(content).strip(), question, user_answer)
+
+    def validate_many(
+        self, fields: Dict[str, Tuple[str, str]]
+    ) -> Dict[str, Dict[str, str]]:
+        """Validates all fields in one completion, falling back per field."""
+        response = self.client.chat.completions.create(**self._batch_request_kwargs(fields))
+        results = self._process_batch_response(response, fields)
+        missing = {key: fields[key] for key in fields.keys() - results.keys()}
+        if missing:
+            results.update(super().validate_many(missing))
+        return results
+
+    async def avalidate_many(
+        self, fields: Dict[str, Tuple[str, str]]
+    ) -> Dict[str, Dict[str, str]]:
+        response = await self.async_client.chat.completions.create(
+            **self._batch_request_kwargs(fields)
+        )
+        results = self._process_batch_response(response, fields)
+        missing = {key: fields[key] for key in fields.keys() - results.keys()}
+        if missing:
+            results.update(await super().avalidate_many(missing))
+        return results
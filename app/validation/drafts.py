@@ -0,0 +1,188 @@
+import asyncio
+import collections
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from .cache import normalize_answer
+from .factory import apeek_user_input, avalidate_with_engine
+from helpers.admission import BULK, current_priority
+from helpers.config import (
+    DRAFT_DEBOUNCE_MS,
+    DRAFT_LLM_BUDGET,
+    DRAFT_TTL,
+    DRAFT_MAX_SESSIONS,
+)
+
+OVER_BUDGET = {"status": "over_budget"}
+
+
+class _Draft:
+    __slots__ = ("answer", "task", "finished_at")
+
+    def __init__(self, answer: str, task: asyncio.Task):
+        self.answer = answer
+        self.task = task
+        self.finished_at: Optional[float] = None
+
+
+class DraftValidator:
+    """
+    Validates answers speculatively while the user is still typing.
+
+    A draft waits `debounce` seconds before doing anything, and a newer
+    draft for the same (session, node) cancels it. Rules and the cache
+    settle drafts for free; anything else spends one of the session's
+    `budget` speculative LLM calls, at bulk priority so they never hold up
+    submitted answers. Finished drafts are kept per (session,
+    node) so that submitting the same answer reuses the result.
+    """
+
+    def __init__(
+        self,
+        debounce: float = DRAFT_DEBOUNCE_MS / 1000,
+        budget: int = DRAFT_LLM_BUDGET,
+        ttl: float = DRAFT_TTL,
+        max_sessions: int = DRAFT_MAX_SESSIONS,
+    ):
+        self.debounce = debounce
+        self.budget = budget
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._drafts: Dict[Tuple[str, str], _Draft] = {}
+        # session_id -> speculative LLM calls spent, oldest session first
+        self._spent: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.drafts = 0
+        self.superseded = 0
+        self.over_budget = 0
+        self.llm_calls = 0
+        self.reused = 0
+
+    def _touch(self, session_id: str):
+        """Marks the session as recently active, evicting the least recent ones."""
+        with self._lock:
+            self._spent[session_id] = self._spent.pop(session_id, 0)
+            evicted = []
+            while len(self._spent) > self.max_sessions:
+                evicted.append(self._spent.popitem(last=False)[0])
+        for old_session in evicted:
+            self._drop_drafts(old_session)
+
+    def _charge(self, session_id: str) -> bool:
+        """Takes one speculative LLM call from the session's budget, if any is left."""
+        with self._lock:
+            spent = self._spent.get(session_id, 0)
+            if spent >= self.budget:
+                self.over_budget += 1
+                return False
+            self._spent[session_id] = spent + 1
+            self.llm_calls += 1
+            return True
+
+    def _drop_drafts(self, session_id: str):
+        for key in [key for key in self._drafts if key[0] == session_id]:
+            self._drafts.pop(key).task.cancel()
+
+    async def _validate(
+        self, session_id: str, node_key: str, question: str, user_answer: str
+    ) -> Dict[str, str]:
+        current_priority.set(BULK)  # Only affects this draft's task
+        await asyncio.sleep(self.debounce)
+        result = await apeek_user_input(question, user_answer, node_key)
+        if result is not None:
+            return result
+        if not self._charge(session_id):
+            return OVER_BUDGET
+        return await avalidate_with_engine(question, user_answer, node_key)
+
+    async def draft(
+        self,
+        session_id: str,
+        node_key: str,
+        question: str,
+        user_answer: str,
+        next_node: Callable[[str], Optional[str]],
+    ) -> dict:
+        """
+        Validates a draft answer. Returns the validation result plus the
+        node that would follow it (`next_node` is given the formatted
+        answer), {"status": "superseded"} if a newer draft replaced this
+        one, or {"status": "over_budget"}.
+        """
+        self._touch(session_id)
+        key, answer = (session_id, node_key), normalize_answer(user_answer)
+        draft = self._drafts.get(key)
+        if draft is None or draft.answer != answer or not self._reusable(draft):
+            if draft is not None and not draft.task.done():
+                draft.task.cancel()
+                self.superseded += 1
+            task = asyncio.ensure_future(
+                self._validate(session_id, node_key, question, user_answer)
+            )
+            draft = self._drafts[key] = _Draft(answer, task)
+            task.add_done_callback(lambda _: setattr(draft, "finished_at", time.monotonic()))
+            self.drafts += 1
+
+        await asyncio.wait({draft.task})
+        if draft.task.cancelled():
+            return {"status": "superseded"}
+        if not self._reusable(draft):
+            # Failed, so the next draft of this answer validates it again
+            if self._drafts.get(key) is draft:
+                del self._drafts[key]
+        result = draft.task.result()
+        if result is OVER_BUDGET:
+            self._drafts.pop(key, None)
+            return dict(OVER_BUDGET)
+
+        if result["status"] == "valid":
+            return {**result, "next_node": next_node(result["formatted_answer"])}
+        return {**result, "next_node": None}
+
+    @staticmethod
+    def _reusable(draft: _Draft) -> bool:
+        """False once the draft's task was cancelled, raised or got an engine error."""
+        task = draft.task
+        if not task.done():
+            return True
+        if task.cancelled() or task.exception() is not None:
+            return False
+        result = task.result()
+        return result is OVER_BUDGET or result["status"] != "error"
+
+    def take(self, session_id: str, node_key: str, user_answer: str) -> Optional[Dict[str, str]]:
+        """Returns and forgets the finished draft result for this exact answer, if any."""
+        draft = self._drafts.pop((session_id, node_key), None)
+        if (
+            draft is None
+            or draft.answer != normalize_answer(user_answer)
+            or not draft.task.done()
+            or not self._reusable(draft)
+        ):
+            if draft is not None and not draft.task.done():
+                self._drafts[(session_id, node_key)] = draft  # Still running; keep it
+            return None
+        result = draft.task.result()
+        if result is OVER_BUDGET or time.monotonic() - draft.finished_at > self.ttl:
+            return None
+        self.reused += 1
+        return result
+
+    def forget(self, session_id: str):
+        """Drops a finished session's drafts and budget."""
+        with self._lock:
+            self._spent.pop(session_id, None)
+        self._drop_drafts(session_id)
+
+    def stats(self) -> dict:
+        return {
+            "drafts": self.drafts,
+            "pending": len(self._drafts),
+            "superseded": self.superseded,
+            "over_budget": self.over_budget,
+            "llm_calls": self.llm_calls,
+            "reused": self.reused,
+        }
+
+
+draft_validator = DraftValidator()
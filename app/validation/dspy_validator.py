@@ -1,20 +1,52 @@
-import guardrails as gd
 import dspy
 from validation.base_validator import BaseValidator
 from pydantic import ValidationError
-from validation.validated_response import ValidatedLLMResponse
-from typing import Literal
+from validation.structured_output import MalformedOutput, PARSER_VERSION, parse_output
+from validation.http_pool import get_http_pool
+from validation.cache import fingerprint
+from helpers.telemetry import telemetry
+from typing import Dict, Literal, Optional, Tuple
 import logging
-import json
-import mlflow
-from helpers.config import OPENAI_API_KEY, MLFLOW_ENABLED, MLFLOW_EXPERIMENT_NAME
+import threading
+import litellm
+from helpers.config import (
+    OPENAI_API_KEY,
+    MLFLOW_AUTOLOG,
+    DSPY_ASYNC_MAX_WORKERS,
+)
 
-dspy.settings.configure(lm=dspy.LM(model="gpt-3.5-turbo", api_key=OPENAI_API_KEY))
+LM_MODEL = "gpt-3.5-turbo"
 
-if MLFLOW_ENABLED:
-    mlflow.dspy.autolog()
+_configure_lock = threading.Lock()
+_configured = False
 
-guard = gd.Guard.for_pydantic(ValidatedLLMResponse)
+
+def configure_dspy():
+    """Configures the DSPy LM (and MLflow autologging) once per process."""
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        dspy.settings.configure(
+            lm=dspy.LM(model=LM_MODEL, api_key=OPENAI_API_KEY),
+            async_max_workers=DSPY_ASYNC_MAX_WORKERS,
+        )
+        if MLFLOW_AUTOLOG:
+            import mlflow
+
+            mlflow.dspy.autolog()
+        _configured = True
+
+FORMATTING_RULES = (
+    "Return the response with proper formatting. Example: "
+    "- Emails: Lowercase (e.g., 'John@gmail.com' → 'john@gmail.com'). "
+    "- Names: Capitalize first & last name (e.g., 'john doe' → 'John Doe'). "
+    "- Addresses: Capitalize & ensure complete info (e.g., '123 main st,newyork,ny' → '123 Main St, New York, NY 10001'). "
+    "- Phone numbers: Format as (XXX) XXX-XXXX (e.g., '1234567890' → '(123) 456-7890'). "
+    "An address must include: street number, street name, city, state, and ZIP code. "
+    "Reject responses that do not meet this format with status='clarify'."
+    "If the response cannot be formatted, return the original answer."
+)
 
 # Define DSPy Signature
 class ValidateUserAnswer(dspy.Signature):
@@ -29,59 +61,146 @@ class ValidateUserAnswer(dspy.Signature):
     feedback: str = dspy.OutputField(
         desc="Explanation if response is incorrect or needs details."
     )
-    formatted_answer: str = dspy.OutputField(
-        desc="Return the response with proper formatting. Example: "
-        "- Emails: Lowercase (e.g., 'John@gmail.com' → 'john@gmail.com'). "
-        "- Names: Capitalize first & last name (e.g., 'john doe' → 'John Doe'). "
-        "- Addresses: Capitalize & ensure complete info (e.g., '123 main st,newyork,ny' → '123 Main St, New York, NY 10001'). "
-        "- Phone numbers: Format as (XXX) XXX-XXXX (e.g., '1234567890' → '(123) 456-7890'). "
-        "An address must include: street number, street name, city, state, and ZIP code. "
-        "Reject responses that do not meet this format with status='clarify'."
-        "If the response cannot be formatted, return the original answer."
+    formatted_answer: str = dspy.OutputField(desc=FORMATTING_RULES)
+
+
+# Multi-output variant: validates several fields in a single LM call
+class ValidateUserAnswers(dspy.Signature):
+    """Validates and formats several user responses independently. Each result should be 'valid', 'clarify', or 'error'."""
+
+    answers: Dict[str, Dict[str, str]] = dspy.InputField(
+        desc="Maps each field key to its 'question' and 'user_answer'."
+    )
+
+    results: Dict[str, Dict[str, str]] = dspy.OutputField(
+        desc="Maps every field key to an object with 'status' ('valid', 'clarify' or 'error'), "
+        "'feedback' (explanation if the response is incorrect or needs details) and "
+        "'formatted_answer'. " + FORMATTING_RULES
     )
 
 
 run_llm_validation = dspy.Predict(ValidateUserAnswer)
+run_batch_validation = dspy.Predict(ValidateUserAnswers)
 
 
 class DSPyValidator(BaseValidator):
-    """Uses DSPy with Guardrails AI for structured validation."""
+    """Uses DSPy for structured validation, checked locally or by Guardrails AI (strict mode)."""
+
+    prompt_version = fingerprint(
+        LM_MODEL,
+        ValidateUserAnswer.signature,
+        ValidateUserAnswer.instructions,
+        *(
+            str(field.json_schema_extra.get("desc", ""))
+            for field in ValidateUserAnswer.fields.values()
+        ),
+        PARSER_VERSION,
+    )
+
+    def __init__(self):
+        configure_dspy()
+
+        # DSPy calls the provider through LiteLLM; route it over the shared pool.
+        pool = get_http_pool()
+        litellm.client_session = pool.client
+        litellm.aclient_session = pool.async_client
+
+        # asyncify sizes its worker pool from the settings, so it must run
+        # after configure_dspy()
+        self._arun_llm_validation = dspy.asyncify(run_llm_validation)
+        self._arun_batch_validation = dspy.asyncify(run_batch_validation)
+
+    def _process_result(
+        self, raw_result: dict, question: str, user_answer: str, node_key: Optional[str] = None
+    ):
+        """Checks and formats a DSPy prediction and queues it for MLflow."""
+        validated_dict = parse_output(raw_result, question, node_key, engine="dspy")
+
+        telemetry.record("DSPy + Guardrails AI", question, user_answer, validated_dict)
+
+        return validated_dict
+
+    @staticmethod
+    def _error_result(error: Exception, user_answer: str):
+        logging.error(f"Validation error: {str(error)}")
+        if isinstance(error, (ValidationError, MalformedOutput)):
+            feedback = "Output validation failed."
+        else:
+            feedback = "An error occurred during validation."
+        return {
+            "status": "error",
+            "feedback": feedback,
+            "formatted_answer": user_answer,
+        }
 
     def validate(self, question: str, user_answer: str):
-        """Validates user response, applies guardrails, and logs to MLflow."""
+        """Validates user response, checks the output, and queues it for MLflow."""
         try:
             raw_result = run_llm_validation(question=question, user_answer=user_answer)
-            structured_validation_output = guard.parse(json.dumps(raw_result.toDict()))
-            validated_dict = dict(structured_validation_output.validated_output)
-
-            if MLFLOW_ENABLED:
-                mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
-                with mlflow.start_run(nested=True):
-                    mlflow.log_param("validation_engine", "DSPy + Guardrails AI")
-                    mlflow.log_param("question", question)
-                    mlflow.log_param("input_answer", user_answer)
-                    mlflow.log_param("status", validated_dict["status"])
-                    mlflow.log_param(
-                        "formatted_answer", validated_dict["formatted_answer"]
-                    )
-
-            return {
-                "status": validated_dict["status"],
-                "feedback": validated_dict["feedback"],
-                "formatted_answer": validated_dict["formatted_answer"],
-            }
-
-        except ValidationError as ve:
-            logging.error(f"Validation error: {str(ve)}")
-            return {
-                "status": "error",
-                "feedback": "Output validation failed.",
-                "formatted_answer": user_answer,
-            }
+            return self._process_result(raw_result.toDict(), question, user_answer)
+        except Exception as e:
+            return self._error_result(e, user_answer)
+
+    async def avalidate(self, question: str, user_answer: str):
+        """
+        Async variant of `validate`. DSPy runs the prediction on its own
+        bounded worker pool, so it doesn't compete with FastAPI's threadpool.
+        """
+        try:
+            raw_result = await self._arun_llm_validation(
+                question=question, user_answer=user_answer
+            )
+            return self._process_result(raw_result.toDict(), question, user_answer)
+        except Exception as e:
+            return self._error_result(e, user_answer)
+
+    @staticmethod
+    def _batch_answers(fields: Dict[str, Tuple[str, str]]) -> dict:
+        return {
+            key: {"question": question, "user_answer": user_answer}
+            for key, (question, user_answer) in fields.items()
+        }
+
+    def _process_batch(self, raw_result, fields: Dict[str, Tuple[str, str]]):
+        """
+        Returns the results for the fields the batched prediction answered
+        properly; the caller re-validates the missing ones one by one.
+        """
+        batch = getattr(raw_result, "results", None)
+        if not isinstance(batch, dict):
+            return {}
+
+        results = {}
+        for key, (question, user_answer) in fields.items():
+            if not isinstance(batch.get(key), dict):
+                continue
+            try:
+                results[key] = self._process_result(batch[key], question, user_answer, key)
+            except Exception as e:
+                logging.error(f"Batched validation of {key} failed: {str(e)}")
+        return results
+
+    def validate_many(self, fields: Dict[str, Tuple[str, str]]):
+        """Validates all fields in one prediction, falling back per field."""
+        try:
+            raw_result = run_batch_validation(answers=self._batch_answers(fields))
+            results = self._process_batch(raw_result, fields)
+        except Exception as e:
+            logging.error(f"Batched validation error: {str(e)}")
+            results = {}
+        missing = {key: fields[key] for key in fields.keys() - results.keys()}
+        if missing:
+            results.update(super().validate_many(missing))
+        return results
+
+    async def avalidate_many(self, fields: Dict[str, Tuple[str, str]]):
+        try:
+            raw_result = await self._arun_batch_validation(answers=self._batch_answers(fields))
+            results = self._process_batch(raw_result, fields)
         except Exception as e:
-            logging.error(f"Validation error: {str(e)}")
-            return {
-                "status": "error",
-                "feedback": "An error occurred during validation.",
-                "formatted_answer": user_answer,
-            }
+            logging.error(f"Batched validation error: {str(e)}")
+            results = {}
+        missing = {key: fields[key] for key in fields.keys() - results.keys()}
+        if missing:
+            results.update(await super().avalidate_many(missing))
+        return results
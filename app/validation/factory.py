@@ -1,22 +1,318 @@
-from .dspy_validator import DSPyValidator
-from .chatgpt_validator import ChatGPTValidator
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, Optional, Tuple
+from .http_pool import get_http_pool
+from .rules import fallback_verdict, is_secret, prevalidate, rule_name_for, rule_stats
+from .cache import validation_cache
+from .singleflight import SingleFlight
+from .structured_output import validating_node
+from helpers.admission import llm_admission, token_meter
+from helpers.telemetry import telemetry
+from helpers.metrics import timed
 from helpers.config import VALIDATION_ENGINE
+from helpers.lazy_import import load_object
 
 
 class ValidatorFactory:
     """Factory class for creating validator instances."""
 
-    _validators = {"dspy": DSPyValidator, "chatgpt": ChatGPTValidator}
+    # Engines are imported on first use, so a process only loads the heavy
+    # dependencies (dspy, openai, guardrails) of the engine it runs.
+    _validators = {
+        "dspy": "validation.dspy_validator:DSPyValidator",
+        "chatgpt": "validation.chatgpt_validator:ChatGPTValidator",
+        "router": "validation.router:ValidationRouter",
+    }
+    _instances: dict = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def register(cls, engine: str, validator_class):
+        """
+        Registers an additional validation engine (e.g. a stub for load tests),
+        as a class or a "module:Class" path.
+        """
+        with cls._lock:
+            cls._validators[engine] = validator_class
+            cls._instances.pop(engine, None)
 
     @classmethod
     def create_validator(cls, engine: str):
         """Creates a validator instance dynamically."""
         if engine not in cls._validators:
             raise ValueError(f"Invalid validation engine: {engine}")
-        return cls._validators[engine]()
+        return load_object(cls._validators[engine])()
+
+    @classmethod
+    def get_validator(cls, engine: str):
+        """Returns the long-lived validator for an engine, creating it once."""
+        validator = cls._instances.get(engine)
+        if validator is None:
+            with cls._lock:
+                validator = cls._instances.get(engine)
+                if validator is None:
+                    validator = cls.create_validator(engine)
+                    cls._instances[engine] = validator
+                    validation_cache.invalidate_stale_versions(
+                        engine, validator.prompt_version
+                    )
+        return validator
+
+
+# Deduplicates identical validations that are in flight at the same time
+single_flight = SingleFlight()
+
+
+def _cache_key(validator, question: str, user_answer: str, node_key: Optional[str]) -> str:
+    # Results are formatted by the node's rule, which depends on the session's form
+    return validation_cache.make_key(
+        question,
+        user_answer,
+        VALIDATION_ENGINE,
+        validator.prompt_version,
+        rule_name_for(question, node_key) or "",
+    )
+
+
+def _is_cacheable(question: str, node_key: Optional[str]) -> bool:
+    # Keep secrets out of the cache (and its SQLite tier)
+    return not is_secret(question, node_key) and "password" not in question.lower()
+
+
+def validate_with_engine(
+    question: str, user_answer: str, node_key: Optional[str] = None
+):
+    """
+    Validates through the configured engine, behind the cache and
+    single-flight. Sessions over their LLM token cap get the local rules'
+    verdict instead.
+    """
+    validator = ValidatorFactory.get_validator(VALIDATION_ENGINE)
+    if not _is_cacheable(question, node_key):
+        if token_meter.exhausted():
+            return fallback_verdict(question, user_answer, node_key)
+        with timed("llm", VALIDATION_ENGINE, node_key), validating_node(node_key):
+            return validator.validate(question, user_answer)
+
+    key = _cache_key(validator, question, user_answer, node_key)
+    result = validation_cache.get(key)
+    if result is not None:
+        return result
+    if token_meter.exhausted():
+        return fallback_verdict(question, user_answer, node_key)
+
+    def call():
+        with timed("llm", VALIDATION_ENGINE, node_key), validating_node(node_key):
+            result = validator.validate(question, user_answer)
+        validation_cache.set(key, result, VALIDATION_ENGINE, validator.prompt_version)
+        return result
+
+    return dict(single_flight.do(key, call))
+
+
+async def avalidate_with_engine(
+    question: str, user_answer: str, node_key: Optional[str] = None
+):
+    """
+    Async variant of `validate_with_engine`. LLM calls also wait for an
+    admission slot, and raise `Overloaded` when the wait queue is full.
+    """
+    validator = ValidatorFactory.get_validator(VALIDATION_ENGINE)
+    if not _is_cacheable(question, node_key):
+        if token_meter.exhausted():
+            return fallback_verdict(question, user_answer, node_key)
+        async with llm_admission.slot():
+            with timed("llm", VALIDATION_ENGINE, node_key), validating_node(node_key):
+                return await validator.avalidate(question, user_answer)
+
+    key = _cache_key(validator, question, user_answer, node_key)
+    result = await validation_cache.aget(key)
+    if result is not None:
+        return result
+    if token_meter.exhausted():
+        return fallback_verdict(question, user_answer, node_key)
+
+    async def call():
+        async with llm_admission.slot():
+            with timed("llm", VALIDATION_ENGINE, node_key), validating_node(node_key):
+                result = await validator.avalidate(question, user_answer)
+        await validation_cache.aset(key, result, VALIDATION_ENGINE, validator.prompt_version)
+        return result
+
+    return dict(await single_flight.ado(key, call))
+
+
+def validate_user_input(
+    question: str, user_answer: str, node_key: Optional[str] = None
+):
+    """
+    Settles the answer by rule when possible, otherwise uses the factory to
+    get the appropriate validator.
+    """
+    with timed("validate", VALIDATION_ENGINE, node_key):
+        result = prevalidate(question, user_answer, node_key)
+        if result is not None:
+            return result
+        return validate_with_engine(question, user_answer, node_key)
+
+
+async def avalidate_user_input(
+    question: str, user_answer: str, node_key: Optional[str] = None
+):
+    """Async variant of `validate_user_input` for use on the event loop."""
+    with timed("validate", VALIDATION_ENGINE, node_key):
+        result = prevalidate(question, user_answer, node_key)
+        if result is not None:
+            return result
+        return await avalidate_with_engine(question, user_answer, node_key)
+
+
+def peek_user_input(
+    question: str, user_answer: str, node_key: Optional[str] = None
+) -> Optional[Dict[str, str]]:
+    """Returns the rule or cached verdict for an answer, or None if it needs an LLM call."""
+    result = prevalidate(question, user_answer, node_key)
+    if result is not None or not _is_cacheable(question, node_key):
+        return result
+    validator = ValidatorFactory.get_validator(VALIDATION_ENGINE)
+    return validation_cache.get(
+        _cache_key(validator, question, user_answer, node_key)
+    )
+
+
+async def apeek_user_input(
+    question: str, user_answer: str, node_key: Optional[str] = None
+) -> Optional[Dict[str, str]]:
+    """Async variant of `peek_user_input` for use on the event loop."""
+    result = prevalidate(question, user_answer, node_key)
+    if result is not None or not _is_cacheable(question, node_key):
+        return result
+    validator = ValidatorFactory.get_validator(VALIDATION_ENGINE)
+    return await validation_cache.aget(
+        _cache_key(validator, question, user_answer, node_key)
+    )
+
+
+async def astream_user_input(
+    question: str, user_answer: str, node_key: Optional[str] = None
+) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Streaming variant of `avalidate_user_input`. Yields ("rule", result) when
+    a rule settles the answer and ("token", text) chunks of LLM feedback as
+    they arrive, and always ends with ("result", result). Streams aren't
+    shared through single-flight; the final result is still cached.
+    """
+    with timed("validate", VALIDATION_ENGINE, node_key):
+        result = prevalidate(question, user_answer, node_key)
+        if result is not None:
+            yield "rule", result
+            yield "result", result
+            return
+
+        validator = ValidatorFactory.get_validator(VALIDATION_ENGINE)
+        key = None
+        if _is_cacheable(question, node_key):
+            key = _cache_key(validator, question, user_answer, node_key)
+            result = await validation_cache.aget(key)
+            if result is not None:
+                yield "result", result
+                return
+
+        if token_meter.exhausted():
+            result = fallback_verdict(question, user_answer, node_key)
+            yield "result", result
+            return
+
+        async with llm_admission.slot():
+            with timed("llm", VALIDATION_ENGINE, node_key), validating_node(node_key):
+                async for kind, payload in validator.astream(question, user_answer):
+                    if kind == "result":
+                        result = payload
+                    else:
+                        yield kind, payload
+        if key is not None:
+            await validation_cache.aset(key, result, VALIDATION_ENGINE, validator.prompt_version)
+        yield "result", result
+
+
+def _split_settled(validator, fields: Dict[str, Tuple[str, str]]):
+    """Separates fields settled by rule or cache from those needing the LLM."""
+    settled, pending, keys = {}, {}, {}
+    for node_key, (question, user_answer) in fields.items():
+        result = prevalidate(question, user_answer, node_key)
+        if result is None and _is_cacheable(question, node_key):
+            keys[node_key] = _cache_key(validator, question, user_answer, node_key)
+            result = validation_cache.get(keys[node_key])
+        if result is None:
+            pending[node_key] = (question, user_answer)
+        else:
+            settled[node_key] = result
+    return settled, pending, keys
+
+
+def _fallback_batch(pending: Dict[str, Tuple[str, str]]) -> Dict[str, Dict[str, str]]:
+    return {
+        node_key: fallback_verdict(question, user_answer, node_key)
+        for node_key, (question, user_answer) in pending.items()
+    }
+
+
+def _store_batch(validator, batch: Dict[str, Dict[str, str]], keys: Dict[str, str]):
+    for node_key, result in batch.items():
+        if node_key in keys:
+            validation_cache.set(
+                keys[node_key], result, VALIDATION_ENGINE, validator.prompt_version
+            )
+
+
+def validate_user_inputs(
+    fields: Dict[str, Tuple[str, str]]
+) -> Dict[str, Dict[str, str]]:
+    """
+    Validates several (question, user_answer) pairs keyed by node key. Fields
+    that rules and the cache can't settle share a single LLM call.
+    """
+    validator = ValidatorFactory.get_validator(VALIDATION_ENGINE)
+    results, pending, keys = _split_settled(validator, fields)
+    if pending and token_meter.exhausted():
+        results.update(_fallback_batch(pending))
+    elif pending:
+        with timed("llm_batch", VALIDATION_ENGINE):
+            batch = validator.validate_many(pending)
+        _store_batch(validator, batch, keys)
+        results.update(batch)
+    return results
+
+
+async def avalidate_user_inputs(
+    fields: Dict[str, Tuple[str, str]]
+) -> Dict[str, Dict[str, str]]:
+    """Async variant of `validate_user_inputs`; cache lookups and writes run in a thread."""
+    validator = ValidatorFactory.get_validator(VALIDATION_ENGINE)
+    results, pending, keys = await asyncio.to_thread(_split_settled, validator, fields)
+    if pending and token_meter.exhausted():
+        results.update(_fallback_batch(pending))
+    elif pending:
+        async with llm_admission.slot():
+            with timed("llm_batch", VALIDATION_ENGINE):
+                batch = await validator.avalidate_many(pending)
+        await asyncio.to_thread(_store_batch, validator, batch, keys)
+        results.update(batch)
+    return results
 
 
-def validate_user_input(question: str, user_answer: str):
-    """Uses the factory to get the appropriate validator."""
-    validator = ValidatorFactory.create_validator(VALIDATION_ENGINE)
-    return validator.validate(question, user_answer)
+def validation_stats() -> dict:
+    """Runtime statistics of the validation layer."""
+    stats = {
+        "http_pool": get_http_pool().stats(),
+        "rules": rule_stats.snapshot(),
+        "cache": validation_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "telemetry": telemetry.stats(),
+        "admission": llm_admission.stats(),
+        "token_meter": token_meter.stats(),
+    }
+    router = ValidatorFactory._instances.get("router")
+    if router is not None:
+        stats["router"] = router.stats()
+    return stats
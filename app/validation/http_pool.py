@@ -0,0 +1,165 @@
+import threading
+import httpx
+from typing import Optional
+from helpers.admission import token_meter
+from helpers.config import (
+    OPENAI_POOL_MAX_CONNECTIONS,
+    OPENAI_POOL_MAX_KEEPALIVE,
+    OPENAI_POOL_KEEPALIVE_EXPIRY,
+    OPENAI_TIMEOUT,
+    OPENAI_CONNECT_TIMEOUT,
+)
+
+
+class HTTPConnectionPool:
+    """
+    Owns the keep-alive HTTP clients shared by every LLM call, counts how
+    many requests were served on a new vs. a reused connection, and charges
+    the tokens reported in each response to the calling session.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = OPENAI_POOL_MAX_CONNECTIONS,
+        max_keepalive: int = OPENAI_POOL_MAX_KEEPALIVE,
+        keepalive_expiry: float = OPENAI_POOL_KEEPALIVE_EXPIRY,
+        timeout: float = OPENAI_TIMEOUT,
+        connect_timeout: float = OPENAI_CONNECT_TIMEOUT,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        `transport` / `async_transport` replace the default pooled transports,
+        e.g. with an evaluation cassette wrapping `pooled_transports()`.
+        """
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        timeouts = httpx.Timeout(timeout, connect=connect_timeout)
+        self.client = httpx.Client(
+            limits=limits,
+            timeout=timeouts,
+            transport=transport,
+            event_hooks={"request": [self._on_request], "response": [self._on_response]},
+        )
+        self.async_client = httpx.AsyncClient(
+            limits=limits,
+            timeout=timeouts,
+            transport=async_transport,
+            event_hooks={
+                "request": [self._on_async_request],
+                "response": [self._on_async_response],
+            },
+        )
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _trace(self, event_name: str, info: dict):
+        # httpcore only emits connect events when it has to open a connection
+        if event_name == "connection.connect_tcp.complete":
+            self._count("connections_opened")
+
+    async def _async_trace(self, event_name: str, info: dict):
+        self._trace(event_name, info)
+
+    def _on_request(self, request: httpx.Request):
+        self._count("requests")
+        request.extensions["trace"] = self._trace
+
+    async def _on_async_request(self, request: httpx.Request):
+        self._count("requests")
+        request.extensions["trace"] = self._async_trace
+
+    @staticmethod
+    def _has_usage(response: httpx.Response) -> bool:
+        # Streamed completions are left unread; they report no usage by default
+        return response.headers.get("content-type", "").startswith("application/json")
+
+    @staticmethod
+    def _record_usage(response: httpx.Response):
+        try:
+            usage = response.json().get("usage") or {}
+        except (ValueError, AttributeError):
+            return
+        token_meter.record(usage.get("total_tokens", 0))
+
+    def _on_response(self, response: httpx.Response):
+        if self._has_usage(response):
+            response.read()
+            self._record_usage(response)
+
+    async def _on_async_response(self, response: httpx.Response):
+        if self._has_usage(response):
+            await response.aread()
+            self._record_usage(response)
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests, opened = self.requests, self.connections_opened
+        return {
+            "requests": requests,
+            "connections_opened": opened,
+            "connections_reused": max(requests - opened, 0),
+            "reuse_rate": (requests - opened) / requests if requests else 0.0,
+        }
+
+    def close(self):
+        self.client.close()
+
+    async def aclose(self):
+        await self.async_client.aclose()
+
+
+_pool: Optional[HTTPConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> HTTPConnectionPool:
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HTTPConnectionPool()
+        return _pool
+
+
+def pooled_transports(
+    max_connections: int = OPENAI_POOL_MAX_CONNECTIONS,
+    max_keepalive: int = OPENAI_POOL_MAX_KEEPALIVE,
+    keepalive_expiry: float = OPENAI_POOL_KEEPALIVE_EXPIRY,
+):
+    """The (sync, async) keep-alive transports the pool uses by default."""
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return httpx.HTTPTransport(limits=limits), httpx.AsyncHTTPTransport(limits=limits)
+
+
+def set_http_pool(pool: HTTPConnectionPool):
+    """
+    Replaces the process-wide pool. Validators pick up the pool when they
+    are created, so call this before creating them.
+    """
+    global _pool
+    with _pool_lock:
+        _pool = pool
+
+
+async def close_http_pool():
+    """Closes the shared clients; called from the app's shutdown hook."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+        await pool.aclose()
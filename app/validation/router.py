@@ -0,0 +1,368 @@
+import asyncio
+import collections
+import concurrent.futures
+import contextvars
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from validation.base_validator import BaseValidator
+from validation.cache import fingerprint
+from validation.rules import fallback_verdict
+from validation.structured_output import current_node
+from helpers.admission import llm_admission
+from helpers.config import (
+    ROUTER_ENGINES,
+    HEDGE_PERCENTILE,
+    HEDGE_INITIAL_DELAY,
+    HEDGE_MIN_DELAY,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+MIN_LATENCY_SAMPLES = 20  # Before the percentile replaces HEDGE_INITIAL_DELAY
+
+
+class CircuitBreaker:
+    """
+    Stops calling an engine after `failure_threshold` consecutive failures.
+    Once `reset_timeout` has passed, a single probe call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go through; in half-open state only one at a time."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def is_available(self) -> bool:
+        """Like `allow`, but without taking the half-open probe."""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return self.state == CLOSED or not self._probing
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """Gives back a probe whose call was cancelled before it finished."""
+        with self._lock:
+            self._probing = False
+
+
+class LatencyWindow:
+    """The most recent call latencies of one engine."""
+
+    def __init__(self, size: int = 200):
+        self._samples: collections.deque = collections.deque(maxlen=size)
+        self._lock = threading.Lock()  # Sync calls record from the hedge threads
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class ValidationRouter(BaseValidator):
+    """
+    Routes validations across several engines. A call goes to the first
+    engine whose circuit breaker is closed; if it hasn't answered by the
+    engine's HEDGE_PERCENTILE latency, a hedged request goes to the next
+    engine (or retries the same one when it is the only engine), and the
+    first good answer wins. A hedge is an extra call in flight, so it takes
+    its own LLM admission slot and is skipped when none is free. Failed
+    calls fail over to the next engine, and when every engine is down the
+    answer is settled by the local rules.
+    """
+
+    # Threads for hedged sync calls; a losing call runs to completion in the background
+    _executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=32, thread_name_prefix="validation-hedge"
+    )
+
+    def __init__(self, engines: Optional[List[str]] = None):
+        from validation.factory import ValidatorFactory
+
+        self.engines = engines or [e for e in ROUTER_ENGINES if e != "router"]
+        self._validators = {
+            engine: ValidatorFactory.create_validator(engine) for engine in self.engines
+        }
+        self._breakers = {engine: CircuitBreaker() for engine in self.engines}
+        self._latencies = {engine: LatencyWindow() for engine in self.engines}
+        self.prompt_version = fingerprint(
+            *(f"{engine}={self._validators[engine].prompt_version}" for engine in self.engines)
+        )
+        self.hedges = 0
+        self.hedges_skipped = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def _candidates(self) -> collections.deque:
+        """Engines to try in order; a lone engine is listed twice so it can be retried."""
+        available = [e for e in self.engines if self._breakers[e].is_available()]
+        if len(available) == 1:
+            available.append(available[0])
+        return collections.deque(available)
+
+    def _next_engine(self, candidates: collections.deque) -> Optional[str]:
+        while candidates:
+            engine = candidates.popleft()
+            if self._breakers[engine].allow():
+                return engine
+        return None
+
+    def _hedge_delay(self, engine: str) -> float:
+        latency = self._latencies[engine].percentile(HEDGE_PERCENTILE)
+        return HEDGE_INITIAL_DELAY if latency is None else max(latency, HEDGE_MIN_DELAY)
+
+    def _count(self, counter: str):
+        """Bumps one of the stats counters; sync calls run on the hedge threads."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _record(self, engine: str, started: float, result: Optional[Dict[str, str]]):
+        self._latencies[engine].add(time.perf_counter() - started)
+        if result is None:
+            self._breakers[engine].record_failure()
+        else:
+            self._breakers[engine].record_success()
+
+    @staticmethod
+    def _usable(result: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        return None if result is None or result.get("status") == "error" else result
+
+    def _call(self, engine: str, question: str, user_answer: str):
+        started = time.perf_counter()
+        try:
+            result = self._usable(self._validators[engine].validate(question, user_answer))
+        except Exception as e:
+            logging.warning(f"[router] {engine} failed: {str(e)}")
+            result = None
+        self._record(engine, started, result)
+        return result
+
+    async def _acall(self, engine: str, question: str, user_answer: str):
+        started = time.perf_counter()
+        try:
+            result = self._usable(await self._validators[engine].avalidate(question, user_answer))
+        except asyncio.CancelledError:
+            # Lost the hedge; not the engine's fault, but it was this slow
+            self._latencies[engine].add(time.perf_counter() - started)
+            self._breakers[engine].release()
+            raise
+        except Exception as e:
+            logging.warning(f"[router] {engine} failed: {str(e)}")
+            result = None
+        self._record(engine, started, result)
+        return result
+
+    def _hedged_call(self, engine: str, question: str, user_answer: str):
+        try:
+            return self._call(engine, question, user_answer)
+        finally:
+            llm_admission.release()
+
+    def _fallback(
+        self, question: str, user_answer: str, node_key: Optional[str] = None
+    ) -> Dict[str, str]:
+        self._count("fallbacks")
+        logging.warning("[router] No validation engine available, using local rules.")
+        # Single validations run inside the factory's validating_node
+        return fallback_verdict(question, user_answer, node_key or current_node.get())
+
+    def _admit_hedge(self) -> bool:
+        """Takes an admission slot for a hedge, so hedging never exceeds the LLM cap."""
+        if llm_admission.try_acquire():
+            return True
+        self._count("hedges_skipped")
+        return False
+
+    def _count_launch(self, hedge: bool):
+        if hedge:
+            self._count("hedges")
+        else:
+            self._count("failovers")
+
+    def validate(self, question: str, user_answer: str) -> Dict[str, str]:
+        candidates = self._candidates()
+        engine = self._next_engine(candidates)
+        if engine is None:
+            return self._fallback(question, user_answer)
+
+        delay, hedging = self._hedge_delay(engine), True
+        # Calls run in the caller's context, e.g. the session and node being validated
+        first_future = self._executor.submit(
+            contextvars.copy_context().run, self._call, engine, question, user_answer
+        )
+        pending = {first_future: engine}
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending,
+                timeout=delay if candidates and hedging else None,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in done:
+                pending.pop(future)
+                result = future.result()
+                if result is not None:
+                    if future is not first_future:
+                        self._count("hedge_wins")
+                    return result
+            # Timed out (hedge) or a call failed (fail over)
+            hedge = bool(pending)
+            if hedge and not self._admit_hedge():
+                hedging = False  # No free slot; wait for the calls in flight
+                continue
+            engine = self._next_engine(candidates)
+            if engine is None:
+                if hedge:
+                    llm_admission.release()
+                continue
+            self._count_launch(hedge)
+            future = self._executor.submit(
+                contextvars.copy_context().run,
+                self._hedged_call if hedge else self._call,
+                engine,
+                question,
+                user_answer,
+            )
+            pending[future] = engine
+        return self._fallback(question, user_answer)
+
+    async def avalidate(self, question: str, user_answer: str) -> Dict[str, str]:
+        candidates = self._candidates()
+        engine = self._next_engine(candidates)
+        if engine is None:
+            return self._fallback(question, user_answer)
+
+        delay, hedging = self._hedge_delay(engine), True
+        first_task = asyncio.ensure_future(self._acall(engine, question, user_answer))
+        pending = {first_task: engine}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=delay if candidates and hedging else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    pending.pop(task)
+                    result = task.result()
+                    if result is not None:
+                        if task is not first_task:
+                            self._count("hedge_wins")
+                        return result
+                hedge = bool(pending)
+                if hedge and not self._admit_hedge():
+                    hedging = False  # No free slot; wait for the calls in flight
+                    continue
+                engine = self._next_engine(candidates)
+                if engine is None:
+                    if hedge:
+                        llm_admission.release()
+                    continue
+                self._count_launch(hedge)
+                task = asyncio.ensure_future(self._acall(engine, question, user_answer))
+                if hedge:
+                    # Also when the task is cancelled before it has started
+                    task.add_done_callback(lambda _: llm_admission.release())
+                pending[task] = engine
+        finally:
+            for task in pending:
+                task.cancel()
+        return self._fallback(question, user_answer)
+
+    def validate_many(
+        self, fields: Dict[str, Tuple[str, str]]
+    ) -> Dict[str, Dict[str, str]]:
+        """Batches go to one engine at a time, failing over without hedging."""
+        candidates = self._candidates()
+        engine = self._next_engine(candidates)
+        while engine is not None:
+            started = time.perf_counter()
+            try:
+                results = self._validators[engine].validate_many(fields)
+                ok = not any(r.get("status") == "error" for r in results.values())
+            except Exception as e:
+                logging.warning(f"[router] {engine} batch failed: {str(e)}")
+                ok = False
+            self._record(engine, started, results if ok else None)
+            if ok:
+                return results
+            self._count("failovers")
+            engine = self._next_engine(candidates)
+        return {key: self._fallback(q, a, key) for key, (q, a) in fields.items()}
+
+    async def avalidate_many(
+        self, fields: Dict[str, Tuple[str, str]]
+    ) -> Dict[str, Dict[str, str]]:
+        candidates = self._candidates()
+        engine = self._next_engine(candidates)
+        while engine is not None:
+            started = time.perf_counter()
+            try:
+                results = await self._validators[engine].avalidate_many(fields)
+                ok = not any(r.get("status") == "error" for r in results.values())
+            except Exception as e:
+                logging.warning(f"[router] {engine} batch failed: {str(e)}")
+                ok = False
+            self._record(engine, started, results if ok else None)
+            if ok:
+                return results
+            self._count("failovers")
+            engine = self._next_engine(candidates)
+        return {key: self._fallback(q, a, key) for key, (q, a) in fields.items()}
+
+    def stats(self) -> dict:
+        stats = {
+            "hedges": self.hedges,
+            "hedges_skipped": self.hedges_skipped,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "fallbacks": self.fallbacks,
+        }
+        for engine in self.engines:
+            stats[f"{engine}_open"] = 0 if self._breakers[engine].state == CLOSED else 1
+            stats[f"{engine}_hedge_delay"] = self._hedge_delay(engine)
+        return stats
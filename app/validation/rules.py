@@ -0,0 +1,238 @@
+import contextvars
+import re
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Mapping, Optional
+from validation.validated_response import Formatter, ValidatedLLMResponse, formatter_for
+from helpers.config import RULE_PREVALIDATION_ENABLED
+
+# Rule-based verdicts for answers that don't need an LLM. Each check returns
+# a validation result when the answer is clearly valid or clearly invalid,
+# and None when it is ambiguous and should go to the LLM validator.
+
+EMAIL_PATTERN = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
+NAME_WORD_PATTERN = re.compile(r"^[^\W\d_]+(?:['\-][^\W\d_]+)*\.?$")
+USERNAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{3,30}$")
+PASSWORD_MIN_LENGTH = 8
+
+
+def _valid(formatted_answer: str, feedback: str = "Looks good.") -> Dict[str, str]:
+    return {"status": "valid", "feedback": feedback, "formatted_answer": formatted_answer}
+
+
+def _clarify(user_answer: str, feedback: str) -> Dict[str, str]:
+    return {"status": "clarify", "feedback": feedback, "formatted_answer": user_answer}
+
+
+def check_email(answer: str) -> Optional[Dict[str, str]]:
+    answer = answer.strip()
+    if EMAIL_PATTERN.match(answer):
+        return _valid(ValidatedLLMResponse.validate_email(answer))
+    if "@" not in answer or " " in answer:
+        return _clarify(answer, "Please enter a valid email address, e.g. name@example.com.")
+    return None
+
+
+def check_name(answer: str) -> Optional[Dict[str, str]]:
+    words = answer.split()
+    if not words or any(char.isdigit() for char in answer):
+        return _clarify(answer, "Please enter your first and last name.")
+    if len(words) >= 2 and all(NAME_WORD_PATTERN.match(word) for word in words):
+        return _valid(ValidatedLLMResponse.validate_name(answer))
+    return None
+
+
+def check_phone(answer: str) -> Optional[Dict[str, str]]:
+    digits = re.sub(r"\D", "", answer)
+    if re.search(r"[A-Za-z]", answer) or len(digits) < 10:
+        return _clarify(answer, "Please enter a 10-digit phone number.")
+    if len(digits) == 10:
+        return _valid(ValidatedLLMResponse.validate_phone(answer))
+    return None  # Possibly includes a country code
+
+
+def check_address(answer: str) -> Optional[Dict[str, str]]:
+    # Free-form addresses are left to the LLM unless they can't possibly be
+    # complete: without any digit there is neither a street number nor a ZIP.
+    if not re.search(r"\d", answer):
+        return _clarify(
+            answer,
+            "Please enter your full address: street number, street name, city, state and ZIP code.",
+        )
+    return None
+
+
+def check_username(answer: str) -> Optional[Dict[str, str]]:
+    answer = answer.strip()
+    if USERNAME_PATTERN.match(answer):
+        return _valid(answer)
+    return _clarify(
+        answer,
+        "Usernames must be 3-30 characters using letters, digits, '.', '_' or '-'.",
+    )
+
+
+def check_password(answer: str) -> Optional[Dict[str, str]]:
+    if len(answer) < PASSWORD_MIN_LENGTH:
+        return _clarify(
+            answer, f"Passwords must be at least {PASSWORD_MIN_LENGTH} characters long."
+        )
+    if not (
+        any(char.islower() for char in answer)
+        and any(char.isupper() for char in answer)
+        and any(char.isdigit() for char in answer)
+    ):
+        return _clarify(
+            answer,
+            "Passwords must contain an uppercase letter, a lowercase letter and a digit.",
+        )
+    return _valid(answer, "Strong password.")
+
+
+# Rules by the name form definitions refer to them by (see graph.forms)
+RULES_BY_NAME: Dict[str, Callable[[str], Optional[Dict[str, str]]]] = {
+    "email": check_email,
+    "name": check_name,
+    "address": check_address,
+    "phone": check_phone,
+    "username": check_username,
+    "password": check_password,
+}
+
+# Rules of the registration form's nodes, for validations outside of a form
+RULE_NAMES_BY_NODE: Dict[str, str] = {
+    "ask_email": "email",
+    "ask_name": "name",
+    "ask_address": "address",
+    "ask_phone": "phone",
+    "ask_username": "username",
+    "ask_password": "password",
+}
+
+# Rules whose answers are secrets, whatever the node is called
+SECRET_RULES = {"password"}
+
+# Fallback when only the question text is known. "username" must be matched
+# before "name".
+RULES_BY_KEYWORD = ["email", "username", "password", "phone", "address", "name"]
+
+# Rule names by node key of the form version the current session is pinned
+# to (FormDefinition.rules). Set by the endpoints and the bulk importer, so
+# forms sharing a node key, or versions of a form, each keep their own rules.
+current_form_rules: contextvars.ContextVar[Optional[Mapping[str, str]]] = contextvars.ContextVar(
+    "current_form_rules", default=None
+)
+
+
+@contextmanager
+def form_rules(rules: Optional[Mapping[str, str]]):
+    """Validates with a form version's rules inside the block."""
+    token = current_form_rules.set(rules)
+    try:
+        yield
+    finally:
+        current_form_rules.reset(token)
+
+
+@lru_cache(maxsize=1024)
+def _keyword_rule_name(question: str) -> Optional[str]:
+    question = question.lower()
+    for keyword in RULES_BY_KEYWORD:
+        if keyword in question:
+            return keyword
+    return None
+
+
+def rule_name_for(question: str, node_key: Optional[str] = None) -> Optional[str]:
+    """
+    The name of the rule for a question: the current form's rule for the
+    node, or outside of a form the registration rules, or else a keyword
+    of the question.
+    """
+    rules = current_form_rules.get()
+    if rules is None:
+        rules = RULE_NAMES_BY_NODE
+    if node_key in rules:
+        return rules[node_key]
+    return _keyword_rule_name(question)
+
+
+def is_secret(question: str, node_key: Optional[str] = None) -> bool:
+    """Whether answers to a question must stay out of journals and caches."""
+    return rule_name_for(question, node_key) in SECRET_RULES
+
+
+def resolve_rule(question: str, node_key: Optional[str] = None):
+    """Finds the rule for a question, preferring the graph node key."""
+    rule_name = rule_name_for(question, node_key)
+    return None if rule_name is None else RULES_BY_NAME[rule_name]
+
+
+def node_formatter(question: str, node_key: Optional[str] = None) -> Formatter:
+    """The formatter of the rule for a question."""
+    return formatter_for(question, rule_name_for(question, node_key))
+
+
+class RuleStats:
+    """Counts how many validations were settled without an LLM call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rule_valid = 0
+        self.rule_clarify = 0
+        self.llm = 0
+
+    def record(self, result: Optional[Dict[str, str]]):
+        with self._lock:
+            if result is None:
+                self.llm += 1
+            elif result["status"] == "valid":
+                self.rule_valid += 1
+            else:
+                self.rule_clarify += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            bypassed = self.rule_valid + self.rule_clarify
+            total = bypassed + self.llm
+            return {
+                "rule_valid": self.rule_valid,
+                "rule_clarify": self.rule_clarify,
+                "llm": self.llm,
+                "llm_bypass_ratio": bypassed / total if total else 0.0,
+            }
+
+
+rule_stats = RuleStats()
+
+
+def prevalidate(
+    question: str, user_answer: str, node_key: Optional[str] = None
+) -> Optional[Dict[str, str]]:
+    """Returns a rule-based verdict, or None if the LLM has to decide."""
+    if not RULE_PREVALIDATION_ENABLED:
+        return None
+    rule = resolve_rule(question, node_key)
+    result = rule(user_answer) if rule else None
+    rule_stats.record(result)
+    return result
+
+
+def fallback_verdict(
+    question: str, user_answer: str, node_key: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Verdict for when no LLM engine is available: the rule's, if it decides,
+    otherwise the local formatting of the question. Results are
+    marked "degraded" so they are never cached.
+    """
+    rule = resolve_rule(question, node_key)
+    result = rule(user_answer) if rule else None
+    if result is None:
+        formatted = node_formatter(question, node_key)(user_answer)
+        if formatted == "clarify":
+            result = _clarify(user_answer, "Please check your answer and try again.")
+        else:
+            result = _valid(formatted, "Accepted; full validation is temporarily unavailable.")
+    return {**result, "degraded": "true"}
@@ -0,0 +1,108 @@
+"""
+Parsing of the validators' structured output.
+
+Engines hand over an already-decoded dict (a DSPy prediction, or the JSON of
+a completion). The fast path checks its fields directly and formats a valid
+answer with the formatter of its question's rule in the session's form
+version (see validation.rules.node_formatter). With GUARDRAILS_STRICT the dict goes
+through a Guardrails guard over ValidatedLLMResponse first, as it used to;
+the guard is only built, and guardrails only imported, in that mode.
+
+    python -m benchmarks.output_parsing
+"""
+import contextvars
+import functools
+import json
+from contextlib import contextmanager
+from typing import Dict, Optional
+from helpers.config import GUARDRAILS_STRICT
+from helpers.metrics import timed
+from validation.rules import node_formatter
+from validation.validated_response import ValidatedLLMResponse
+
+# Bump when parsing changes what validators return, so cached results are dropped
+PARSER_VERSION = "2"
+
+STATUSES = frozenset(("valid", "clarify", "error"))
+# What formatters return for an answer they can't format
+UNFORMATTABLE = "clarify"
+UNFORMATTABLE_FEEDBACK = "Please check your answer and try again."
+
+# The graph node being validated, for engines that only get the question.
+# Set by the validator layer around each LLM call.
+current_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_node", default=None
+)
+
+
+@contextmanager
+def validating_node(node_key: Optional[str]):
+    token = current_node.set(node_key)
+    try:
+        yield
+    finally:
+        try:
+            current_node.reset(token)
+        except ValueError:
+            pass  # Closed from another context, e.g. an abandoned stream
+
+
+class MalformedOutput(ValueError):
+    """Raised when an engine's output isn't a well-formed validation result."""
+
+
+def check_output(data) -> Dict[str, str]:
+    """The fast path: checks the fields of a decoded result without re-serializing it."""
+    if not isinstance(data, dict):
+        raise MalformedOutput(f"Expected an object, got {type(data).__name__}")
+    status = data.get("status")
+    feedback = data.get("feedback")
+    formatted_answer = data.get("formatted_answer")
+    if status not in STATUSES:
+        raise MalformedOutput(f"Invalid status: {status!r}")
+    if not isinstance(feedback, str) or not isinstance(formatted_answer, str):
+        raise MalformedOutput("feedback and formatted_answer must be strings")
+    return {"status": status, "feedback": feedback, "formatted_answer": formatted_answer}
+
+
+@functools.lru_cache(maxsize=None)
+def _guard():
+    import guardrails as gd
+
+    return gd.Guard.for_pydantic(ValidatedLLMResponse)
+
+
+def guard_output(data) -> Dict[str, str]:
+    """The strict path: Guardrails parses and validates the serialized result."""
+    outcome = _guard().parse(json.dumps(data))
+    if not outcome.validation_passed or outcome.validated_output is None:
+        raise MalformedOutput(f"Guardrails rejected the output: {outcome.error}")
+    return check_output(dict(outcome.validated_output))
+
+
+def parse_output(
+    data,
+    question: str,
+    node_key: Optional[str] = None,
+    engine: str = "",
+    strict: Optional[bool] = None,
+) -> Dict[str, str]:
+    """
+    Turns an engine's decoded output into a validation result, or raises
+    MalformedOutput. A valid answer its formatter rejects needs clarifying.
+    """
+    strict = GUARDRAILS_STRICT if strict is None else strict
+    with timed("guard_parse" if strict else "output_parse", engine):
+        result = guard_output(data) if strict else check_output(data)
+        if result["status"] != "valid":
+            return result
+        formatter = node_formatter(question, node_key or current_node.get())
+        formatted = formatter(result["formatted_answer"])
+    if formatted == UNFORMATTABLE:
+        return {
+            "status": "clarify",
+            "feedback": UNFORMATTABLE_FEEDBACK,
+            "formatted_answer": result["formatted_answer"],
+        }
+    result["formatted_answer"] = formatted
+    return result
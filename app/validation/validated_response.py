@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field, field_validator
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
 import re
 
 class ValidatedLLMResponse(BaseModel):
@@ -10,31 +12,22 @@ class ValidatedLLMResponse(BaseModel):
 
     @field_validator("formatted_answer", mode="before")
     @classmethod
-    def validate_and_format(cls, value, values):
-        """Formats & validates responses based on the question type."""
+    def validate_and_format(cls, value, info: ValidationInfo):
+        """
+        Formats & validates responses based on the question type. The
+        question comes from the validation context, e.g.
+        `ValidatedLLMResponse.model_validate(data, context={"question": ...})`.
+        """
 
-        if values.get("status") == "error":
+        if info.data.get("status") == "error":
             return value  # Skip validation for errors
 
-        question = values.get("question", "").lower()
+        return cls.format_for_question((info.context or {}).get("question", ""), value)
 
-        # Validate Email Format
-        if "email" in question:
-            return cls.validate_email(value)
-
-        # Validate Name Format (Capitalize First & Last Name)
-        if "name" in question:
-            return cls.validate_name(value)
-
-        # Validate Phone Number (Format: (XXX) XXX-XXXX)
-        if "phone" in question:
-            return cls.validate_phone(value)
-
-        # Validate Address (Must contain street, city, state, ZIP)
-        if "address" in question:
-            return cls.validate_address(value)
-
-        return value  # Default: Return unchanged
+    @classmethod
+    def format_for_question(cls, question: str, value: str) -> str:
+        """Applies the formatting rule matching the question, or "clarify"."""
+        return formatter_for(question)(value)
 
     @staticmethod
     def validate_email(email: str) -> str:
@@ -68,4 +61,37 @@ class ValidatedLLMResponse(BaseModel):
         formatted_address = ", ".join(comp.strip().title() for comp in components)
         return (
             formatted_address if re.search(r"\d{5}", formatted_address) else "clarify"
-        )
\ No newline at end of file
+        )
+
+
+def keep_answer(value: str) -> str:
+    """Formatter of questions without a formatting rule."""
+    return value
+
+
+Formatter = Callable[[str], str]
+
+# Formatters by rule name (see validation.rules.RULES_BY_NAME); the other
+# rules keep the answer as is
+FORMATTERS: Dict[str, Formatter] = {
+    "email": ValidatedLLMResponse.validate_email,
+    "name": ValidatedLLMResponse.validate_name,
+    "phone": ValidatedLLMResponse.validate_phone,
+    "address": ValidatedLLMResponse.validate_address,
+}
+
+
+@lru_cache(maxsize=1024)
+def formatter_for(question: str, rule_name: Optional[str] = None) -> Formatter:
+    """
+    The formatter of the rule named `rule_name`, or without one, of the
+    first keyword found in the question. Cached, so each question is only
+    matched once.
+    """
+    if rule_name is not None:
+        return FORMATTERS.get(rule_name, keep_answer)
+    question = question.lower()
+    for keyword in ("email", "name", "phone", "address"):
+        if keyword in question:
+            return FORMATTERS[keyword]
+    return keep_answer